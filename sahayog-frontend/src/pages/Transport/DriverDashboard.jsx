@@ -59,13 +59,25 @@ const DriverDashboard = () => {
     }
   };
 
+  const getPosition = () => new Promise((resolve) => {
+    // Without a fix the server falls back to the driver's last reported location
+    if (!navigator.geolocation) {
+      resolve(null);
+      return;
+    }
+    navigator.geolocation.getCurrentPosition(
+      (position) => resolve(position.coords),
+      () => resolve(null),
+      { maximumAge: 30000, timeout: 10000 }
+    );
+  });
+
   const loadAvailableRides = async () => {
     try {
-      const response = await transportAPI.getRides();
-      const available = response.data.results?.filter(ride => 
-        ride.status === RIDE_STATUS.REQUESTED && !ride.driver
-      ) || [];
-      setAvailableRides(available);
+      const coords = await getPosition();
+      const params = coords ? { latitude: coords.latitude, longitude: coords.longitude } : {};
+      const response = await transportAPI.getOpenRides(params);
+      setAvailableRides(response.data || []);
     } catch (error) {
       console.error('Error loading available rides');
     }
@@ -58,6 +58,7 @@ export const authAPI = {
   login: (credentials) => api.post('/auth/login/', credentials),
   register: (userData) => api.post('/auth/register/', userData),
   getProfile: () => api.get('/auth/user-profile/'),
+  bootstrap: () => api.get('/bootstrap/'),
   updateProfile: (data) => api.patch('/auth/profile/', data),
   registerCooperativeMember: (data) => api.post('/auth/cooperative-member/', data),
 };
@@ -72,13 +73,19 @@ export const transportAPI = {
   getDriverProfile: () => api.get('/transport/driver-profile/'),
   updateDriverProfile: (data) => api.patch('/transport/driver-profile/', data),
   
-  getRides: () => api.get('/transport/rides/'),
+  // Ride lists nest slim users; expand them for the contact details shown with each ride
+  getRides: (params = { expand: 'customer,driver' }) => api.get('/transport/rides/', { params }),
+  getFareQuote: (params) => api.get('/transport/quote/', { params }),
+  getOpenRides: (params) => api.get('/transport/rides/open/', { params }),
   createRide: (data) => api.post('/transport/rides/', data),
   acceptRide: (rideId) => api.post(`/transport/rides/${rideId}/accept/`),
+  declineRide: (rideId) => api.post(`/transport/rides/${rideId}/decline/`),
+  getRideOffers: () => api.get('/transport/rides/offers/'),
   updateRideStatus: (rideId, status) => api.post(`/transport/rides/${rideId}/status/`, { status }),
   rateRide: (rideId, rating) => api.post(`/transport/rides/${rideId}/rate/`, rating),
   
   getNearbyDrivers: (lat, lng) => api.get(`/transport/nearby-drivers/?latitude=${lat}&longitude=${lng}`),
+  updateLocation: (latitude, longitude) => api.post('/transport/location/', { latitude, longitude }),
 };
 
 // Marketplace API
@@ -90,6 +97,8 @@ export const marketplaceAPI = {
   updateProduct: (id, data) => api.patch(`/marketplace/products/${id}/`, data),
   deleteProduct: (id) => api.delete(`/marketplace/products/${id}/`),
   getMyProducts: () => api.get('/marketplace/my-products/'),
+  importProducts: (formData) => api.post('/marketplace/products/import/', formData),
+  exportProducts: (type = 'csv') => api.get('/marketplace/products/export/', { params: { type }, responseType: 'blob' }),
   
   createInquiry: (data) => api.post('/marketplace/inquiries/', data),
   getInquiries: () => api.get('/marketplace/inquiries/'),
@@ -98,8 +107,11 @@ export const marketplaceAPI = {
 // Cooperative API
 export const cooperativeAPI = {
   getProducts: (params) => api.get('/cooperative/products/', { params }),
+  getProduct: (id) => api.get(`/cooperative/products/${id}/`),
   createProduct: (data) => api.post('/cooperative/products/create/', data),
   getMyProducts: () => api.get('/cooperative/my-products/'),
+  importProducts: (formData) => api.post('/cooperative/products/import/', formData),
+  exportProducts: (type = 'csv') => api.get('/cooperative/products/export/', { params: { type }, responseType: 'blob' }),
   
   getOrders: () => api.get('/cooperative/orders/'),
   createOrder: (data) => api.post('/cooperative/orders/', data),
@@ -31,5 +31,6 @@ class CooperativeMemberAdmin(admin.ModelAdmin):
     
     def approve_members(self, request, queryset):
         from django.utils import timezone
-        queryset.update(is_approved=True, approval_date=timezone.now())
+        now = timezone.now()
+        queryset.update(is_approved=True, approval_date=now, updated_at=now)
     approve_members.short_description = "Approve selected members"
\ No newline at end of file
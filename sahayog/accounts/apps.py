@@ -2,4 +2,15 @@ from django.apps import AppConfig
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'accounts'
\ No newline at end of file
+    name = 'accounts'
+    
+    def ready(self):
+        from imaging.registry import register, AVATAR_SIZES, DOCUMENT_SIZES
+        from sahayog import bootstrap
+        from .models import User, UserProfile, CooperativeMember
+        register(User, ['profile_image'], sizes=AVATAR_SIZES)
+        register(CooperativeMember, ['aadhar_card', 'photo', 'identification_doc'], sizes=DOCUMENT_SIZES)
+        bootstrap.track(User, 'pk')
+        bootstrap.track(UserProfile, 'user_id')
+        bootstrap.track(CooperativeMember, 'user_id')
+        from . import signals  # noqa: F401
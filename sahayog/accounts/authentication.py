@@ -0,0 +1,72 @@
+"""
+Stateless JWT authentication.
+
+Access tokens carry the claims in tokens.USER_CLAIMS, so a request is
+authenticated without reading the user row: the user is built from the
+claims with every other field deferred, and the first access to one of those
+loads them all in a single query.
+
+Saving or deleting a user records the time in the "auth" cache (revoke()),
+and tokens issued before it are checked against the database until they
+expire, so disabling an account or changing its type takes effect on the next
+request. The record only has to outlive the access tokens it covers, but it
+must reach every process: while the cache is process-local (and
+AUTH_SINGLE_PROCESS is off) every token is checked against the database.
+"""
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
+from .tokens import USER_CLAIMS
+
+REVOKED_KEY = 'auth:revoked:{}'
+CACHE_ALIAS = 'auth'
+
+def revocations():
+    return caches[CACHE_ALIAS]
+
+def claims_trusted():
+    """Whether every process sees the revocations this one records"""
+    if getattr(settings, 'AUTH_SINGLE_PROCESS', False):
+        return True
+    return not isinstance(revocations(), (LocMemCache, DummyCache))
+
+def revoke(user_id):
+    """Stop trusting the claims of tokens issued to user_id so far"""
+    timeout = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()) + 1
+    revocations().set(REVOKED_KEY.format(user_id), time.time(), timeout)
+
+def is_revoked(user_id, issued_at):
+    revoked_at = revocations().get(REVOKED_KEY.format(user_id))
+    return revoked_at is not None and (issued_at is None or issued_at < revoked_at)
+
+def token_user(user_id, claims):
+    """A User with only the primary key and the claims loaded"""
+    values = {User._meta.pk.attname: User._meta.pk.to_python(user_id), **claims}
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db(router.db_for_read(User), field_names, [values[name] for name in field_names])
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        if not claims_trusted():
+            return super().get_user(validated_token)
+        claims = {claim: validated_token.get(claim) for claim in USER_CLAIMS}
+        if None in claims.values() or is_revoked(user_id, validated_token.get('iat')):
+            # Issued before the claims existed or before the user last changed
+            return super().get_user(validated_token)
+        if not claims['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return token_user(user_id, claims)
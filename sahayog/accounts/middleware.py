@@ -0,0 +1,25 @@
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .authentication import StatelessJWTAuthentication
+
+@database_sync_to_async
+def get_user_for_token(raw_token):
+    authentication = StatelessJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Authenticates websocket connections from an access token in the ?token= query parameter"""
+    
+    async def __call__(self, scope, receive, send):
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token')
+        if token:
+            user = await get_user_for_token(token[0])
+            if user is not None:
+                scope = dict(scope, user=user)
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cooperativemember',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
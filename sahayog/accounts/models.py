@@ -13,6 +13,7 @@ class User(AbstractUser):
     user_type = models.CharField(max_length=20, choices=USER_TYPES, default='customer')
     phone_number = models.CharField(max_length=15, unique=True)
     profile_image = models.ImageField(upload_to='profiles/', null=True, blank=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)  # see imaging.registry
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -20,6 +21,14 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} - {self.user_type}"
 
+    def refresh_from_db(self, using=None, fields=None):
+        # Users authenticated from a token (accounts.authentication) defer everything but
+        # the claims; the first deferred field touched loads the others with it
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using=using, fields=fields)
+
 class UserProfile(models.Model):
     GENDER_CHOICES = (
         ('male', 'Male'),
@@ -35,6 +44,7 @@ class UserProfile(models.Model):
     state = models.CharField(max_length=100, null=True, blank=True)
     pincode = models.CharField(max_length=10, null=True, blank=True)
     emergency_contact = models.CharField(max_length=15, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.user.username}'s Profile"
@@ -63,11 +73,13 @@ class CooperativeMember(models.Model):
     aadhar_card = models.ImageField(upload_to='cooperative_docs/', null=True, blank=True)
     photo = models.ImageField(upload_to='cooperative_docs/', null=True, blank=True)
     identification_doc = models.ImageField(upload_to='cooperative_docs/', null=True, blank=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)  # see imaging.registry
     
     # Status
     is_approved = models.BooleanField(default=False)
     application_date = models.DateTimeField(auto_now_add=True)
     approval_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.user.username} - Cooperative Member"
\ No newline at end of file
@@ -1,6 +1,14 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from sahayog.celery import enqueue_on_commit
+from sahayog.serializers import SparseFieldsetMixin
+from imaging.serializers import RenditionsField
 from .models import User, UserProfile, CooperativeMember
+from .tasks import create_user_profile
+from .tokens import UserRefreshToken, add_user_claims
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -18,30 +26,41 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data.pop('password_confirm')
         password = validated_data.pop('password')
-        user = User.objects.create_user(**validated_data)
-        user.set_password(password)
-        user.save()
-        UserProfile.objects.create(user=user)
+        user = User.objects.create_user(password=password, **validated_data)
+        # The profile is created off the request path; profile views use get_or_create meanwhile
+        enqueue_on_commit(create_user_profile, user.id)
         return user
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    profile_image_renditions = RenditionsField('profile_image')
+    
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'email', 'phone_number', 'user_type', 'first_name', 'last_name', 'profile_image',
+                  'profile_image_renditions', 'is_verified')
+
+class UserSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Name and avatar only; nested users expand to UserSerializer"""
+    profile_image_renditions = RenditionsField('profile_image')
+    
     class Meta:
         model = User
-        fields = ('id', 'username', 'email', 'phone_number', 'user_type', 'first_name', 'last_name', 'profile_image', 'is_verified')
+        fields = ('id', 'username', 'first_name', 'last_name', 'user_type', 'profile_image_renditions')
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
         model = UserProfile
         fields = '__all__'
 
-class CooperativeMemberSerializer(serializers.ModelSerializer):
+class CooperativeMemberSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    renditions = RenditionsField()
     
     class Meta:
         model = CooperativeMember
-        fields = '__all__'
+        exclude = ['image_renditions']
 
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField()
@@ -60,4 +79,17 @@ class LoginSerializer(serializers.Serializer):
             attrs['user'] = user
             return attrs
         else:
-            raise serializers.ValidationError('Must include username and password')
\ No newline at end of file
+            raise serializers.ValidationError('Must include username and password')
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Re-reads the user claims, so an access token's are never older than its lifetime"""
+    token_class = UserRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM), is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed('User not found or inactive', code='user_inactive')
+        add_user_claims(refresh, user)
+        # The access token takes its iat from here, and its claims are current
+        refresh.set_iat()
+        return super().validate({'refresh': str(refresh)})
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .authentication import revoke
+from .models import User
+from .tokens import USER_CLAIMS
+
+@receiver(post_save, sender=User)
+def revoke_user_claims(sender, instance, created, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no token carries
+    if created or (update_fields is not None and not set(USER_CLAIMS) & set(update_fields)):
+        return
+    revoke(instance.pk)
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user(sender, instance, **kwargs):
+    revoke(instance.pk)
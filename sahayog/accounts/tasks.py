@@ -0,0 +1,8 @@
+from celery import shared_task
+from sahayog.celery import RETRY_POLICY
+from .models import UserProfile
+
+@shared_task(**RETRY_POLICY)
+def create_user_profile(user_id):
+    """Give a newly registered user their profile; safe to run more than once"""
+    UserProfile.objects.get_or_create(user_id=user_id)
@@ -1,3 +1,185 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+from sahayog import task_metrics
+from transport.models import DriverProfile, Ride, Vehicle
+from .authentication import REVOKED_KEY, StatelessJWTAuthentication, revocations
+from .models import User, UserProfile
+from .tokens import UserRefreshToken
 
-# Create your tests here.
+class RegistrationTests(TestCase):
+    def register(self):
+        return APIClient().post('/api/auth/register/', {
+            'username': 'asha', 'phone_number': '9800000001', 'email': 'asha@example.com',
+            'password': 'pass12345', 'password_confirm': 'pass12345', 'user_type': 'customer',
+        })
+    
+    def test_profile_is_created_by_a_task_after_commit(self):
+        task_metrics.reset()
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.register()
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(username='asha')
+        self.assertTrue(user.check_password('pass12345'))
+        self.assertFalse(UserProfile.objects.filter(user=user).exists())
+        
+        for callback in callbacks:
+            callback()
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+        self.assertEqual(task_metrics.snapshot()['accounts.tasks.create_user_profile']['count'], 1)
+
+class ConditionalProfileTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='asha', phone_number='9800000001', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_user_profile_is_304_until_the_profile_changes(self):
+        etag = self.client.get('/api/auth/user-profile/')['ETag']
+        self.assertEqual(self.client.get('/api/auth/user-profile/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.patch('/api/auth/profile/', {'city': 'Pune'})
+        response = self.client.get('/api/auth/user-profile/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['profile']['city'], 'Pune')
+
+    def test_profile_changes_with_the_user(self):
+        etag = self.client.get('/api/auth/profile/')['ETag']
+        self.assertEqual(self.client.get('/api/auth/profile/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.user.email = 'asha@example.com'
+        self.user.save()
+        response = self.client.get('/api/auth/profile/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['email'], 'asha@example.com')
+
+class BootstrapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user(username='asha', phone_number='9800000001', password='pass12345')
+        UserProfile.objects.create(user=self.customer, city='Pune')
+        self.driver = User.objects.create_user(
+            username='ravi', phone_number='9800000002', password='pass12345', user_type='driver')
+        DriverProfile.objects.create(
+            user=self.driver, license_number='DL-1', license_expiry='2030-01-01', experience_years=3,
+            is_online=True, is_verified=True,
+        )
+        self.vehicle = Vehicle.objects.create(
+            driver=self.driver, vehicle_type='auto', make='Bajaj', model='RE', year=2020, license_plate='MH01',
+            fuel_type='cng', seating_capacity=3, registration_doc='vehicle_docs/r.jpg',
+            insurance_doc='vehicle_docs/i.jpg', is_active=True, is_verified=True,
+        )
+        self.ride = Ride.objects.create(
+            customer=self.customer, driver=self.driver, vehicle=self.vehicle, status='accepted',
+            pickup_latitude=19.07, pickup_longitude=72.87, pickup_address='Bandra',
+            dropoff_latitude=19.11, dropoff_longitude=72.86, dropoff_address='Andheri',
+            estimated_fare='150.00', distance_km=5.2, estimated_duration=20,
+        )
+        self.client = APIClient()
+
+    def test_customer_payload_in_bounded_queries_without_writes(self):
+        other = User.objects.create_user(username='new', phone_number='9800000003', password='pass12345')
+        self.client.force_authenticate(other)
+        # user with profiles, ride, orders
+        with self.assertNumQueries(3):
+            data = self.client.get('/api/bootstrap/').data
+        self.assertIsNone(data['profile'])
+        self.assertFalse(UserProfile.objects.filter(user=other).exists())
+
+        self.client.force_authenticate(self.customer)
+        data = self.client.get('/api/bootstrap/').data
+        self.assertEqual(data['user']['username'], 'asha')
+        self.assertEqual(data['profile']['city'], 'Pune')
+        self.assertNotIn('user', data['profile'])
+        self.assertEqual(data['active_ride']['id'], self.ride.pk)
+        self.assertEqual(data['recent_orders'], [])
+
+    def test_driver_payload(self):
+        self.client.force_authenticate(self.driver)
+        with self.assertNumQueries(4):
+            data = self.client.get('/api/bootstrap/').data
+        self.assertEqual(data['driver_profile']['experience_years'], 3)
+        self.assertEqual([vehicle['id'] for vehicle in data['vehicles']], [self.vehicle.pk])
+        self.assertEqual(data['active_ride']['id'], self.ride.pk)
+
+    def test_cached_until_a_tracked_row_changes(self):
+        self.client.force_authenticate(self.customer)
+        etag = self.client.get('/api/bootstrap/')['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/bootstrap/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(self.client.get('/api/bootstrap/').data['active_ride']['status'], 'accepted')
+
+        self.ride.transition_to('picked_up')
+        response = self.client.get('/api/bootstrap/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['active_ride']['status'], 'picked_up')
+
+class StatelessAuthenticationTests(TestCase):
+    def setUp(self):
+        revocations().clear()
+        self.user = User.objects.create_user(
+            username='ravi', phone_number='9800000011', password='pass12345', user_type='driver',
+            email='ravi@example.com',
+        )
+        self.refresh = UserRefreshToken.for_user(self.user)
+
+    def authenticate(self, token=None):
+        token = token or self.refresh.access_token
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        user, _ = StatelessJWTAuthentication().authenticate(request)
+        return user
+
+    def test_claims_without_queries_and_the_rest_in_one(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual((user.pk, user.user_type, user.is_verified), (self.user.pk, 'driver', False))
+            self.assertTrue(user.is_authenticated)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'ravi@example.com')
+            self.assertEqual(user.username, 'ravi')
+            self.assertEqual(user.phone_number, '9800000011')
+
+    def test_changed_user_is_read_from_the_database(self):
+        self.user.user_type = 'customer'
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().user_type, 'customer')
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(AUTH_SINGLE_PROCESS=False)
+    def test_process_local_revocations_are_not_trusted(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().user_type, 'driver')
+
+    def test_revocations_survive_clearing_the_default_cache(self):
+        self.user.is_active = False
+        self.user.save()
+        cache.clear()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_login_does_not_revoke_claims(self):
+        self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+    def test_refresh_issues_current_claims(self):
+        self.user.is_verified = True
+        self.user.save()
+        # Token times are whole seconds; move the revocation out of the second the new token is issued in
+        key = REVOKED_KEY.format(self.user.pk)
+        revocations().set(key, revocations().get(key) - 1)
+        response = APIClient().post('/api/auth/token/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.authenticate(response.data['access']).is_verified)
+
+        self.user.is_active = False
+        self.user.save()
+        response = APIClient().post('/api/auth/token/refresh/', {'refresh': response.data['refresh']})
+        self.assertEqual(response.status_code, 401)
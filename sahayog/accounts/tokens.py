@@ -0,0 +1,14 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# Copied onto every access token, so requests are authenticated without reading the user row
+USER_CLAIMS = ('user_type', 'is_verified', 'is_active')
+
+def add_user_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+class UserRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        return add_user_claims(super().for_user(user), user)
@@ -2,9 +2,10 @@ from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import login
+from sahayog.conditional import ConditionalGetMixin, conditional_get
 from .models import User, UserProfile, CooperativeMember
+from .tokens import UserRefreshToken
 from .serializers import (
     UserRegistrationSerializer, UserSerializer, UserProfileSerializer,
     CooperativeMemberSerializer, LoginSerializer
@@ -20,7 +21,7 @@ class RegisterView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
         
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
             'refresh': str(refresh),
@@ -36,19 +37,21 @@ class LoginView(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
         
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
             'refresh': str(refresh),
             'access': str(refresh.access_token),
         })
 
-class ProfileView(generics.RetrieveUpdateAPIView):
+class ProfileView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
+    last_modified_related = ('user',)
     
     def get_object(self):
         profile, created = UserProfile.objects.get_or_create(user=self.request.user)
+        profile.user = self.request.user
         return profile
 
 class CooperativeMemberView(generics.CreateAPIView):
@@ -63,13 +66,17 @@ class CooperativeMemberView(generics.CreateAPIView):
 def user_profile(request):
     user = request.user
     profile, created = UserProfile.objects.get_or_create(user=user)
+    cooperative_profile = getattr(user, 'cooperative_profile', None)
     
-    data = {
-        'user': UserSerializer(user).data,
-        'profile': UserProfileSerializer(profile).data,
-    }
-    
-    if hasattr(user, 'cooperative_profile'):
-        data['cooperative_profile'] = CooperativeMemberSerializer(user.cooperative_profile).data
+    def render():
+        data = {
+            'user': UserSerializer(user).data,
+            'profile': UserProfileSerializer(profile).data,
+        }
+        if cooperative_profile is not None:
+            data['cooperative_profile'] = CooperativeMemberSerializer(cooperative_profile).data
+        return Response(data)
     
-    return Response(data)
\ No newline at end of file
+    parts = [user, profile, cooperative_profile]
+    last_modified = max(part.updated_at for part in parts if part is not None)
+    return conditional_get(request, last_modified, render, user.pk, cooperative_profile is not None)
\ No newline at end of file
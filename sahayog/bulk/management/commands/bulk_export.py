@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from bulk.registry import get_entry, registered_labels
+from bulk.transfer import FORMATS, export_lines
+
+class Command(BaseCommand):
+    help = 'Write rows as CSV or JSON lines, in the layout bulk_import reads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('label', choices=registered_labels(), help='Model to export, e.g. marketplace.product')
+        parser.add_argument('--owner', help='Only the rows of this username')
+        parser.add_argument('--format', choices=list(FORMATS), default='csv')
+
+    def handle(self, *args, **options):
+        entry = get_entry(options['label'])
+        queryset = entry.model._default_manager.order_by('pk')
+        if options['owner']:
+            queryset = queryset.filter(**{f'{entry.owner_field}__username': options['owner']})
+        for line in export_lines(entry, queryset, options['format']):
+            self.stdout.write(line, ending='')
@@ -0,0 +1,35 @@
+import sys
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from bulk.registry import get_entry, registered_labels
+from bulk.transfer import FORMATS, detect_format, import_rows, read_rows
+
+class Command(BaseCommand):
+    help = "Create rows for a user from a CSV or JSON-lines file; nothing is created if any row is invalid"
+
+    def add_arguments(self, parser):
+        parser.add_argument('label', choices=registered_labels(), help='Model to import, e.g. marketplace.product')
+        parser.add_argument('path', help='File to read, or - for standard input')
+        parser.add_argument('--owner', required=True, help='Username the rows belong to')
+        parser.add_argument('--format', choices=list(FORMATS), help='Defaults to the file extension')
+
+    def handle(self, *args, **options):
+        fmt = detect_format(options['path'], options['format'])
+        if fmt is None:
+            raise CommandError('Cannot tell the format from the file name; pass --format')
+        try:
+            owner = get_user_model().objects.get(username=options['owner'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named {options['owner']}")
+
+        if options['path'] == '-':
+            created, errors = import_rows(get_entry(options['label']), read_rows(sys.stdin, fmt), owner)
+        else:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                created, errors = import_rows(get_entry(options['label']), read_rows(stream, fmt), owner)
+
+        for error in errors:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if errors:
+            raise CommandError(f'{len(errors)} invalid rows; nothing was imported')
+        self.stdout.write(self.style.SUCCESS(f'Imported {created} rows'))
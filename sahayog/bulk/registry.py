@@ -0,0 +1,32 @@
+"""
+Bulk import/export registry. Apps register a model with the serializer that
+validates one row (the one their create endpoint uses) and the field that
+points at the user the rows belong to.
+
+    register(Product, ProductCreateSerializer, owner_field='seller')
+"""
+from collections import namedtuple
+
+Entry = namedtuple('Entry', ['model', 'serializer_class', 'owner_field'])
+
+_registry = {}
+
+def register(model, serializer_class, owner_field):
+    _registry[model._meta.label_lower] = Entry(model, serializer_class, owner_field)
+
+def get_entry(label):
+    try:
+        return _registry[label]
+    except KeyError:
+        raise LookupError(f'{label} is not registered for bulk import') from None
+
+def registered_labels():
+    return sorted(_registry)
+
+def columns(entry):
+    """(column name, model attname) pairs: the id, then every field the serializer accepts"""
+    pairs = [('id', entry.model._meta.pk.attname)]
+    for name, field in entry.serializer_class().fields.items():
+        if not field.read_only and name != 'id':
+            pairs.append((name, entry.model._meta.get_field(field.source).attname))
+    return pairs
@@ -0,0 +1,132 @@
+import io
+import json
+import os
+import tempfile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import User
+from accounts.tokens import UserRefreshToken
+from cooperative.models import CooperativeProduct
+from marketplace.models import Category, Product
+from search.index import search
+
+def csv_file(rows, name='products.csv'):
+    header = 'title,description,category,price,location,latitude\n'
+    return SimpleUploadedFile(name, (header + ''.join(f'{row}\n' for row in rows)).encode())
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', phone_number='9300000001', password='pass12345')
+        self.category = Category.objects.create(name='Cycles', slug='cycles')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def row(self, title, price='1200.00'):
+        return f'{title},Good condition,{self.category.pk},{price},Pune,'
+
+    def upload(self, file, **params):
+        return self.client.post('/api/marketplace/products/import/', {'file': file, **params}, format='multipart')
+
+    @override_settings(BULK_IMPORT_CHUNK_SIZE=2)
+    def test_rows_are_inserted_in_chunks_and_indexed(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.upload(csv_file([self.row('Red cycle'), self.row('Blue cycle'), self.row('Green cycle')]))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "marketplace_product"')]
+        self.assertEqual(len(inserts), 2)
+
+        product = Product.objects.get(title='Blue cycle')
+        self.assertEqual(product.seller, self.seller)
+        self.assertIsNone(product.latitude)
+        self.assertEqual(search(Product, 'green'), [Product.objects.get(title='Green cycle').pk])
+
+    @override_settings(BULK_IMPORT_CHUNK_SIZE=1)
+    def test_any_invalid_row_imports_nothing(self):
+        response = self.upload(csv_file([self.row('Red cycle'), self.row('Blue cycle', price='cheap'), ',,,,,']))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertIn('price', response.data['errors'][0]['errors'])
+        self.assertFalse(Product.objects.exists())
+
+    @override_settings(BULK_IMPORT_MAX_ROWS=1)
+    def test_row_limit(self):
+        response = self.upload(csv_file([self.row('Red cycle'), self.row('Blue cycle')]))
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertFalse(Product.objects.exists())
+
+    def test_format_comes_from_the_extension_or_type(self):
+        self.assertEqual(self.upload(csv_file([], name='products.xlsx')).status_code, 400)
+        response = self.upload(csv_file([self.row('Red cycle')], name='upload'), type='csv')
+        self.assertEqual(response.status_code, 201)
+
+    def test_export_round_trips_through_import(self):
+        other = User.objects.create_user(username='other', phone_number='9300000002', password='pass12345')
+        Product.objects.create(
+            seller=other, category=self.category, title='Not mine', description='x', price='10.00', location='Pune',
+        )
+        self.upload(csv_file([self.row('Red cycle'), self.row('Blue cycle')]))
+
+        response = self.client.get('/api/marketplace/products/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        exported = b''.join(response.streaming_content).decode()
+        self.assertEqual(exported.count('cycle'), 2)
+        self.assertNotIn('Not mine', exported)
+
+        self.client.force_authenticate(other)
+        response = self.upload(SimpleUploadedFile('products.csv', exported.encode()))
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(Product.objects.filter(seller=other).count(), 3)
+
+class CooperativeProductImportTests(TestCase):
+    def setUp(self):
+        self.artisan = User.objects.create_user(
+            username='artisan', phone_number='9300000003', password='pass12345', user_type='cooperative_member',
+        )
+        self.row = {
+            'name': 'Terracotta lamp', 'description': 'Hand thrown', 'product_type': 'pottery', 'price': '250.00',
+            'craft_tradition': 'Khurja pottery', 'origin_village': 'Khurja', 'materials_used': 'Clay',
+            'time_to_make': '2 days', 'is_fair_trade': True,
+        }
+
+    def test_json_lines_import_reports_unreadable_lines(self):
+        client = APIClient()
+        client.force_authenticate(self.artisan)
+        lines = f'{json.dumps(self.row)}\n\nnot json\n'
+        response = client.post('/api/cooperative/products/import/', {
+            'file': SimpleUploadedFile('products.jsonl', lines.encode()),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [{'row': 2, 'errors': {'non_field_errors': ['Not a JSON object']}}])
+
+    def test_commands_import_and_export(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'products.jsonl')
+        with open(path, 'w') as file:
+            file.write(json.dumps(self.row) + '\n')
+        call_command('bulk_import', 'cooperative.cooperativeproduct', path, owner='artisan', stdout=io.StringIO())
+        product = CooperativeProduct.objects.get()
+        self.assertEqual((product.artisan, product.is_fair_trade), (self.artisan, True))
+
+        out = io.StringIO()
+        call_command('bulk_export', 'cooperative.cooperativeproduct', owner='artisan', format='jsonl', stdout=out)
+        exported = json.loads(out.getvalue())
+        self.assertEqual((exported['id'], exported['price']), (product.pk, '250.00'))
+
+class ExportStreamingTests(TestCase):
+    async def test_asgi_requests_stream_asynchronously(self):
+        seller = await User.objects.acreate(username='seller', phone_number='9300000004', user_type='vendor')
+        category = await Category.objects.acreate(name='Cycles', slug='cycles')
+        await Product.objects.acreate(
+            seller=seller, category=category, title='Red cycle', description='x', price='10.00', location='Pune',
+        )
+        token = UserRefreshToken.for_user(seller).access_token
+        response = await self.async_client.get(
+            '/api/marketplace/products/export/?type=jsonl', AUTHORIZATION=f'Bearer {token}',
+        )
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual([json.loads(line)['title'] for line in body.splitlines()], ['Red cycle'])
@@ -0,0 +1,123 @@
+"""
+Bulk import and export as CSV or JSON lines.
+
+Imports read the rows one at a time, validate each with the registered
+serializer and insert the valid ones with bulk_create in chunks, all inside
+one transaction: a file with any invalid row inserts nothing, and the result
+lists every invalid row by its number (the first record after the CSV header
+is row 1). bulk_create skips model signals, so the search index and the
+response cache are updated here.
+
+Exports walk the rows with iterator() and yield text, so memory stays flat
+whatever the size of the catalogue. Their columns are the ones imports
+accept, which makes an export a valid import file.
+"""
+import csv
+import io
+import json
+import os
+from functools import partial
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from sahayog import response_cache
+from search.index import index_objects
+from .registry import columns
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/jsonl'}
+EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_MAX_ROWS = 5000
+
+def detect_format(filename, requested=None):
+    """'csv' or 'jsonl' from an explicit choice or the file extension, else None"""
+    if requested:
+        return requested if requested in FORMATS else None
+    return EXTENSIONS.get(os.path.splitext(filename or '')[1].lower())
+
+def read_rows(stream, fmt):
+    """(row number, dict or None when unreadable) for each record of a text stream"""
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), 1):
+            # Empty cells leave the field to its default, as an omitted JSON key does
+            yield number, {name: value for name, value in row.items() if name and value not in ('', None)}
+        return
+    number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+def _row_error(number, message):
+    return {'row': number, 'errors': {'non_field_errors': [message]}}
+
+def import_rows(entry, rows, owner, context=None):
+    """Insert rows for owner; returns (rows created, per-row errors)"""
+    chunk_size = getattr(settings, 'BULK_IMPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    max_rows = getattr(settings, 'BULK_IMPORT_MAX_ROWS', DEFAULT_MAX_ROWS)
+    model = entry.model
+    created, pending, errors = 0, [], []
+
+    def insert(objects):
+        # bulk_create sends no post_save for the search index to pick up
+        index_objects(model, model._default_manager.bulk_create(objects))
+        return len(objects)
+
+    with transaction.atomic():
+        for number, row in rows:
+            if number > max_rows:
+                errors.append(_row_error(number, f'Imports are limited to {max_rows} rows'))
+                break
+            if row is None:
+                errors.append(_row_error(number, 'Not a JSON object'))
+                continue
+            serializer = entry.serializer_class(data=row, context=context or {})
+            if not serializer.is_valid():
+                errors.append({'row': number, 'errors': serializer.errors})
+                continue
+            pending.append(model(**serializer.validated_data, **{entry.owner_field: owner}))
+            if len(pending) >= chunk_size:
+                # Once a row has failed nothing will be kept, so the rest are only validated
+                if not errors:
+                    created += insert(pending)
+                pending = []
+
+        if errors:
+            transaction.set_rollback(True)
+            return 0, errors
+        if pending:
+            created += insert(pending)
+        scope = model._meta.label_lower
+        response_cache.bump(scope)
+        transaction.on_commit(partial(response_cache.bump, scope))
+    return created, []
+
+def export_lines(entry, queryset, fmt):
+    """Lines of text for every row of queryset, a CSV header first"""
+    pairs = columns(entry)
+    names = [name for name, _ in pairs]
+    chunk_size = getattr(settings, 'BULK_IMPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    values = queryset.values_list(*[attname for _, attname in pairs]).iterator(chunk_size=chunk_size)
+
+    if fmt == 'jsonl':
+        for row in values:
+            yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    yield _take(buffer)
+    for row in values:
+        writer.writerow(['' if value is None else value for value in row])
+        yield _take(buffer)
+
+def _take(buffer):
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
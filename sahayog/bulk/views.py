@@ -0,0 +1,73 @@
+import io
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework import permissions, status
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .registry import get_entry
+from .transfer import FORMATS, detect_format, export_lines, import_rows, read_rows
+
+# ?format= is taken by DRF's renderer negotiation
+FORMAT_PARAM = 'type'
+LINES_PER_CHUNK = 100
+
+class BulkImportView(APIView):
+    """Creates the uploading user's rows from a CSV or JSON-lines file named "file" """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+    label = None
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload the rows as a file named "file"'}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = detect_format(upload.name, request.query_params.get(FORMAT_PARAM) or request.data.get(FORMAT_PARAM))
+        if fmt is None:
+            return Response({'error': f'Rows must be one of: {", ".join(FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            created, errors = import_rows(
+                get_entry(self.label), read_rows(stream, fmt), request.user, context={'request': request},
+            )
+        except UnicodeDecodeError:
+            return Response({'error': 'The file is not UTF-8 text'}, status=status.HTTP_400_BAD_REQUEST)
+        if errors:
+            return Response({'created': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'created': created, 'errors': []}, status=status.HTTP_201_CREATED)
+
+class BulkExportView(APIView):
+    """Streams the requesting user's rows as CSV (the default) or JSON lines"""
+    permission_classes = [permissions.IsAuthenticated]
+    label = None
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.query_params.get(FORMAT_PARAM, 'csv')
+        if fmt not in FORMATS:
+            return Response({'error': f'Rows must be one of: {", ".join(FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+        entry = get_entry(self.label)
+        queryset = entry.model._default_manager.filter(**{entry.owner_field: request.user}).order_by('pk')
+        chunks = _chunks(export_lines(entry, queryset, fmt))
+        if isinstance(request._request, ASGIRequest):
+            # Django's ASGI handler buffers a synchronous iterator whole before sending it
+            chunks = _async_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type=FORMATS[fmt])
+        filename = f'{entry.model._meta.model_name}s.{fmt}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+def _chunks(lines):
+    while True:
+        chunk = ''.join(islice(lines, LINES_PER_CHUNK))
+        if not chunk:
+            return
+        yield chunk
+
+async def _async_chunks(chunks):
+    # The database cursor stays on the thread that opened it
+    take = sync_to_async(lambda: next(chunks, None), thread_sensitive=True)
+    while (chunk := await take()) is not None:
+        yield chunk
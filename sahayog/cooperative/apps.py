@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class CooperativeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cooperative'
+
+    def ready(self):
+        from bulk.registry import register as register_bulk
+        from imaging.registry import register as register_images
+        from sahayog import bootstrap, primary_image, response_cache
+        from search.index import register
+        from .models import CooperativeProduct, CooperativeProductImage, CooperativeOrder
+        from .serializers import CooperativeProductSerializer
+        register(CooperativeProduct, title=['name', 'craft_tradition'], body=['description', 'materials_used'])
+        register_images(CooperativeProductImage, ['image'])
+        primary_image.connect(CooperativeProductImage)
+        response_cache.track(CooperativeProduct, CooperativeProductImage)
+        bootstrap.track(CooperativeOrder, 'buyer_id')
+        register_bulk(CooperativeProduct, CooperativeProductSerializer, owner_field='artisan')
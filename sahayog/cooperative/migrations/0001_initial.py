@@ -0,0 +1,101 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CooperativeProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('product_type', models.CharField(choices=[('handicraft', 'Handicraft'), ('textile', 'Textile'), ('food', 'Food Product'), ('agriculture', 'Agriculture Product'), ('handloom', 'Handloom'), ('pottery', 'Pottery'), ('jewelry', 'Jewelry'), ('other', 'Other')], max_length=20)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity_available', models.PositiveIntegerField(default=1)),
+                ('craft_tradition', models.CharField(max_length=100)),
+                ('origin_village', models.CharField(max_length=100)),
+                ('materials_used', models.TextField()),
+                ('time_to_make', models.CharField(max_length=50)),
+                ('is_certified_organic', models.BooleanField(default=False)),
+                ('is_fair_trade', models.BooleanField(default=False)),
+                ('geographical_indication', models.CharField(blank=True, max_length=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_featured', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('artisan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cooperative_products', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CooperativeProductImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to='cooperative_products/')),
+                ('is_primary', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='cooperative.cooperativeproduct')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CooperativeOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('delivery_address', models.TextField()),
+                ('delivery_phone', models.CharField(max_length=15)),
+                ('delivery_instructions', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('in_progress', 'In Progress'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('tracking_number', models.CharField(blank=True, max_length=50)),
+                ('estimated_delivery', models.DateField(blank=True, null=True)),
+                ('ordered_at', models.DateTimeField(auto_now_add=True)),
+                ('confirmed_at', models.DateTimeField(blank=True, null=True)),
+                ('shipped_at', models.DateTimeField(blank=True, null=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('buyer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cooperative_orders', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='cooperative.cooperativeproduct')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArtisanSupport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('support_type', models.CharField(choices=[('financial', 'Financial Support'), ('training', 'Training & Skill Development'), ('marketing', 'Marketing Assistance'), ('raw_materials', 'Raw Materials'), ('equipment', 'Equipment Support'), ('certification', 'Certification Help')], max_length=20)),
+                ('description', models.TextField()),
+                ('amount_requested', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('is_approved', models.BooleanField(default=False)),
+                ('is_completed', models.BooleanField(default=False)),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('approved_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('artisan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='support_requests', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='cooperativeproduct',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='coop_product_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cooperativeproduct',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product_type', '-created_at'], name='coop_product_type_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cooperativeproduct',
+            index=models.Index(fields=['artisan', '-created_at'], name='coop_product_artisan_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cooperativeorder',
+            index=models.Index(fields=['buyer', '-ordered_at', '-id'], name='order_buyer_feed_idx'),
+        ),
+    ]
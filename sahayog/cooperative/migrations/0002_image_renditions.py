@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cooperative', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cooperativeproductimage',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_primary_images(apps, schema_editor):
+    # One primary per product (the first flagged, else the oldest image) before the constraint goes on
+    CooperativeProduct = apps.get_model('cooperative', 'CooperativeProduct')
+    CooperativeProductImage = apps.get_model('cooperative', 'CooperativeProductImage')
+    chosen = {}
+    for image_id, product_id, is_primary in CooperativeProductImage.objects.order_by(
+        '-is_primary', 'created_at', 'id'
+    ).values_list('id', 'product_id', 'is_primary'):
+        chosen.setdefault(product_id, image_id)
+    primaries = set(chosen.values())
+    CooperativeProductImage.objects.filter(is_primary=True).exclude(id__in=primaries).update(is_primary=False)
+    CooperativeProductImage.objects.filter(id__in=primaries).update(is_primary=True)
+    products = list(CooperativeProduct.objects.filter(id__in=chosen).only('id'))
+    for product in products:
+        product.primary_image_id = chosen[product.id]
+    CooperativeProduct.objects.bulk_update(products, ['primary_image'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cooperative', '0002_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cooperativeproduct',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cooperative.cooperativeproductimage'),
+        ),
+        migrations.RunPython(fill_primary_images, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cooperativeproductimage',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_primary', True)), fields=('product',), name='coop_product_one_primary_image'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cooperative', '0003_primary_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cooperativeorder',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from accounts.models import User
 
 class CooperativeProduct(models.Model):
@@ -31,20 +32,44 @@ class CooperativeProduct(models.Model):
     is_fair_trade = models.BooleanField(default=False)
     geographical_indication = models.CharField(max_length=100, blank=True)
     
+    # Kept in step with images by signals (sahayog.primary_image) so list pages skip the image table
+    primary_image = models.ForeignKey(
+        'CooperativeProductImage', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+'
+    )
+    
     # Status
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Newest-first catalogue, overall and per product type, only ever over active products
+            models.Index(fields=['-created_at'], name='coop_product_feed_idx', condition=Q(is_active=True)),
+            models.Index(
+                fields=['product_type', '-created_at'], name='coop_product_type_feed_idx',
+                condition=Q(is_active=True),
+            ),
+            models.Index(fields=['artisan', '-created_at'], name='coop_product_artisan_feed_idx'),
+        ]
+    
     def __str__(self):
         return self.name
 
 class CooperativeProductImage(models.Model):
     product = models.ForeignKey(CooperativeProduct, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='cooperative_products/')
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)  # see imaging.registry
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product'], condition=Q(is_primary=True), name='coop_product_one_primary_image'
+            ),
+        ]
 
 class CooperativeOrder(models.Model):
     STATUS_CHOICES = (
@@ -76,6 +101,13 @@ class CooperativeOrder(models.Model):
     confirmed_at = models.DateTimeField(null=True, blank=True)
     shipped_at = models.DateTimeField(null=True, blank=True)
     delivered_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            # Newest-first order feed, seekable by (ordered_at, id)
+            models.Index(fields=['buyer', '-ordered_at', '-id'], name='order_buyer_feed_idx'),
+        ]
     
     def __str__(self):
         return f"Order #{self.id} - {self.product.name}"
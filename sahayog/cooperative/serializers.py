@@ -1,31 +1,50 @@
 from rest_framework import serializers
 from .models import CooperativeProduct, CooperativeProductImage, CooperativeOrder, ArtisanSupport
-from accounts.serializers import UserSerializer
+from accounts.serializers import UserSerializer, UserSummarySerializer
+from imaging.serializers import RenditionsField
+from sahayog.serializers import SparseFieldsetMixin
 
-class CooperativeProductImageSerializer(serializers.ModelSerializer):
+class CooperativeProductImageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    renditions = RenditionsField('image')
+    
     class Meta:
         model = CooperativeProductImage
-        fields = '__all__'
+        exclude = ['image_renditions']
 
-class CooperativeProductSerializer(serializers.ModelSerializer):
-    artisan = UserSerializer(read_only=True)
+class CooperativeProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    artisan = UserSummarySerializer(read_only=True)
     images = CooperativeProductImageSerializer(many=True, read_only=True)
     
     class Meta:
         model = CooperativeProduct
         fields = '__all__'
+        expandable_fields = {'artisan': UserSerializer}
 
-class CooperativeOrderSerializer(serializers.ModelSerializer):
-    buyer = UserSerializer(read_only=True)
-    product = CooperativeProductSerializer(read_only=True)
+class CooperativeProductListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Product card for list pages: the primary image only, no artisan or image array"""
+    primary_image = CooperativeProductImageSerializer(read_only=True)
+    
+    class Meta:
+        model = CooperativeProduct
+        fields = ['id', 'name', 'price', 'product_type', 'craft_tradition', 'origin_village', 'quantity_available',
+                  'is_certified_organic', 'is_fair_trade', 'is_featured', 'primary_image', 'created_at']
+
+class CooperativeOrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    buyer = UserSummarySerializer(read_only=True)
+    product = CooperativeProductListSerializer(read_only=True)
     
     class Meta:
         model = CooperativeOrder
         fields = '__all__'
+        expandable_fields = {'buyer': UserSerializer}
+        # Delivery details stay on the order itself unless asked for
+        list_fields = ['id', 'product', 'quantity', 'total_amount', 'status', 'tracking_number',
+                       'estimated_delivery', 'ordered_at', 'shipped_at', 'delivered_at']
 
-class ArtisanSupportSerializer(serializers.ModelSerializer):
-    artisan = UserSerializer(read_only=True)
+class ArtisanSupportSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    artisan = UserSummarySerializer(read_only=True)
     
     class Meta:
         model = ArtisanSupport
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        expandable_fields = {'artisan': UserSerializer}
\ No newline at end of file
@@ -1,3 +1,106 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
+from accounts.models import User
+from sahayog.testing import QueryCountAssertions, QueryPlanAssertions
+from .models import CooperativeProduct, CooperativeProductImage, CooperativeOrder, ArtisanSupport
 
-# Create your tests here.
+def make_cooperative_product(artisan, name='Clay pot', images=2, **kwargs):
+    product = CooperativeProduct.objects.create(
+        artisan=artisan, name=name, description='Hand made', product_type='pottery', price='450.00',
+        craft_tradition='Khurja pottery', origin_village='Khurja', materials_used='Clay', time_to_make='2 days',
+        **kwargs
+    )
+    for i in range(images):
+        CooperativeProductImage.objects.create(product=product, image=f'cooperative_products/{name}-{i}.jpg', is_primary=i == 0)
+    return product
+
+class ListQueryCountTests(QueryCountAssertions, TestCase):
+    """List endpoints must issue the same number of queries whatever the page length"""
+
+    def setUp(self):
+        self.artisan = User.objects.create_user(
+            username='artisan', phone_number='9300000001', password='pass12345', user_type='cooperative_member')
+        self.buyer = User.objects.create_user(username='buyer', phone_number='9300000002', password='pass12345')
+        self.client = APIClient()
+
+    def add_rows(self, count):
+        for i in range(count):
+            product = make_cooperative_product(self.artisan, name=f'Pot {CooperativeProduct.objects.count()}')
+            CooperativeOrder.objects.create(
+                buyer=self.buyer, product=product, quantity=1, total_amount='450.00',
+                delivery_address='Village road', delivery_phone='9300000002'
+            )
+            ArtisanSupport.objects.create(artisan=self.artisan, support_type='training', description='Glazing course')
+
+    def test_product_list(self):
+        # COUNT, products with primary image
+        self.assertConstantQueries('/api/cooperative/products/', 2, self.add_rows)
+
+    def test_my_products(self):
+        self.client.force_authenticate(self.artisan)
+        self.assertConstantQueries('/api/cooperative/my-products/', 2, self.add_rows)
+
+    def test_orders(self):
+        self.client.force_authenticate(self.buyer)
+        self.assertConstantQueries('/api/cooperative/orders/', 2, self.add_rows)
+
+    def test_support_requests(self):
+        self.client.force_authenticate(self.artisan)
+        self.assertConstantQueries('/api/cooperative/support/', 2, self.add_rows)
+
+class QueryPlanTests(QueryPlanAssertions, TestCase):
+    """Every list view filter must be served by an index rather than a full table scan"""
+
+    def setUp(self):
+        self.artisan = User.objects.create_user(
+            username='artisan', phone_number='9300000001', password='pass12345', user_type='cooperative_member')
+        self.buyer = User.objects.create_user(username='buyer', phone_number='9300000002', password='pass12345')
+        for i in range(5):
+            product = make_cooperative_product(self.artisan, name=f'Pot {i}', images=1)
+            CooperativeOrder.objects.create(
+                buyer=self.buyer, product=product, quantity=1, total_amount='450.00',
+                delivery_address='Village road', delivery_phone='9300000002'
+            )
+        ArtisanSupport.objects.create(artisan=self.artisan, support_type='training', description='Glazing course')
+        self.client = APIClient()
+
+    def test_product_list(self):
+        self.assertNoFullScans('/api/cooperative/products/')
+        self.assertNoFullScans('/api/cooperative/products/', {'type': 'pottery'})
+
+    def test_my_products(self):
+        self.client.force_authenticate(self.artisan)
+        self.assertNoFullScans('/api/cooperative/my-products/')
+
+    def test_orders(self):
+        self.client.force_authenticate(self.buyer)
+        self.assertNoFullScans('/api/cooperative/orders/')
+        self.assertNoFullScans('/api/cooperative/orders/', {'cursor': ''})
+
+    def test_support_requests(self):
+        self.client.force_authenticate(self.artisan)
+        self.assertNoFullScans('/api/cooperative/support/')
+
+class PrimaryImageTests(TestCase):
+    def setUp(self):
+        self.artisan = User.objects.create_user(
+            username='artisan', phone_number='9300000001', password='pass12345', user_type='cooperative_member')
+        self.product = make_cooperative_product(self.artisan, images=2)
+        self.client = APIClient()
+
+    def test_second_primary_replaces_the_first(self):
+        first = self.product.images.get(is_primary=True)
+        second = self.product.images.exclude(pk=first.pk).get()
+        second.is_primary = True
+        second.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.primary_image_id, second.pk)
+        first.refresh_from_db()
+        self.assertFalse(first.is_primary)
+
+    def test_list_card_and_detail(self):
+        card = self.client.get('/api/cooperative/products/').data['results'][0]
+        self.assertEqual(card['primary_image']['id'], self.product.images.get(is_primary=True).pk)
+        self.assertNotIn('images', card)
+        detail = self.client.get(f'/api/cooperative/products/{self.product.pk}/').data
+        self.assertEqual(len(detail['images']), 2)
@@ -1,13 +1,17 @@
 from django.urls import path
+from bulk.views import BulkImportView, BulkExportView
 from .views import (
-    CooperativeProductListView, CooperativeProductCreateView,
+    CooperativeProductListView, CooperativeProductDetailView, CooperativeProductCreateView,
     MyCooperativeProductsView, CooperativeOrderListCreateView,
     ArtisanSupportView
 )
 
 urlpatterns = [
     path('products/', CooperativeProductListView.as_view(), name='cooperative-product-list'),
+    path('products/<int:pk>/', CooperativeProductDetailView.as_view(), name='cooperative-product-detail'),
     path('products/create/', CooperativeProductCreateView.as_view(), name='cooperative-product-create'),
+    path('products/import/', BulkImportView.as_view(label='cooperative.cooperativeproduct'), name='cooperative-product-import'),
+    path('products/export/', BulkExportView.as_view(label='cooperative.cooperativeproduct'), name='cooperative-product-export'),
     path('my-products/', MyCooperativeProductsView.as_view(), name='my-cooperative-products'),
     path('orders/', CooperativeOrderListCreateView.as_view(), name='cooperative-order-list-create'),
     path('support/', ArtisanSupportView.as_view(), name='artisan-support'),
@@ -1,38 +1,50 @@
 from rest_framework import generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Q
+from sahayog.conditional import ConditionalGetMixin
+from sahayog.pagination import KeysetPagination
+from sahayog.response_cache import CachedResponseMixin
+from search.index import filter_by_search
 from .models import CooperativeProduct, CooperativeOrder, ArtisanSupport
-from .serializers import CooperativeProductSerializer, CooperativeOrderSerializer, ArtisanSupportSerializer
+from .serializers import (
+    CooperativeProductSerializer, CooperativeProductListSerializer, CooperativeOrderSerializer, ArtisanSupportSerializer
+)
 
-class CooperativeProductListView(generics.ListAPIView):
-    serializer_class = CooperativeProductSerializer
+CATALOGUE_SCOPES = ('cooperative.cooperativeproduct', 'cooperative.cooperativeproductimage')
+
+class CooperativeProductListView(CachedResponseMixin, generics.ListAPIView):
+    serializer_class = CooperativeProductListSerializer
     permission_classes = [permissions.AllowAny]
+    cache_scopes = CATALOGUE_SCOPES
+    last_modified_related = ('artisan',)
     
     def get_queryset(self):
-        queryset = CooperativeProduct.objects.filter(is_active=True)
+        # Cards only show the primary image; the full set is on the detail endpoint
+        queryset = CooperativeProduct.objects.filter(is_active=True).select_related('primary_image')
         
         # Filter by product type
         product_type = self.request.query_params.get('type')
         if product_type:
             queryset = queryset.filter(product_type=product_type)
         
-        # Search
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(description__icontains=search) |
-                Q(craft_tradition__icontains=search)
-            )
-        
         # Filter by location
         location = self.request.query_params.get('location')
         if location:
             queryset = queryset.filter(origin_village__icontains=location)
         
+        # Search results are ranked by relevance instead of recency
+        search = self.request.query_params.get('search')
+        if search:
+            return filter_by_search(queryset, search)
+        
         return queryset.order_by('-created_at')
 
+class CooperativeProductDetailView(CachedResponseMixin, ConditionalGetMixin, generics.RetrieveAPIView):
+    queryset = CooperativeProduct.objects.filter(is_active=True).select_related('artisan').prefetch_related('images')
+    serializer_class = CooperativeProductSerializer
+    permission_classes = [permissions.AllowAny]
+    cache_scopes = CATALOGUE_SCOPES
+
 class CooperativeProductCreateView(generics.CreateAPIView):
     serializer_class = CooperativeProductSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -41,18 +53,24 @@ class CooperativeProductCreateView(generics.CreateAPIView):
         serializer.save(artisan=self.request.user)
 
 class MyCooperativeProductsView(generics.ListAPIView):
-    serializer_class = CooperativeProductSerializer
+    serializer_class = CooperativeProductListSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return CooperativeProduct.objects.filter(artisan=self.request.user).order_by('-created_at')
+        return CooperativeProduct.objects.filter(artisan=self.request.user).select_related(
+            'primary_image'
+        ).order_by('-created_at')
 
 class CooperativeOrderListCreateView(generics.ListCreateAPIView):
     serializer_class = CooperativeOrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_fields = ('ordered_at', 'id')
     
     def get_queryset(self):
-        return CooperativeOrder.objects.filter(buyer=self.request.user).order_by('-ordered_at')
+        return CooperativeOrder.objects.filter(buyer=self.request.user).select_related(
+            'buyer', 'product__primary_image'
+        ).order_by('-ordered_at', '-id')
     
     def perform_create(self, serializer):
         serializer.save(buyer=self.request.user)
@@ -62,7 +80,7 @@ class ArtisanSupportView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return ArtisanSupport.objects.filter(artisan=self.request.user).order_by('-requested_at')
+        return ArtisanSupport.objects.filter(artisan=self.request.user).select_related('artisan').order_by('-requested_at')
     
     def perform_create(self, serializer):
         serializer.save(artisan=self.request.user)
\ No newline at end of file
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from imaging.registry import registered_models, needs_processing
+from imaging.tasks import process_images
+
+class Command(BaseCommand):
+    help = 'Queue rendition processing for every stored image that has not been processed yet'
+
+    def handle(self, *args, **options):
+        for model in registered_models():
+            label = model._meta.label_lower
+            queued = 0
+            for instance in model._default_manager.iterator(chunk_size=500):
+                if needs_processing(instance):
+                    process_images.delay(label, instance.pk)
+                    queued += 1
+            self.stdout.write(f'Queued {queued} {model._meta.verbose_name_plural}')
+        self.stdout.write(self.style.SUCCESS('Image processing queued'))
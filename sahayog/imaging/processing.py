@@ -0,0 +1,76 @@
+"""
+Pillow side of the upload pipeline: strip metadata from the original and
+write resized WebP and JPEG renditions next to it.
+"""
+import os
+from io import BytesIO
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+QUALITY = 82
+ORIGINAL_QUALITY = 90
+# Originals in these formats are re-encoded without EXIF; phones save JPEGs as MPO
+REWRITABLE = {'JPEG': 'JPEG', 'MPO': 'JPEG', 'PNG': 'PNG', 'WEBP': 'WEBP'}
+
+def _flatten(image):
+    """RGB copy for JPEG, with any transparency laid over white"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+def _encode(image, fmt, quality):
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        _flatten(image).save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    elif fmt == 'WEBP':
+        image.save(buffer, 'WEBP', quality=quality, method=4)
+    else:
+        image.save(buffer, fmt, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+def _replace(storage, name, content):
+    # Reprocessing writes to the same names, so clear them first rather than getting suffixed copies
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, content)
+
+def rendition_name(source, size):
+    directory, filename = os.path.split(source)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'renditions', f'{stem}_{size}')
+
+def process(field_file, sizes):
+    """
+    Strip EXIF from field_file in place (applying its orientation first) and write
+    one rendition per size, no larger than size pixels on its longer side, in each
+    of FORMATS. Returns {'source': name, 'sizes': {size: {format: name}}}.
+    """
+    storage, source = field_file.storage, field_file.name
+    with storage.open(source, 'rb') as f:
+        original = Image.open(f)
+        original.load()
+    image = ImageOps.exif_transpose(original)
+
+    if original.getexif() and original.format in REWRITABLE:
+        fmt = REWRITABLE[original.format]
+        source = _replace(storage, source, _encode(image, fmt, ORIGINAL_QUALITY))
+
+    renditions = {}
+    for size, max_pixels in sizes.items():
+        resized = image.copy()
+        resized.thumbnail((max_pixels, max_pixels), Image.LANCZOS)
+        base = rendition_name(source, size)
+        renditions[size] = {
+            extension: _replace(storage, f'{base}.{extension}', _encode(resized, fmt, QUALITY))
+            for extension, fmt in FORMATS.items()
+        }
+    return {'source': source, 'sizes': renditions}
+
+def delete_renditions(storage, entry):
+    for formats in entry.get('sizes', {}).values():
+        for name in formats.values():
+            storage.delete(name)
@@ -0,0 +1,43 @@
+"""
+Image rendition registry. Apps register a model with the image fields to
+process; the model needs an image_renditions JSONField. Saving a new file
+queues imaging.tasks.process_images once the transaction commits.
+
+    register(ProductImage, ['image'])
+    register(Vehicle, ['registration_doc', 'insurance_doc'], sizes=DOCUMENT_SIZES)
+"""
+from django.conf import settings
+from django.db.models.signals import post_save
+
+DEFAULT_SIZES = {'thumb': 240, 'medium': 640, 'large': 1280}
+# KYC documents only need a preview a reviewer can read
+DOCUMENT_SIZES = {'thumb': 240, 'preview': 1280}
+AVATAR_SIZES = {'thumb': 96, 'medium': 320}
+
+_registry = {}
+
+def register(model, fields, sizes=None):
+    _registry[model] = {field: sizes or getattr(settings, 'IMAGE_RENDITION_SIZES', DEFAULT_SIZES) for field in fields}
+    post_save.connect(_queue_processing, sender=model, dispatch_uid=f'imaging:{model._meta.label_lower}')
+
+def registered_fields(model):
+    """{field name: {size name: max pixels}}"""
+    return _registry[model]
+
+def registered_models():
+    return list(_registry)
+
+def needs_processing(instance):
+    """True when a registered field holds a file that has no renditions yet, or lost its file"""
+    renditions = instance.image_renditions or {}
+    for field in _registry[type(instance)]:
+        file = getattr(instance, field)
+        if (renditions.get(field) or {}).get('source') != (file.name or None):
+            return True
+    return False
+
+def _queue_processing(sender, instance, **kwargs):
+    if needs_processing(instance):
+        from sahayog.celery import enqueue_on_commit
+        from .tasks import process_images
+        enqueue_on_commit(process_images, sender._meta.label_lower, instance.pk)
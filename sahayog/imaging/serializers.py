@@ -0,0 +1,31 @@
+from rest_framework import serializers
+
+class RenditionsField(serializers.Field):
+    """
+    Read-only rendition URLs from a model's image_renditions: {size: {format: url}}
+    for one image field, or {field: {size: {format: url}}} for all of them. Empty
+    until the background task has processed the upload.
+    """
+    def __init__(self, image_field=None, **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def _urls(self, storage, entry):
+        request = self.context.get('request')
+        build = request.build_absolute_uri if request is not None else (lambda url: url)
+        return {
+            size: {fmt: build(storage.url(name)) for fmt, name in formats.items()}
+            for size, formats in (entry or {}).get('sizes', {}).items()
+        }
+
+    def to_representation(self, instance):
+        renditions = instance.image_renditions or {}
+        if self.image_field:
+            storage = getattr(instance, self.image_field).storage
+            return self._urls(storage, renditions.get(self.image_field))
+        return {
+            field: self._urls(getattr(instance, field).storage, entry)
+            for field, entry in renditions.items()
+        }
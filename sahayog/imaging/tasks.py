@@ -0,0 +1,70 @@
+import logging
+from celery import shared_task
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from PIL import UnidentifiedImageError
+from sahayog import response_cache
+from sahayog.celery import RETRY_POLICY
+from .processing import process, delete_renditions
+from .registry import registered_fields
+
+logger = logging.getLogger(__name__)
+
+@shared_task(**RETRY_POLICY)
+def process_images(model_label, pk):
+    """
+    Bring one row's renditions in line with its image fields. Fields whose
+    source is unchanged are skipped, so reruns are cheap no-ops.
+    """
+    model = apps.get_model(model_label)
+    instance = model._default_manager.filter(pk=pk).first()
+    if instance is None:
+        return
+    original = instance.image_renditions or {}
+    renditions = dict(original)
+    moved = {}
+    for field, sizes in registered_fields(model).items():
+        file = getattr(instance, field)
+        previous = renditions.get(field) or {}
+        if previous.get('source') == (file.name or None):
+            continue
+        if file and not file.storage.exists(file.name):
+            # Left unrecorded so the process_images command picks it up if the file turns up
+            logger.info('Skipping missing %s %s of %s %s', field, file.name, model_label, pk)
+            continue
+        delete_renditions(file.storage, previous)
+        if not file:
+            renditions.pop(field, None)
+            continue
+        try:
+            entry = process(file, sizes)
+        except (UnidentifiedImageError, OSError):
+            # Unreadable uploads are recorded so they are not retried on every save
+            logger.exception('Could not process %s %s of %s %s', field, file.name, model_label, pk)
+            entry = {'source': file.name, 'sizes': {}}
+        if entry['source'] != file.name:
+            moved[field] = entry['source']
+        renditions[field] = entry
+    if renditions == original and not moved:
+        return
+    # A queryset update, so the post_save hook does not see this write; the
+    # renditions are in the representation, so updated_at moves with them
+    now = timezone.now()
+    values = {'image_renditions': renditions, **moved}
+    if _has_field(model, 'updated_at'):
+        values['updated_at'] = now
+    model._default_manager.filter(pk=pk).update(**values)
+    response_cache.bump(model._meta.label_lower)
+    if _has_field(model, 'product'):
+        # Image rows are shown inside their product, as sync_primary_image assumes
+        product_model = model._meta.get_field('product').related_model
+        product_model._default_manager.filter(pk=instance.product_id).update(updated_at=now)
+        response_cache.bump(product_model._meta.label_lower)
+
+def _has_field(model, name):
+    try:
+        model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return True
@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+from io import BytesIO
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from accounts.models import User
+from marketplace.models import Category, Product, ProductImage
+from marketplace.serializers import ProductImageSerializer
+from .tasks import process_images
+
+ORIENTATION = 0x0112
+MAKE = 0x010F
+
+def jpeg_upload(name='photo.jpg', size=(2000, 1000), orientation=None):
+    image = Image.new('RGB', size, (200, 80, 40))
+    exif = Image.Exif()
+    exif[MAKE] = 'PhoneCam'
+    if orientation:
+        exif[ORIENTATION] = orientation
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+def open_stored(name):
+    with default_storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        image.load()
+    return image
+
+class RenditionPipelineTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        seller = User.objects.create_user(username='seller', phone_number='9500000001', password='pass12345')
+        category = Category.objects.create(name='Cycles', slug='cycles')
+        self.product = Product.objects.create(
+            seller=seller, category=category, title='Bicycle', description='Good condition',
+            price='1200.00', location='Pune',
+        )
+
+    def upload(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=jpeg_upload(**kwargs))
+        image.refresh_from_db()
+        return image
+
+    def test_renditions_are_written_in_each_format_within_size(self):
+        image = self.upload()
+        entry = image.image_renditions['image']
+        self.assertEqual(entry['source'], image.image.name)
+        self.assertEqual(set(entry['sizes']), {'thumb', 'medium', 'large'})
+        for size, limit in (('thumb', 240), ('medium', 640), ('large', 1280)):
+            self.assertEqual(set(entry['sizes'][size]), {'webp', 'jpeg'})
+            webp = open_stored(entry['sizes'][size]['webp'])
+            self.assertEqual(webp.format, 'WEBP')
+            self.assertEqual(webp.size, (limit, limit // 2))
+            self.assertEqual(open_stored(entry['sizes'][size]['jpeg']).format, 'JPEG')
+
+    def test_exif_is_stripped_after_applying_orientation(self):
+        # Orientation 6 means the camera was turned: the stored pixels need a quarter turn
+        image = self.upload(orientation=6)
+        original = open_stored(image.image.name)
+        self.assertFalse(original.getexif())
+        self.assertEqual(original.size, (1000, 2000))
+        thumb = open_stored(image.image_renditions['image']['sizes']['thumb']['jpeg'])
+        self.assertFalse(thumb.getexif())
+        self.assertEqual(thumb.size, (120, 240))
+
+    def test_serializer_returns_rendition_urls(self):
+        image = self.upload()
+        data = ProductImageSerializer(image).data
+        self.assertNotIn('image_renditions', data)
+        self.assertTrue(data['renditions']['thumb']['webp'].startswith('/media/products/renditions/'))
+        self.assertTrue(data['renditions']['large']['jpeg'].endswith('_large.jpeg'))
+
+    def test_unprocessed_image_has_no_renditions(self):
+        image = ProductImage.objects.create(product=self.product, image=jpeg_upload())
+        self.assertEqual(ProductImageSerializer(image).data['renditions'], {})
+
+    def test_rerun_is_a_no_op_and_replacing_the_file_clears_old_renditions(self):
+        image = self.upload()
+        first = image.image_renditions
+        process_images('marketplace.productimage', image.pk)
+        image.refresh_from_db()
+        self.assertEqual(image.image_renditions, first)
+
+        old_thumb = first['image']['sizes']['thumb']['webp']
+        image.image = jpeg_upload(name='other.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            image.save()
+        image.refresh_from_db()
+        self.assertFalse(default_storage.exists(old_thumb))
+        self.assertIn('other', image.image_renditions['image']['sizes']['thumb']['webp'])
+
+    def test_renditions_move_the_product_updated_at(self):
+        image = ProductImage.objects.create(product=self.product, image=jpeg_upload())
+        stale = Product.objects.filter(pk=self.product.pk)
+        stale.update(updated_at='2020-01-01T00:00Z')
+        process_images('marketplace.productimage', image.pk)
+        self.assertGreater(stale.get().updated_at.year, 2020)
+
+        # Nothing new to process leaves the product alone
+        stale.update(updated_at='2020-01-01T00:00Z')
+        process_images('marketplace.productimage', image.pk)
+        self.assertEqual(stale.get().updated_at.year, 2020)
+
+    def test_unreadable_upload_is_recorded_without_renditions(self):
+        with self.assertLogs('imaging.tasks', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(
+                product=self.product, image=SimpleUploadedFile('broken.jpg', b'not an image', content_type='image/jpeg')
+            )
+        image.refresh_from_db()
+        self.assertEqual(image.image_renditions['image'], {'source': image.image.name, 'sizes': {}})
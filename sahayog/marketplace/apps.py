@@ -1,6 +1,25 @@
+import atexit
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class MarketplaceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'marketplace'
+
+    def ready(self):
+        from imaging.registry import register as register_images
+        from bulk.registry import register as register_bulk
+        from sahayog import primary_image, response_cache
+        from search.index import register
+        from .models import Category, Product, ProductImage
+        from .serializers import ProductCreateSerializer
+        register(Product, title=['title'], body=['description'])
+        register_images(ProductImage, ['image'])
+        register_images(Category, ['image'])
+        primary_image.connect(ProductImage)
+        response_cache.track(Category, Product, ProductImage)
+        register_bulk(Product, ProductCreateSerializer, owner_field='seller')
+        if getattr(settings, 'VIEW_COUNT_FLUSH_AT_EXIT', True):
+            from .view_counter import product_views
+            atexit.register(product_views.flush_quietly)
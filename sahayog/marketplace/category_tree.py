@@ -0,0 +1,30 @@
+"""
+The active category tree, built from a single query and cached until a Category
+changes. The key carries the response cache's version for Category, which
+every save and delete bumps, so stale trees for every host simply age out.
+"""
+from django.core.cache import cache
+from sahayog.response_cache import versions
+from .models import Category
+
+SCOPE = 'marketplace.category'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+def build_category_tree(request=None):
+    from .serializers import CategorySerializer
+    children = {}
+    for category in Category.objects.filter(is_active=True).order_by('id'):
+        children.setdefault(category.parent_id, []).append(category)
+    context = {'request': request, 'children': children}
+    return CategorySerializer(children.get(None, []), many=True, context=context).data
+
+def get_category_tree(request=None):
+    version, = versions([SCOPE])
+    # Image URLs are absolute, so the serialized tree depends on the host
+    host = request.build_absolute_uri('/') if request else ''
+    key = f'marketplace:category_tree:{version}:{host}'
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_category_tree(request)
+        cache.set(key, tree, CACHE_TIMEOUT)
+    return tree
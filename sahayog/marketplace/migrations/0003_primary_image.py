@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_primary_images(apps, schema_editor):
+    # One primary per product (the first flagged, else the oldest image) before the constraint goes on
+    Product = apps.get_model('marketplace', 'Product')
+    ProductImage = apps.get_model('marketplace', 'ProductImage')
+    chosen = {}
+    for image_id, product_id, is_primary in ProductImage.objects.order_by(
+        '-is_primary', 'created_at', 'id'
+    ).values_list('id', 'product_id', 'is_primary'):
+        chosen.setdefault(product_id, image_id)
+    primaries = set(chosen.values())
+    ProductImage.objects.filter(is_primary=True).exclude(id__in=primaries).update(is_primary=False)
+    ProductImage.objects.filter(id__in=primaries).update(is_primary=True)
+    products = list(Product.objects.filter(id__in=chosen).only('id'))
+    for product in products:
+        product.primary_image_id = chosen[product.id]
+    Product.objects.bulk_update(products, ['primary_image'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0002_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='marketplace.productimage'),
+        ),
+        migrations.RunPython(fill_primary_images, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='productimage',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_primary', True)), fields=('product',), name='product_one_primary_image'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from accounts.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -7,6 +8,7 @@ class Category(models.Model):
     slug = models.SlugField(unique=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', null=True, blank=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)  # see imaging.registry
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='subcategories')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -42,6 +44,11 @@ class Product(models.Model):
     is_sold = models.BooleanField(default=False)
     is_featured = models.BooleanField(default=False)
     
+    # Kept in step with images by signals (sahayog.primary_image) so list pages skip the image table
+    primary_image = models.ForeignKey(
+        'ProductImage', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+'
+    )
+    
     # Metadata
     views_count = models.PositiveIntegerField(default=0)
     featured_until = models.DateTimeField(null=True, blank=True)
@@ -50,6 +57,17 @@ class Product(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Newest-first product feeds, seekable by (created_at, id)
+            models.Index(fields=['is_active', '-created_at', '-id'], name='product_browse_feed_idx'),
+            models.Index(fields=['seller', '-created_at', '-id'], name='product_seller_feed_idx'),
+            # Browse filters only ever look at active listings
+            models.Index(
+                fields=['category', '-created_at', '-id'], name='product_category_feed_idx',
+                condition=Q(is_active=True),
+            ),
+            models.Index(fields=['price'], name='product_active_price_idx', condition=Q(is_active=True)),
+        ]
     
     def __str__(self):
         return self.title
@@ -57,9 +75,15 @@ class Product(models.Model):
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='products/')
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)  # see imaging.registry
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product'], condition=Q(is_primary=True), name='product_one_primary_image'),
+        ]
+    
     def __str__(self):
         return f"Image for {self.product.title}"
 
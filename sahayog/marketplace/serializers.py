@@ -1,42 +1,71 @@
 from rest_framework import serializers
 from .models import Category, Product, ProductImage, Inquiry
-from accounts.serializers import UserSerializer
+from accounts.serializers import UserSerializer, UserSummarySerializer
+from imaging.serializers import RenditionsField
+from sahayog.serializers import SparseFieldsetMixin
 
 class CategorySerializer(serializers.ModelSerializer):
     subcategories = serializers.SerializerMethodField()
+    renditions = RenditionsField('image')
     
     class Meta:
         model = Category
-        fields = '__all__'
+        exclude = ['image_renditions']
     
     def get_subcategories(self, obj):
-        if obj.subcategories.exists():
-            return CategorySerializer(obj.subcategories.filter(is_active=True), many=True).data
-        return []
+        # Built from one query by category_tree.build_category_tree
+        if 'children' in self.context:
+            children = self.context['children'].get(obj.id, [])
+        else:
+            children = obj.subcategories.filter(is_active=True)
+        return CategorySerializer(children, many=True, context=self.context).data
+
+class ProductCategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """A product's category without the recursive subcategory tree"""
+    renditions = RenditionsField('image')
+    
+    class Meta:
+        model = Category
+        exclude = ['image_renditions']
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    renditions = RenditionsField('image')
+    
     class Meta:
         model = ProductImage
-        fields = '__all__'
+        exclude = ['image_renditions']
 
-class ProductSerializer(serializers.ModelSerializer):
-    seller = UserSerializer(read_only=True)
-    category = CategorySerializer(read_only=True)
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    seller = UserSummarySerializer(read_only=True)
+    category = ProductCategorySerializer(read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
     
     class Meta:
         model = Product
         fields = '__all__'
+        expandable_fields = {'seller': UserSerializer}
+
+class ProductListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Product card for list pages: the primary image only, no seller or image array"""
+    category = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    primary_image = ProductImageSerializer(read_only=True)
+    
+    class Meta:
+        model = Product
+        fields = ['id', 'title', 'price', 'condition', 'location', 'category', 'category_name', 'primary_image',
+                  'is_sold', 'is_featured', 'created_at']
 
 class ProductCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         exclude = ['seller', 'views_count', 'is_sold']
 
-class InquirySerializer(serializers.ModelSerializer):
-    buyer = UserSerializer(read_only=True)
-    product = ProductSerializer(read_only=True)
+class InquirySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    buyer = UserSummarySerializer(read_only=True)
+    product = ProductListSerializer(read_only=True)
     
     class Meta:
         model = Inquiry
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        expandable_fields = {'buyer': UserSerializer}
\ No newline at end of file
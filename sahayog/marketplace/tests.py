@@ -1,3 +1,314 @@
-from django.test import TestCase
+from unittest import mock
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.models import User
+from sahayog import response_cache
+from sahayog.testing import QueryCountAssertions, QueryPlanAssertions
+from .category_tree import get_category_tree
+from .models import Category, Product, ProductImage, Inquiry
+from .view_counter import product_views
 
-# Create your tests here.
+def make_product(seller, category, title='Used bicycle', images=2, **kwargs):
+    product = Product.objects.create(
+        seller=seller, category=category, title=title, description='Good condition',
+        price='1200.00', location='Pune', **kwargs
+    )
+    for i in range(images):
+        ProductImage.objects.create(product=product, image=f'products/{title}-{i}.jpg', is_primary=i == 0)
+    return product
+
+class ListQueryCountTests(QueryCountAssertions, TestCase):
+    """List endpoints must issue the same number of queries whatever the page length"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', phone_number='9200000001', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', phone_number='9200000002', password='pass12345')
+        parent = Category.objects.create(name='Vehicles', slug='vehicles')
+        self.category = Category.objects.create(name='Cycles', slug='cycles', parent=parent)
+        Category.objects.create(name='Road bikes', slug='road-bikes', parent=self.category)
+        self.client = APIClient()
+
+    def add_rows(self, count):
+        for i in range(count):
+            product = make_product(self.seller, self.category, title=f'Item {Product.objects.count()}')
+            Inquiry.objects.create(product=product, buyer=self.buyer, message='Still available?')
+
+    def test_product_list(self):
+        # COUNT, products with category and primary image
+        self.assertConstantQueries('/api/marketplace/products/', 2, self.add_rows)
+
+    def test_my_products(self):
+        self.client.force_authenticate(self.seller)
+        self.assertConstantQueries('/api/marketplace/my-products/', 2, self.add_rows)
+
+    def test_inquiries(self):
+        self.client.force_authenticate(self.buyer)
+        self.assertConstantQueries('/api/marketplace/inquiries/', 2, self.add_rows)
+
+class CategoryTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.vehicles = Category.objects.create(name='Vehicles', slug='vehicles')
+        self.cycles = Category.objects.create(name='Cycles', slug='cycles', parent=self.vehicles)
+        Category.objects.create(name='Road bikes', slug='road-bikes', parent=self.cycles)
+        Category.objects.create(name='Hidden', slug='hidden', parent=self.vehicles, is_active=False)
+        Category.objects.create(name='Electronics', slug='electronics')
+        self.client = APIClient()
+
+    def get_tree(self):
+        response = self.client.get('/api/marketplace/categories/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_tree_is_built_from_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            tree = self.get_tree()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_tree(), tree)
+
+        self.assertEqual([node['slug'] for node in tree], ['vehicles', 'electronics'])
+        self.assertEqual([node['slug'] for node in tree[0]['subcategories']], ['cycles'])
+        self.assertEqual(tree[0]['subcategories'][0]['subcategories'][0]['slug'], 'road-bikes')
+        self.assertEqual(tree[1]['subcategories'], [])
+
+    def test_save_and_delete_invalidate_the_tree(self):
+        self.get_tree()
+
+        Category.objects.create(name='Scooters', slug='scooters', parent=self.vehicles)
+        self.assertEqual([node['slug'] for node in self.get_tree()[0]['subcategories']], ['cycles', 'scooters'])
+
+        self.cycles.delete()
+        self.assertEqual([node['slug'] for node in self.get_tree()[0]['subcategories']], ['scooters'])
+
+    def test_lost_version_does_not_revive_an_old_tree(self):
+        get_category_tree()
+        Category.objects.filter(pk=self.cycles.pk).update(name='Bicycles')
+        cache.delete(response_cache.VERSION_KEY.format('marketplace.category'))
+        self.assertEqual(get_category_tree()[0]['subcategories'][0]['name'], 'Bicycles')
+
+@override_settings(VIEW_COUNT_FLUSH_INTERVAL=3600)
+class ProductViewCountTests(TestCase):
+    def setUp(self):
+        product_views.flush()
+        seller = User.objects.create_user(username='seller', phone_number='9200000001', password='pass12345')
+        category = Category.objects.create(name='Cycles', slug='cycles')
+        self.product = make_product(seller, category, views_count=10)
+        self.other = make_product(seller, category, title='Helmet')
+        self.client = APIClient()
+
+    def test_detail_reads_do_not_write(self):
+        url = f'/api/marketplace/products/{self.product.id}/'
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url).data['views_count'], 11)
+        self.assertEqual(self.client.get(url).data['views_count'], 12)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views_count, 10)
+
+    def test_flush_applies_pending_counts_in_one_update(self):
+        for _ in range(3):
+            self.client.get(f'/api/marketplace/products/{self.product.id}/')
+        self.client.get(f'/api/marketplace/products/{self.other.id}/')
+        Product.objects.filter(pk=self.product.pk).update(views_count=20)
+
+        # A single UPDATE, wrapped in a savepoint
+        with self.assertNumQueries(3):
+            self.assertEqual(product_views.flush(), 2)
+
+        self.product.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.product.views_count, self.other.views_count), (23, 1))
+        self.assertEqual(product_views.pending(self.product.pk), 0)
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=0)
+    def test_due_flush_happens_on_read(self):
+        response = self.client.get(f'/api/marketplace/products/{self.product.id}/')
+
+        self.assertEqual(response.data['views_count'], 11)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views_count, 11)
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=0)
+    def test_failed_flush_is_logged_and_retried(self):
+        url = f'/api/marketplace/products/{self.product.id}/'
+        with mock.patch('marketplace.view_counter.transaction.atomic', side_effect=DatabaseError):
+            with self.assertLogs('marketplace.view_counter', 'ERROR'):
+                self.assertEqual(self.client.get(url).data['views_count'], 11)
+        self.assertEqual(product_views.pending(self.product.pk), 1)
+
+        self.assertEqual(self.client.get(url).data['views_count'], 12)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views_count, 12)
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', phone_number='9200000001', password='pass12345')
+        category = Category.objects.create(name='Cycles', slug='cycles')
+        products = [make_product(self.seller, category, title=f'Item {i}', images=0) for i in range(7)]
+        # Force timestamp ties so ordering has to fall back to id
+        Product.objects.filter(pk__in=[p.pk for p in products[2:5]]).update(created_at=products[2].created_at)
+        self.expected = list(Product.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.client = APIClient()
+
+    def walk(self, url):
+        seen, next_url = [], url
+        while next_url:
+            with self.assertNumQueries(1):  # one page of products; no COUNT
+                response = self.client.get(next_url)
+            self.assertNotIn('count', response.data)
+            seen.extend(p['id'] for p in response.data['results'])
+            next_url = response.data['next']
+        return seen
+
+    def test_cursor_walks_every_product_once_in_order(self):
+        self.assertEqual(self.walk('/api/marketplace/products/?cursor=&page_size=3'), self.expected)
+
+    def test_my_products_feed(self):
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.walk('/api/marketplace/my-products/?cursor=&page_size=2'), self.expected)
+
+    def test_page_numbers_still_work_without_cursor(self):
+        response = self.client.get('/api/marketplace/products/')
+        self.assertEqual(response.data['count'], 7)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/marketplace/products/', {'cursor': 'garbage'}).status_code, 404)
+
+class QueryPlanTests(QueryPlanAssertions, TestCase):
+    """Every list view filter must be served by an index rather than a full table scan"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', phone_number='9200000001', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', phone_number='9200000002', password='pass12345')
+        category = Category.objects.create(name='Cycles', slug='cycles')
+        for i in range(5):
+            product = make_product(self.seller, category, title=f'Item {i}', images=1)
+            Inquiry.objects.create(product=product, buyer=self.buyer, message='Still available?')
+        self.client = APIClient()
+
+    def test_product_list(self):
+        self.assertNoFullScans('/api/marketplace/products/')
+        self.assertNoFullScans('/api/marketplace/products/', {'cursor': ''})
+
+    def test_product_filters(self):
+        self.assertNoFullScans('/api/marketplace/products/', {'category': 'cycles'})
+        self.assertNoFullScans('/api/marketplace/products/', {'min_price': '100', 'max_price': '2000'})
+
+    def test_my_products(self):
+        self.client.force_authenticate(self.seller)
+        self.assertNoFullScans('/api/marketplace/my-products/')
+
+    def test_inquiries(self):
+        self.client.force_authenticate(self.buyer)
+        self.assertNoFullScans('/api/marketplace/inquiries/')
+
+class PrimaryImageTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', phone_number='9200000001', password='pass12345')
+        self.category = Category.objects.create(name='Cycles', slug='cycles')
+        self.product = make_product(self.seller, self.category, images=2)
+        self.first, self.second = self.product.images.order_by('id')
+
+    def primary(self):
+        self.product.refresh_from_db()
+        return self.product.primary_image_id
+
+    def test_first_image_becomes_primary(self):
+        self.assertEqual(self.primary(), self.first.pk)
+
+    def test_new_primary_demotes_the_old_one(self):
+        third = ProductImage.objects.create(product=self.product, image='products/c.jpg', is_primary=True)
+        self.assertEqual(self.primary(), third.pk)
+        self.assertEqual(list(self.product.images.filter(is_primary=True)), [third])
+
+    def test_deleting_the_primary_promotes_the_oldest_remaining(self):
+        self.first.delete()
+        self.assertEqual(self.primary(), self.second.pk)
+        self.second.refresh_from_db()
+        self.assertTrue(self.second.is_primary)
+        self.second.delete()
+        self.assertIsNone(self.primary())
+
+    def test_list_returns_only_the_primary_image_and_detail_all(self):
+        client = APIClient()
+        card = client.get('/api/marketplace/products/').data['results'][0]
+        self.assertEqual(card['primary_image']['id'], self.first.pk)
+        self.assertNotIn('images', card)
+        self.assertNotIn('seller', card)
+        self.assertEqual(card['category'], 'cycles')
+        detail = client.get(f'/api/marketplace/products/{self.product.pk}/').data
+        self.assertEqual(len(detail['images']), 2)
+
+@override_settings(VIEW_COUNT_FLUSH_INTERVAL=3600)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        product_views.flush()
+        self.seller = User.objects.create_user(username='seller', phone_number='9200000001', password='pass12345')
+        self.category = Category.objects.create(name='Cycles', slug='cycles')
+        self.product = make_product(self.seller, self.category)
+        self.client = APIClient()
+
+    def test_anonymous_list_is_served_from_cache(self):
+        first = self.client.get('/api/marketplace/products/', {'category': 'cycles', 'page_size': 5})
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/marketplace/products/', {'page_size': 5, 'category': 'cycles'})
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_matching_etag_gets_304(self):
+        etag = self.client.get('/api/marketplace/products/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/marketplace/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_lost_versions_do_not_revive_old_etags(self):
+        etag = self.client.get('/api/marketplace/products/')['ETag']
+        # A restart or eviction loses the counters along with the pages
+        cache.clear()
+        response = self.client.get('/api/marketplace/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_wildcard_etag_does_not_hide_missing_products(self):
+        response = self.client.get('/api/marketplace/products/99999/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+    def test_product_and_image_writes_invalidate(self):
+        etag = self.client.get('/api/marketplace/products/')['ETag']
+        make_product(self.seller, self.category, title='Helmet')
+        response = self.client.get('/api/marketplace/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+        etag = response['ETag']
+        ProductImage.objects.create(product=self.product, image='products/new.jpg', is_primary=True)
+        response = self.client.get('/api/marketplace/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][1]['primary_image']['image'], 'http://testserver/media/products/new.jpg')
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.get('/api/marketplace/products/')
+        self.client.force_authenticate(self.seller)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/marketplace/products/')
+        self.assertNotIn('ETag', response)
+
+    def test_cached_detail_still_counts_views(self):
+        url = f'/api/marketplace/products/{self.product.id}/'
+        self.assertEqual(self.client.get(url).data['views_count'], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data['views_count'], 2)
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A flush moves the pending count into the row and retires the cached page
+        product_views.flush()
+        self.assertEqual(self.client.get(url).data['views_count'], 5)
+
+    def test_detail_without_views_count_field(self):
+        response = self.client.get(f'/api/marketplace/products/{self.product.id}/', {'fields': 'id,title'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'id': self.product.id, 'title': 'Used bicycle'})
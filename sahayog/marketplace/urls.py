@@ -1,4 +1,5 @@
 from django.urls import path
+from bulk.views import BulkImportView, BulkExportView
 from .views import (
     CategoryListView, ProductListCreateView, ProductDetailView,
     MyProductsView, InquiryListCreateView
@@ -8,6 +9,8 @@ urlpatterns = [
     path('categories/', CategoryListView.as_view(), name='category-list'),
     path('products/', ProductListCreateView.as_view(), name='product-list-create'),
     path('products/<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
+    path('products/import/', BulkImportView.as_view(label='marketplace.product'), name='product-import'),
+    path('products/export/', BulkExportView.as_view(label='marketplace.product'), name='product-export'),
     path('my-products/', MyProductsView.as_view(), name='my-products'),
     path('inquiries/', InquiryListCreateView.as_view(), name='inquiry-list-create'),
 ]
\ No newline at end of file
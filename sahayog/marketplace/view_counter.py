@@ -0,0 +1,86 @@
+"""
+Buffered view counts. Detail views record a hit in memory and the pending totals
+are written back with one CASE/WHEN F()-expression UPDATE per batch once
+VIEW_COUNT_FLUSH_INTERVAL has passed, so reads no longer take the write lock.
+A failed flush keeps the counts for the next one and is logged rather than
+failing the read. Counts are per process, so what is still pending when the
+process exits is flushed then (VIEW_COUNT_FLUSH_AT_EXIT).
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, When, IntegerField
+from sahayog import response_cache
+from .models import Product
+
+logger = logging.getLogger(__name__)
+DEFAULT_FLUSH_INTERVAL = 60  # seconds
+FLUSH_BATCH_SIZE = 500
+
+class ViewCounter:
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def hit(self, pk):
+        """
+        Record one view and return the views for pk not yet persisted when this
+        call started, i.e. what to add to a views_count read before the hit
+        """
+        with self._lock:
+            self._pending[pk] += 1
+            pending = self._pending[pk]
+        interval = getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush_quietly()
+        return pending
+
+    def pending(self, pk):
+        return self._pending.get(pk, 0)
+
+    def flush(self):
+        """Write pending counts to the database; returns the number of rows updated"""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        items = list(pending.items())
+        updated = 0
+        try:
+            with transaction.atomic():
+                for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                    batch = items[start:start + FLUSH_BATCH_SIZE]
+                    increment = Case(*[When(pk=pk, then=count) for pk, count in batch], output_field=IntegerField())
+                    updated += self.model.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                        **{self.field: F(self.field) + increment}
+                    )
+        except Exception:
+            # Put the counts back so a failed flush is retried rather than lost
+            with self._lock:
+                self._pending.update(pending)
+            raise
+        # Cached detail pages carry the persisted count
+        response_cache.bump(self.cache_scope)
+        return updated
+
+    def flush_quietly(self):
+        """flush() for callers that must not fail; errors are logged"""
+        try:
+            return self.flush()
+        except Exception:
+            logger.exception('Could not flush %s counts', self.cache_scope)
+            return 0
+
+    @property
+    def cache_scope(self):
+        return f'{self.model._meta.label_lower}.{self.field}'
+
+product_views = ViewCounter(Product, 'views_count')
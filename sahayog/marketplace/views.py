@@ -1,39 +1,57 @@
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
-from django.db.models import Q
+from sahayog.conditional import ConditionalGetMixin
+from sahayog.pagination import KeysetPagination
+from sahayog.response_cache import CachedResponseMixin
+from search.index import filter_by_search
+from .category_tree import get_category_tree
 from .models import Category, Product, ProductImage, Inquiry
-from .serializers import CategorySerializer, ProductSerializer, ProductCreateSerializer, InquirySerializer
+from .view_counter import product_views
+from .serializers import (
+    CategorySerializer, ProductSerializer, ProductListSerializer, ProductCreateSerializer, InquirySerializer
+)
 
-class CategoryListView(generics.ListAPIView):
+CATALOGUE_SCOPES = ('marketplace.product', 'marketplace.productimage', 'marketplace.category')
+
+class CategoryListView(CachedResponseMixin, generics.ListAPIView):
     queryset = Category.objects.filter(is_active=True, parent__isnull=True)
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
+    cache_scopes = ('marketplace.category',)
+    
+    def list(self, request, *args, **kwargs):
+        # Served from the cached tree; the queryset is only kept for schema/introspection
+        tree = get_category_tree(request)
+        page = self.paginate_queryset(tree)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(tree)
 
-class ProductListCreateView(generics.ListCreateAPIView):
+class ProductListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    cache_scopes = CATALOGUE_SCOPES
+    
+    @property
+    def keyset_fields(self):
+        # Relevance-ranked search results cannot be seeked by timestamp
+        return None if self.request.query_params.get('search') else ('created_at', 'id')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return ProductCreateSerializer
-        return ProductSerializer
+        return ProductListSerializer
     
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True)
+        # Cards only show the primary image; the full set is on the detail endpoint
+        queryset = Product.objects.filter(is_active=True).select_related('category', 'primary_image')
         
         # Filter by category
         category = self.request.query_params.get('category')
         if category:
             queryset = queryset.filter(category__slug=category)
         
-        # Search
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search)
-            )
-        
         # Filter by price range
         min_price = self.request.query_params.get('min_price')
         max_price = self.request.query_params.get('max_price')
@@ -47,41 +65,57 @@ class ProductListCreateView(generics.ListCreateAPIView):
         if condition:
             queryset = queryset.filter(condition=condition)
         
-        return queryset.order_by('-created_at')
+        # Search results are ranked by relevance instead of recency
+        search = self.request.query_params.get('search')
+        if search:
+            return filter_by_search(queryset, search)
+        
+        return queryset.order_by('-created_at', '-id')
     
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user)
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Product.objects.filter(is_active=True)
+class ProductDetailView(CachedResponseMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Product.objects.filter(is_active=True).select_related('seller', 'category').prefetch_related('images')
     serializer_class = ProductSerializer
+    cache_scopes = (*CATALOGUE_SCOPES, product_views.cache_scope)
+    last_modified_related = ('seller',)
     
     def get_permissions(self):
         if self.request.method == 'GET':
             return [permissions.AllowAny()]
         return [permissions.IsAuthenticated()]
     
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        # Increment views count
-        instance.views_count += 1
-        instance.save(update_fields=['views_count'])
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+    def get(self, request, *args, **kwargs):
+        # The page, cached or not, has the persisted count; the hit is counted either way
+        response = super().get(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            # Views are buffered and flushed in batches; report persisted plus pending
+            pending = product_views.hit(int(kwargs['pk']))
+            # ?fields= may leave the count out
+            if response.status_code == status.HTTP_200_OK and 'views_count' in response.data:
+                response.data = {**response.data, 'views_count': response.data['views_count'] + pending}
+        return response
 
 class MyProductsView(generics.ListAPIView):
-    serializer_class = ProductSerializer
+    serializer_class = ProductListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_fields = ('created_at', 'id')
     
     def get_queryset(self):
-        return Product.objects.filter(seller=self.request.user).order_by('-created_at')
+        return Product.objects.filter(seller=self.request.user).select_related(
+            'category', 'primary_image'
+        ).order_by('-created_at', '-id')
 
 class InquiryListCreateView(generics.ListCreateAPIView):
     serializer_class = InquirySerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Inquiry.objects.filter(buyer=self.request.user).order_by('-created_at')
+        return Inquiry.objects.filter(buyer=self.request.user).select_related(
+            'buyer', 'product__category', 'product__primary_image'
+        ).order_by('-created_at')
     
     def perform_create(self, serializer):
         serializer.save(buyer=self.request.user)
\ No newline at end of file
@@ -1,4 +1,3 @@
-# sahayog/asgi.py
 import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
@@ -6,11 +5,17 @@ from channels.auth import AuthMiddlewareStack
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sahayog.settings')
 
+# Initialise Django before importing code that touches models
+django_asgi_app = get_asgi_application()
+
+from accounts.middleware import JWTAuthMiddleware
+import transport.routing
+
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
-        URLRouter([
-            # WebSocket URL patterns will be added here
-        ])
+        JWTAuthMiddleware(
+            URLRouter(transport.routing.websocket_urlpatterns)
+        )
     ),
 })
\ No newline at end of file
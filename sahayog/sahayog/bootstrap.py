@@ -0,0 +1,111 @@
+"""
+Everything the app needs after login, in one response: the user, their
+profiles, active vehicles, the ride in flight and recent cooperative orders.
+
+Built read-only in a fixed number of queries and cached per user. Saves of
+any row the payload is built from bump the user's version (track() connects
+the signals, bump_users() covers queryset updates), which retires both the
+cached payload and its ETag. BOOTSTRAP_CACHE_TIMEOUT bounds how stale the
+aggregates written without save() (ratings, flushed locations) can get.
+"""
+import hashlib
+import time
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils.http import quote_etag
+from . import response_cache
+
+DEFAULT_CACHE_TIMEOUT = 60
+DEFAULT_RECENT_ORDERS = 5
+SCOPE = 'bootstrap:user:{}'
+
+def bump_users(*user_ids):
+    for user_id in {user_id for user_id in user_ids if user_id is not None}:
+        response_cache.bump(SCOPE.format(user_id))
+
+def _bump_owners(sender, instance, user_fields, **kwargs):
+    user_ids = [getattr(instance, field) for field in user_fields]
+    bump_users(*user_ids)
+    transaction.on_commit(partial(bump_users, *user_ids))
+
+def track(model, *user_fields):
+    """Bump the bootstrap of the users whose ids are in user_fields whenever a model row changes"""
+    handler = partial(_bump_owners, user_fields=user_fields)
+    uid = f'bootstrap:{model._meta.label_lower}'
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+
+def build(request, user_id):
+    from accounts.models import User
+    from accounts.serializers import (
+        UserSerializer, UserProfileSerializer, CooperativeMemberSerializer,
+    )
+    from cooperative.models import CooperativeOrder
+    from cooperative.serializers import CooperativeOrderSerializer
+    from transport.models import Vehicle, Ride
+    from transport.serializers import DriverProfileSerializer, VehicleSerializer, RideSerializer
+
+    context = {'request': request}
+    user = User.objects.select_related('profile', 'cooperative_profile', 'driver_profile').get(pk=user_id)
+
+    def one_to_one(name, serializer_class):
+        obj = getattr(user, name, None)
+        if obj is None:
+            return None
+        data = serializer_class(obj, context=context).data
+        # The user is already at the top level
+        data.pop('user', None)
+        return data
+
+    data = {
+        'user': UserSerializer(user, context=context).data,
+        'profile': one_to_one('profile', UserProfileSerializer),
+        'cooperative_profile': one_to_one('cooperative_profile', CooperativeMemberSerializer),
+        'driver_profile': None,
+        'vehicles': [],
+        'active_ride': None,
+        'recent_orders': [],
+    }
+
+    if user.user_type == 'driver':
+        data['driver_profile'] = one_to_one('driver_profile', DriverProfileSerializer)
+        vehicles = Vehicle.objects.filter(driver=user, is_active=True).select_related('driver').order_by('-created_at')
+        data['vehicles'] = VehicleSerializer(vehicles, many=True, context=context).data
+        rides = Ride.objects.filter(driver=user, status__in=Ride.ACTIVE_STATUSES)
+    else:
+        rides = Ride.objects.filter(customer=user, status__in=('requested', *Ride.ACTIVE_STATUSES))
+    ride = rides.select_related('customer', 'driver', 'vehicle__driver').order_by('-requested_at', '-id').first()
+    if ride is not None:
+        data['active_ride'] = RideSerializer(ride, context=context).data
+
+    limit = getattr(settings, 'BOOTSTRAP_RECENT_ORDERS', DEFAULT_RECENT_ORDERS)
+    orders = CooperativeOrder.objects.filter(buyer=user).select_related(
+        'buyer', 'product__primary_image'
+    ).order_by('-ordered_at', '-id')[:limit]
+    data['recent_orders'] = CooperativeOrderSerializer(orders, many=True, context=context).data
+    return data
+
+def cache_key(request):
+    """(cache key, ETag) for request.user's payload; both change whenever their rows do"""
+    user_id = request.user.pk
+    version, = response_cache.versions([SCOPE.format(user_id)])
+    timeout = getattr(settings, 'BOOTSTRAP_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT)
+    # URLs in the payload are absolute, so the host is part of the key, and ?fields= applies to
+    # every section. The time slot retires ETags as the cached payload expires.
+    raw = repr((
+        user_id, version, request.build_absolute_uri('/'), request.META.get('QUERY_STRING', ''),
+        int(time.time() // timeout),
+    ))
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f'bootstrap:{digest}', quote_etag(digest)
+
+def load(request, key):
+    """request.user's payload, from the cache when their rows have not changed"""
+    data = cache.get(key)
+    if data is None:
+        data = build(request, request.user.pk)
+        cache.set(key, data, getattr(settings, 'BOOTSTRAP_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+    return data
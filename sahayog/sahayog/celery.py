@@ -0,0 +1,31 @@
+import logging
+import os
+from celery import Celery
+from django.db import DatabaseError, transaction
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sahayog.settings')
+
+logger = logging.getLogger(__name__)
+
+app = Celery('sahayog')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+
+# Connects the latency metric signal handlers in every process that loads the app
+import sahayog.task_metrics  # noqa: E402,F401
+
+# Side-effect tasks are idempotent, so transient database errors are simply retried
+RETRY_POLICY = {
+    'autoretry_for': (DatabaseError,),
+    'retry_backoff': True,
+    'retry_kwargs': {'max_retries': 5},
+}
+
+def enqueue_on_commit(task, *args):
+    """Queue task once the current transaction commits; a broker outage is logged, not raised"""
+    def send():
+        try:
+            task.delay(*args)
+        except Exception:
+            logger.exception('Failed to queue %s%r', task.name, args)
+    transaction.on_commit(send)
@@ -0,0 +1,84 @@
+"""
+Conditional GET from updated_at columns.
+
+The validators are derived from the resource's last-modified time (plus
+the query string, since ?fields= and ?expand= change the body), so a client
+re-fetching an unchanged resource with If-None-Match or If-Modified-Since
+gets a 304 before anything is serialized. Writes that bypass save() must
+set updated_at themselves for this to hold.
+"""
+import hashlib
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+def make_etag(request, *parts):
+    raw = repr((request.path, request.META.get('QUERY_STRING', ''), parts))
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+def not_modified(request, etag, last_modified):
+    """A 304 Response when the request's validators still match, else None"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        matched = etag in parse_etags(if_none_match)
+    else:
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        matched = since is not None and last_modified is not None and int(last_modified.timestamp()) <= since
+    if not matched:
+        return None
+    return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+def conditional_get(request, last_modified, render, *etag_parts):
+    """
+    Response for a GET of a resource last changed at last_modified: a 304 when
+    the client's copy is current, else render() with ETag and Last-Modified.
+    """
+    etag = make_etag(request, last_modified, *etag_parts)
+    return not_modified(request, etag, last_modified) or set_validators(render(), etag, last_modified)
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified on retrieve views, from the object's last_modified_field
+    and that of each related object the body nests (last_modified_related,
+    dotted paths such as 'vehicle.driver')
+    """
+    last_modified_field = 'updated_at'
+    last_modified_related = ()
+
+    def get_object(self):
+        # The validators already loaded the object for this request
+        if getattr(self, '_conditional_object', None) is not None:
+            return self._conditional_object
+        return super().get_object()
+
+    def related_last_modified(self, obj):
+        stamps = []
+        for path in self.last_modified_related:
+            related = obj
+            for name in path.split('.'):
+                related = getattr(related, name) if related is not None else None
+            stamps.append(getattr(related, self.last_modified_field) if related is not None else None)
+        return stamps
+
+    def get_last_modified(self, obj):
+        stamps = [getattr(obj, self.last_modified_field), *self.related_last_modified(obj)]
+        return max(stamp for stamp in stamps if stamp is not None)
+
+    def get_etag_parts(self, obj):
+        """Anything besides the timestamp the representation depends on"""
+        # A related row swapped for an older one leaves the maximum unchanged
+        return (obj.pk, *self.related_last_modified(obj))
+
+    def retrieve(self, request, *args, **kwargs):
+        obj = self._conditional_object = self.get_object()
+        return conditional_get(
+            request, self.get_last_modified(obj),
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+            *self.get_etag_parts(obj),
+        )
@@ -0,0 +1,75 @@
+import base64
+from datetime import datetime
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset mode for newest-first feeds.
+
+    Views declare keyset_fields = (timestamp_field, 'id'). A request carrying
+    ?cursor= (empty for the first page) is served by seeking past the last
+    (timestamp, id) seen instead of COUNT(*) plus OFFSET, so deep pages cost the
+    same as the first. Keyset responses only have 'next' and 'results'.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        fields = getattr(view, 'keyset_fields', None)
+        self.keyset = fields is not None and self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        timestamp_field, id_field = fields
+        queryset = queryset.order_by(f'-{timestamp_field}', f'-{id_field}')
+
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            timestamp, last_id = self.decode_cursor(cursor)
+            # The plain <= bound gives the planner an index range; the OR breaks timestamp ties by id
+            queryset = queryset.filter(**{f'{timestamp_field}__lte': timestamp}).filter(
+                Q(**{f'{timestamp_field}__lt': timestamp}) |
+                Q(**{timestamp_field: timestamp, f'{id_field}__lt': last_id})
+            )
+
+        page_size = self.get_page_size(request)
+        rows = list(queryset[:page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = None
+        if len(rows) > page_size:
+            last = page[-1]
+            self.next_cursor = self.encode_cursor(getattr(last, timestamp_field), getattr(last, id_field))
+        return page
+
+    def encode_cursor(self, timestamp, last_id):
+        return base64.urlsafe_b64encode(f'{timestamp.isoformat()}|{last_id}'.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            timestamp, last_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(timestamp), int(last_id)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
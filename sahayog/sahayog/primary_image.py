@@ -0,0 +1,42 @@
+"""
+Denormalised primary image for product models.
+
+A product's images have at most one is_primary row (a partial unique
+constraint), and the product's primary_image points at it, so list pages
+render a card from the product row alone. Saving an image as primary demotes
+the old one; when the primary is deleted or demoted the oldest remaining
+image takes over.
+
+    connect(ProductImage)
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.utils import timezone
+
+def sync_primary_image(image_model, product_id):
+    """Make sure product_id has exactly one primary image if it has any, and point the product at it"""
+    images = image_model._default_manager.filter(product_id=product_id)
+    primary = images.filter(is_primary=True).values_list('pk', flat=True).first()
+    if primary is None:
+        primary = images.order_by('created_at', 'pk').values_list('pk', flat=True).first()
+        if primary is not None:
+            images.filter(pk=primary).update(is_primary=True)
+    product_model = image_model._meta.get_field('product').related_model
+    # The images are part of the product's representation, so its updated_at moves too;
+    # a queryset update leaves the product's own signals alone
+    product_model._default_manager.filter(pk=product_id).update(primary_image_id=primary, updated_at=timezone.now())
+
+def _demote_others(sender, instance, raw=False, **kwargs):
+    if instance.is_primary and not raw:
+        sender._default_manager.filter(product_id=instance.product_id, is_primary=True).exclude(
+            pk=instance.pk
+        ).update(is_primary=False)
+
+def _image_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_primary_image(sender, instance.product_id)
+
+def connect(image_model):
+    uid = f'primary_image:{image_model._meta.label_lower}'
+    pre_save.connect(_demote_others, sender=image_model, dispatch_uid=uid)
+    post_save.connect(_image_changed, sender=image_model, dispatch_uid=uid)
+    post_delete.connect(_image_changed, sender=image_model, dispatch_uid=uid)
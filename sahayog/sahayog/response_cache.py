@@ -0,0 +1,100 @@
+"""
+Response cache for anonymous catalogue reads.
+
+Views list the scopes their output depends on, named after model labels
+('marketplace.product'). Each scope has a version counter in the cache, and
+writes bump it (track() connects the signals; queryset updates bump by hand).
+The versions are part of every cache key and ETag, so a write retires all
+cached pages and ETags of the views that depend on it without deleting
+anything. Only incr/get_many/set are used, which the local-memory and Redis
+backends both provide atomically. Counters start from a random value, so a
+counter lost to a restart or eviction never comes back as a version some
+client still holds an ETag for.
+
+A request whose If-None-Match matches the current ETag gets a 304 without
+the cached page being read.
+"""
+import hashlib
+import secrets
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+DEFAULT_TIMEOUT = 5 * 60
+VERSION_KEY = 'response_cache:version:{}'
+
+def _seed():
+    return secrets.randbits(48)
+
+def bump(scope):
+    key = VERSION_KEY.format(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _seed(), None)
+
+def versions(scopes):
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _seed() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+    return [found[key] if key in found else missing[key] for key in keys]
+
+def _bump_sender(sender, **kwargs):
+    scope = sender._meta.label_lower
+    bump(scope)
+    # Again once committed, in case a reader cached the old rows under the new version meanwhile
+    transaction.on_commit(partial(bump, scope))
+
+def track(*models):
+    for model in models:
+        uid = f'response_cache:{model._meta.label_lower}'
+        post_save.connect(_bump_sender, sender=model, dispatch_uid=uid)
+        post_delete.connect(_bump_sender, sender=model, dispatch_uid=uid)
+
+class CachedResponseMixin:
+    """
+    Serves anonymous GETs from the cache, keyed on the host, path and sorted
+    query parameters plus the versions of cache_scopes.
+    """
+    cache_scopes = ()
+    cache_timeout = None
+
+    def response_cacheable(self, request):
+        return not request.user.is_authenticated
+
+    def response_cache_key(self, request):
+        params = sorted((name, value) for name, values in request.query_params.lists() for value in values)
+        # Image URLs are absolute, so the host is part of the page
+        raw = repr((request.build_absolute_uri(request.path), params, versions(self.cache_scopes)))
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        if not self.response_cacheable(request):
+            return super().get(request, *args, **kwargs)
+        digest = self.response_cache_key(request)
+        etag = quote_etag(digest)
+        # No '*' shortcut: that would answer 304 for resources that do not exist
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = f'response_cache:page:{digest}'
+            data = cache.get(key)
+            if data is None:
+                response = super().get(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                timeout = self.cache_timeout or getattr(settings, 'RESPONSE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+                cache.set(key, response.data, timeout)
+            else:
+                response = Response(data)
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Authorization'])
+        return response
@@ -0,0 +1,75 @@
+"""
+Sparse fieldsets for read serializers.
+
+GET requests may name the fields they render, with dots reaching into nested
+serializers, and the relations they want in full:
+
+    /api/transport/rides/?fields=id,status,driver.username&expand=vehicle
+
+Serializers opt in with SparseFieldsetMixin and two optional Meta options:
+
+    expandable_fields = {'driver': UserSerializer}
+        The declared field is the slim form; the full serializer replaces it on
+        single-object responses, or in lists when asked for with ?expand=.
+    list_fields = ['id', ...]
+        What a list response renders by default; ?fields= and ?expand= add to it.
+
+Whether a response is a list is decided by the root serializer, so a vehicle
+nested in a list of rides renders its list form too.
+"""
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+def parse_fieldset(value):
+    """'id,driver.username,driver.id' -> {'id': {}, 'driver': {'username': {}, 'id': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+class SparseFieldsetMixin:
+    def _is_top_level(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def _requested_fieldset(self):
+        """(fields tree or None for all, expand tree) for this serializer"""
+        if hasattr(self, '_fieldset'):
+            return self._fieldset
+        request = self.context.get('request')
+        if not self._is_top_level() or request is None or request.method not in SAFE_METHODS:
+            return None, {}
+        params = request.query_params
+        only = parse_fieldset(params[FIELDS_PARAM]) if params.get(FIELDS_PARAM) else None
+        return only, parse_fieldset(params.get(EXPAND_PARAM, ''))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        meta = getattr(self, 'Meta', None)
+        only, expand = self._requested_fieldset()
+        listing = isinstance(self.root, serializers.ListSerializer)
+
+        for name, full in getattr(meta, 'expandable_fields', {}).items():
+            if name in fields and (not listing or name in expand):
+                kwargs = {'read_only': True}
+                if 'source' in fields[name]._kwargs:
+                    kwargs['source'] = fields[name]._kwargs['source']
+                fields[name] = full(**kwargs)
+
+        if only is None and listing and hasattr(meta, 'list_fields'):
+            only = {name: {} for name in (*meta.list_fields, *expand)}
+        if only is not None:
+            fields = {name: field for name, field in fields.items() if name in only}
+
+        # Hand each nested serializer its part of the request before it builds its own fields
+        for name, field in fields.items():
+            nested = getattr(field, 'child', field)
+            if isinstance(nested, SparseFieldsetMixin):
+                nested._fieldset = ((only.get(name) or None) if only else None, expand.get(name, {}))
+        return fields
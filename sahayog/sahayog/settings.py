@@ -1,5 +1,6 @@
 # sahayog/settings.py
 import os
+import sys
 from pathlib import Path
 from decouple import config
 
@@ -11,6 +12,7 @@ DEBUG = config('DEBUG', default=True, cast=bool)
 ALLOWED_HOSTS = ['localhost', '127.0.0.1', 'sahayog.techfest.org', 'www.sahayog.techfest.org' ]
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -25,6 +27,9 @@ INSTALLED_APPS = [
     'transport',
     'marketplace',
     'cooperative',
+    'search',
+    'imaging',
+    'bulk',
 ]
 
 MIDDLEWARE = [
@@ -64,6 +69,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file-backed test database lets concurrent-write tests wait on SQLite's
+        # lock instead of failing on shared-cache table locks
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -92,7 +100,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -107,6 +115,7 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.TokenRefreshSerializer',
 }
 
 CORS_ALLOWED_ORIGINS = [
@@ -125,4 +134,104 @@ CHANNEL_LAYERS = {
             'hosts': [('127.0.0.1', 6379)],
         },
     },
-}
\ No newline at end of file
+}
+
+# Celery: side effects (rating aggregates, dispatch, realtime fan-out, new
+# user profiles) run as tasks. Tests run them eagerly with an in-memory broker.
+# "manage.py test" sets test mode itself; DJANGO_TESTING turns it on (or off)
+# for other runners.
+TESTING = config('DJANGO_TESTING', default=sys.argv[1:2] == ['test'], cast=bool)
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://127.0.0.1:6379/1')
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=TESTING, cast=bool)
+if CELERY_TASK_ALWAYS_EAGER:
+    CELERY_BROKER_URL = 'memory://'
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BEAT_SCHEDULE = {
+    'sweep-dispatch': {'task': 'transport.tasks.sweep_dispatch', 'schedule': 5.0},
+}
+
+# Uploaded images get WebP and JPEG renditions no larger than these (pixels,
+# longer side); KYC documents and avatars use their own sizes (imaging.registry)
+IMAGE_RENDITION_SIZES = {'thumb': 240, 'medium': 640, 'large': 1280}
+
+# Live driver locations (transport.location_store). Use
+# 'transport.location_store.RedisLocationStore' with OPTIONS {'url': ...}
+# when running more than one worker process.
+LOCATION_STORE = {
+    'BACKEND': 'transport.location_store.InMemoryLocationStore',
+}
+LOCATION_FLUSH_INTERVAL = 30  # seconds
+LOCATION_FLUSH_BATCH_SIZE = 500
+
+# Unassigned ride requests older than this drop out of the drivers' open-ride feed
+OPEN_RIDE_MAX_AGE = 15 * 60  # seconds
+
+# Dispatch (transport.dispatch): new rides are offered to the nearest eligible
+# drivers, DISPATCH_WAVE_SIZE at a time, each wave open for DISPATCH_OFFER_TIMEOUT
+DISPATCH_ON_CREATE = True
+DISPATCH_RADIUS_KM = 5
+DISPATCH_WAVE_SIZE = 3
+DISPATCH_MAX_WAVES = 3
+DISPATCH_OFFER_TIMEOUT = 20  # seconds
+
+# Surge pricing (transport.surge): requests per online driver in each grid
+# cell over the last SURGE_WINDOW seconds, counted in SURGE_BUCKET slices
+SURGE_WINDOW = 10 * 60  # seconds
+SURGE_BUCKET = 60  # seconds
+SURGE_THRESHOLD = 1.0
+SURGE_SENSITIVITY = 0.25
+SURGE_MAX_MULTIPLIER = 2.5
+
+
+# Product search (search.index): 'fts5' (SQLite), 'memory' (pure-Python,
+# per process) or 'auto' to use FTS5 whenever the database supports it
+SEARCH_BACKEND = 'auto'
+SEARCH_MAX_RESULTS = 500
+
+# Product detail views are counted in memory and flushed this often, and
+# when the process exits (not under test, whose database is gone by then)
+VIEW_COUNT_FLUSH_INTERVAL = 60  # seconds
+VIEW_COUNT_FLUSH_AT_EXIT = not TESTING
+
+# Shared cache; set REDIS_CACHE_URL (e.g. redis://127.0.0.1:6379/2) when
+# running more than one process so cached pages and their versions are shared
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+    } if REDIS_CACHE_URL and not TESTING else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Token revocations (accounts.authentication) must reach every process and
+# must not be evicted before they expire, so they get their own cache: set
+# AUTH_CACHE_URL to a Redis running with maxmemory-policy noeviction. While
+# the cache is process-local every request reads the user row, unless
+# AUTH_SINGLE_PROCESS says one process serves them all.
+AUTH_CACHE_URL = config('AUTH_CACHE_URL', default='')
+CACHES['auth'] = {
+    'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+    'LOCATION': AUTH_CACHE_URL,
+} if AUTH_CACHE_URL and not TESTING else {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'auth',
+    'OPTIONS': {'MAX_ENTRIES': 1_000_000},
+}
+AUTH_SINGLE_PROCESS = config('AUTH_SINGLE_PROCESS', default=TESTING, cast=bool)
+
+# Anonymous catalogue pages (sahayog.response_cache) are cached this long at
+# most; writes retire them sooner
+RESPONSE_CACHE_TIMEOUT = 5 * 60  # seconds
+
+# Per-user bootstrap payload (sahayog.bootstrap)
+BOOTSTRAP_CACHE_TIMEOUT = 60  # seconds
+BOOTSTRAP_RECENT_ORDERS = 5
+
+# Bulk product import/export (bulk.transfer): rows per bulk_create, and the
+# largest file one import may hold
+BULK_IMPORT_CHUNK_SIZE = 500
+BULK_IMPORT_MAX_ROWS = 5000
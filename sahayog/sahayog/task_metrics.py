@@ -0,0 +1,93 @@
+"""
+Per-task latency metrics for the Celery pipeline.
+
+Publishing stamps each task with its enqueue time; workers then record the
+queue wait (enqueue to start) and run time of every task, and how often it
+failed or was retried. Totals live in the default cache so that web
+processes can read what the workers recorded when the cache is shared
+(e.g. Redis); with the local-memory cache each process sees only its own.
+Each total is its own key, bumped with cache.incr, so concurrent workers do
+not overwrite each other; times are kept in whole microseconds for that.
+The maxima are a read then a write, so two tasks finishing at once can keep
+the smaller of their times.
+"""
+import time
+from celery import current_app
+from celery.signals import before_task_publish, task_prerun, task_postrun, task_failure, task_retry
+from django.core.cache import cache
+
+CACHE_KEY = 'task_metrics:{}:{}'
+COUNTERS = ('count', 'failures', 'retries', 'total_runtime', 'total_wait')
+MAXIMA = ('max_runtime', 'max_wait')
+ENQUEUED_HEADER = 'enqueued_at'
+_started = {}
+
+def _update(task_name, **deltas):
+    for name, value in deltas.items():
+        key = CACHE_KEY.format(task_name, name)
+        if name in MAXIMA:
+            if value > cache.get(key, 0):
+                cache.set(key, value, None)
+        elif value:
+            cache.add(key, 0, None)
+            cache.incr(key, value)
+
+def _keys():
+    names = [name for name in current_app.tasks if not name.startswith('celery.')]
+    return {(name, metric): CACHE_KEY.format(name, metric) for name in names for metric in COUNTERS + MAXIMA}
+
+def snapshot():
+    """{task name: counts plus mean and max run time and queue wait, in milliseconds}"""
+    keys = _keys()
+    values = cache.get_many(keys.values())
+    entries = {}
+    for (task_name, metric), key in keys.items():
+        if key in values:
+            entries.setdefault(task_name, dict.fromkeys(COUNTERS + MAXIMA, 0))[metric] = values[key]
+    report = {}
+    for task_name, entry in entries.items():
+        count = entry['count'] or 1
+        report[task_name] = {
+            'count': entry['count'],
+            'failures': entry['failures'],
+            'retries': entry['retries'],
+            'mean_runtime_ms': round(entry['total_runtime'] / count / 1000, 2),
+            'max_runtime_ms': round(entry['max_runtime'] / 1000, 2),
+            'mean_wait_ms': round(entry['total_wait'] / count / 1000, 2),
+            'max_wait_ms': round(entry['max_wait'] / 1000, 2),
+        }
+    return report
+
+def reset():
+    cache.delete_many(_keys().values())
+
+@before_task_publish.connect
+def _stamp(headers=None, **kwargs):
+    if headers is not None:
+        headers[ENQUEUED_HEADER] = time.time()
+
+def _enqueued_at(request):
+    return getattr(request, ENQUEUED_HEADER, None) or (request.headers or {}).get(ENQUEUED_HEADER)
+
+@task_prerun.connect
+def _start(task_id=None, task=None, **kwargs):
+    # Eager tasks skip publishing and run at once, so they have no queue wait
+    enqueued = _enqueued_at(task.request)
+    _started[task_id] = (time.perf_counter(), time.time() - enqueued if enqueued else 0.0)
+
+@task_postrun.connect
+def _finish(task_id=None, task=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is None:
+        return
+    runtime = round((time.perf_counter() - started[0]) * 1e6)
+    wait = round(started[1] * 1e6)
+    _update(task.name, count=1, total_runtime=runtime, max_runtime=runtime, total_wait=wait, max_wait=wait)
+
+@task_failure.connect
+def _failed(sender=None, **kwargs):
+    _update(sender.name, failures=1)
+
+@task_retry.connect
+def _retried(sender=None, **kwargs):
+    _update(sender.name, retries=1)
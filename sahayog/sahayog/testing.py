@@ -0,0 +1,36 @@
+import re
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# 'SCAN tbl' / 'SCAN TABLE tbl' with no index behind it (older SQLite adds the TABLE keyword)
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+class QueryPlanAssertions:
+    """Test mixin checking the SQLite query plans of every statement an endpoint runs"""
+
+    def full_scans(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall() if FULL_SCAN.match(row[-1])]
+
+    def assertNoFullScans(self, url, params=None):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plans are only checked on SQLite')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        for query in queries.captured_queries:
+            if query['sql'].startswith('SELECT'):
+                self.assertEqual(self.full_scans(query['sql']), [], f"{url} {params or ''}: {query['sql']}")
+        return response
+
+class QueryCountAssertions:
+    """Test mixin for list endpoints whose query count must not grow with the page"""
+
+    def assertConstantQueries(self, url, expected, add_rows):
+        """GET url twice, each time after add_rows(3), expecting the same number of queries"""
+        for _ in range(2):
+            add_rows(3)
+            with self.assertNumQueries(expected):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
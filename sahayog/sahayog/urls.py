@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .views import bootstrap, task_metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -9,6 +10,8 @@ urlpatterns = [
     path('api/transport/', include('transport.urls')),
     path('api/marketplace/', include('marketplace.urls')),
     path('api/cooperative/', include('cooperative.urls')),
+    path('api/bootstrap/', bootstrap, name='bootstrap'),
+    path('api/ops/task-metrics/', task_metrics, name='task-metrics'),
 ]
 
 if settings.DEBUG:
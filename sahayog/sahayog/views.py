@@ -0,0 +1,21 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from . import bootstrap as user_bootstrap
+from . import task_metrics as metrics
+from .conditional import not_modified, set_validators
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def task_metrics(request):
+    """Celery task counts, failures, retries, run time and queue wait per task"""
+    return Response(metrics.snapshot())
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def bootstrap(request):
+    """Everything the app loads after login, in one round trip; 304 while none of it has changed"""
+    key, etag = user_bootstrap.cache_key(request)
+    return not_modified(request, etag, None) or set_validators(
+        Response(user_bootstrap.load(request, key)), etag, None
+    )
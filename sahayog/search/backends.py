@@ -0,0 +1,247 @@
+"""
+Inverted-index search backends.
+
+Documents have a short, heavily weighted title and a longer body. Both backends
+rank with field-weighted term statistics and treat every query term as a prefix,
+so "bana silk" finds "Banarasi Silk Saree".
+"""
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from django.db import connection
+from django.db.models import Case, When
+
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+# Word characters plus Indic vowel signs and viramas, which \w does not match
+TOKEN_RE = re.compile(r'(?:\w|[\u0900-\u0dff])+')
+LATIN_DIACRITICS_RE = re.compile(r'[\u0300-\u036f]')
+
+def tokenize(text):
+    """Case-folded terms with Latin diacritics removed, matching FTS5's unicode61 tokenizer"""
+    text = LATIN_DIACRITICS_RE.sub('', unicodedata.normalize('NFKD', text or '').casefold())
+    return TOKEN_RE.findall(text)
+
+class BaseSearchBackend:
+    def index(self, doc_type, pk, title, body):
+        raise NotImplementedError
+
+    def remove(self, doc_type, pk):
+        raise NotImplementedError
+
+    def search(self, doc_type, query, limit):
+        """Primary keys of the best matches for every query term (as prefixes), best first"""
+        raise NotImplementedError
+
+    def filter_queryset(self, queryset, doc_type, query, limit):
+        """
+        queryset restricted to matches and ordered best first. Whatever else
+        queryset filters on applies before limit, so it cannot crowd out matches.
+        """
+        raise NotImplementedError
+
+    def clear(self, doc_type):
+        raise NotImplementedError
+
+    def is_empty(self, doc_type):
+        raise NotImplementedError
+
+    def ensure(self, doc_type):
+        """Create any storage the document type needs; run outside transactions"""
+
+    def needs_rebuild(self, doc_type):
+        """True while the index does not hold every row yet; persistent indexes are built by rebuild_search_index"""
+        return False
+
+    def mark_built(self, doc_type):
+        """Called once every row of doc_type has been indexed"""
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """One FTS5 table per document type, keyed by the model's primary key as rowid"""
+
+    @staticmethod
+    def is_available():
+        if connection.vendor != 'sqlite':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            return any(option == 'ENABLE_FTS5' for option, in cursor.fetchall())
+
+    @staticmethod
+    def table_name(doc_type):
+        return 'search_' + doc_type.replace('.', '_')
+
+    @classmethod
+    def create_table_sql(cls, doc_type):
+        return (
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {cls.table_name(doc_type)} USING fts5("
+            "title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+
+    def _execute(self, doc_type, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql.format(table=self.table_name(doc_type)), params)
+            return cursor.fetchall()
+
+    def ensure(self, doc_type):
+        with connection.cursor() as cursor:
+            cursor.execute(self.create_table_sql(doc_type))
+
+    def index(self, doc_type, pk, title, body):
+        # Store pre-tokenized text so documents and queries are normalised the same way
+        title, body = ' '.join(tokenize(title)), ' '.join(tokenize(body))
+        self._execute(doc_type, 'DELETE FROM {table} WHERE rowid = %s', [pk])
+        self._execute(doc_type, 'INSERT INTO {table} (rowid, title, body) VALUES (%s, %s, %s)', [pk, title, body])
+
+    def remove(self, doc_type, pk):
+        self._execute(doc_type, 'DELETE FROM {table} WHERE rowid = %s', [pk])
+
+    @staticmethod
+    def match_expression(query):
+        # Quote each term so FTS5 operators in user input are taken literally
+        return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in tokenize(query))
+
+    def search(self, doc_type, query, limit):
+        match = self.match_expression(query)
+        if not match:
+            return []
+        rows = self._execute(
+            doc_type,
+            f'SELECT rowid FROM {{table}} WHERE {{table}} MATCH %s '
+            f'ORDER BY bm25({{table}}, {TITLE_WEIGHT}, {BODY_WEIGHT}) LIMIT %s',
+            [match, limit],
+        )
+        return [pk for pk, in rows]
+
+    def filter_queryset(self, queryset, doc_type, query, limit):
+        # Joined in SQL, so every match that passes the other filters is kept; pagination bounds the page.
+        # The join runs the MATCH once and ranks each match from it, which the ORM can only express with extra()
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        table = self.table_name(doc_type)
+        quote = connection.ops.quote_name
+        meta = queryset.model._meta
+        return queryset.extra(
+            tables=[table],
+            where=[f'{table}.rowid = {quote(meta.db_table)}.{quote(meta.pk.column)}', f'{table} MATCH %s'],
+            params=[match],
+            select={'search_rank': f'bm25({table}, {TITLE_WEIGHT}, {BODY_WEIGHT})'},
+        ).order_by('search_rank', 'pk')
+
+    def clear(self, doc_type):
+        self._execute(doc_type, 'DELETE FROM {table}')
+
+    def is_empty(self, doc_type):
+        return not self._execute(doc_type, 'SELECT rowid FROM {table} LIMIT 1')
+
+class InMemoryBackend(BaseSearchBackend):
+    """
+    Pure-Python fallback for databases without FTS5. The index lives in the
+    process, so it is rebuilt on first use and only sees writes made by this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = defaultdict(_Index)
+        # Saves index their row whether or not the rest has been loaded, so emptiness says nothing
+        self._built = set()
+
+    def index(self, doc_type, pk, title, body):
+        with self._lock:
+            self._indexes[doc_type].add(pk, tokenize(title), tokenize(body))
+
+    def remove(self, doc_type, pk):
+        with self._lock:
+            self._indexes[doc_type].remove(pk)
+
+    def search(self, doc_type, query, limit, among=None):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            return self._indexes[doc_type].search(terms, limit, among)
+
+    def filter_queryset(self, queryset, doc_type, query, limit):
+        # Rank only the rows the other filters let through
+        ids = self.search(doc_type, query, limit, among=set(queryset.values_list('pk', flat=True)))
+        if not ids:
+            return queryset.none()
+        ranking = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)])
+        return queryset.filter(pk__in=ids).order_by(ranking)
+
+    def clear(self, doc_type):
+        with self._lock:
+            self._indexes.pop(doc_type, None)
+            self._built.discard(doc_type)
+
+    def needs_rebuild(self, doc_type):
+        return doc_type not in self._built
+
+    def mark_built(self, doc_type):
+        self._built.add(doc_type)
+
+    def is_empty(self, doc_type):
+        return not self._indexes[doc_type].docs
+
+class _Index:
+    def __init__(self):
+        self.postings = defaultdict(dict)  # term -> {pk: weighted term frequency}
+        self.docs = {}  # pk -> terms, for removal
+        self._sorted_terms = None
+
+    def add(self, pk, title_terms, body_terms):
+        self.remove(pk)
+        weights = defaultdict(float)
+        for term in title_terms:
+            weights[term] += TITLE_WEIGHT
+        for term in body_terms:
+            weights[term] += BODY_WEIGHT
+        for term, weight in weights.items():
+            if term not in self.postings:
+                self._sorted_terms = None
+            self.postings[term][pk] = weight
+        self.docs[pk] = tuple(weights)
+
+    def remove(self, pk):
+        for term in self.docs.pop(pk, ()):
+            postings = self.postings[term]
+            postings.pop(pk, None)
+            if not postings:
+                del self.postings[term]
+                self._sorted_terms = None
+
+    def _expand(self, prefix):
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.postings)
+        terms = self._sorted_terms
+        i = bisect_left(terms, prefix)
+        while i < len(terms) and terms[i].startswith(prefix):
+            yield terms[i]
+            i += 1
+
+    def search(self, terms, limit, among=None):
+        """Best matches first; among, when given, is the set of primary keys allowed to match"""
+        total = len(self.docs)
+        scores = None
+        for prefix in terms:
+            term_scores = defaultdict(float)
+            for term in self._expand(prefix):
+                postings = self.postings[term]
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for pk, weight in postings.items():
+                    term_scores[pk] += idf * weight / (weight + 1.2)
+            # Every term has to match
+            if scores is None:
+                scores = term_scores if among is None else {
+                    pk: score for pk, score in term_scores.items() if pk in among
+                }
+            else:
+                scores = {pk: score + term_scores[pk] for pk, score in scores.items() if pk in term_scores}
+            if not scores:
+                return []
+        return sorted(scores, key=lambda pk: (-scores[pk], pk))[:limit]
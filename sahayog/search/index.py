@@ -0,0 +1,94 @@
+"""
+Search registry. Apps register a model with the fields that make up its title and
+body; saves and deletes keep the index in step through model signals.
+
+    register(Product, title=['title'], body=['description'])
+    ids = search(Product, 'silk saree')
+"""
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models.signals import post_save, post_delete
+from .backends import SQLiteFTSBackend, InMemoryBackend
+
+DEFAULT_MAX_RESULTS = 500
+
+_registry = {}
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        name = getattr(settings, 'SEARCH_BACKEND', 'auto')
+        if name == 'auto':
+            name = 'fts5' if SQLiteFTSBackend.is_available() else 'memory'
+        _backend = SQLiteFTSBackend() if name == 'fts5' else InMemoryBackend()
+    return _backend
+
+def register(model, title, body):
+    _registry[model] = (tuple(title), tuple(body))
+    uid = f'search:{model._meta.label_lower}'
+    post_save.connect(_index_instance, sender=model, dispatch_uid=uid)
+    post_delete.connect(_remove_instance, sender=model, dispatch_uid=uid)
+
+def registered_models():
+    return list(_registry)
+
+def _document(instance):
+    title, body = _registry[type(instance)]
+    return (
+        ' '.join(str(getattr(instance, field) or '') for field in title),
+        ' '.join(str(getattr(instance, field) or '') for field in body),
+    )
+
+def _index_instance(sender, instance, **kwargs):
+    get_backend().index(sender._meta.label_lower, instance.pk, *_document(instance))
+
+def index_objects(model, instances):
+    """Index rows written without save(), such as by bulk_create"""
+    if model not in _registry:
+        return
+    backend = get_backend()
+    for instance in instances:
+        backend.index(model._meta.label_lower, instance.pk, *_document(instance))
+
+def _remove_instance(sender, instance, **kwargs):
+    get_backend().remove(sender._meta.label_lower, instance.pk)
+
+def rebuild(model, batch_size=1000):
+    """Re-index every row of model; returns the number of documents indexed"""
+    backend = get_backend()
+    doc_type = model._meta.label_lower
+    title, body = _registry[model]
+    backend.clear(doc_type)
+    count = 0
+    for instance in model._default_manager.only('pk', *title, *body).iterator(chunk_size=batch_size):
+        backend.index(doc_type, instance.pk, *_document(instance))
+        count += 1
+    backend.mark_built(doc_type)
+    return count
+
+def search(model, query, limit=None):
+    """Primary keys of model rows matching query, best match first"""
+    backend = get_backend()
+    doc_type = model._meta.label_lower
+    if backend.needs_rebuild(doc_type):
+        # The in-process index starts empty in every worker
+        rebuild(model)
+    limit = limit or getattr(settings, 'SEARCH_MAX_RESULTS', DEFAULT_MAX_RESULTS)
+    return backend.search(doc_type, query, limit)
+
+def filter_by_search(queryset, query):
+    """Restrict queryset to search matches and order it by relevance"""
+    backend = get_backend()
+    doc_type = queryset.model._meta.label_lower
+    if backend.needs_rebuild(doc_type):
+        rebuild(queryset.model)
+    limit = getattr(settings, 'SEARCH_MAX_RESULTS', DEFAULT_MAX_RESULTS)
+    return backend.filter_queryset(queryset, doc_type, query, limit)
+
+def _reset_backend(setting, **kwargs):
+    global _backend
+    if setting == 'SEARCH_BACKEND':
+        _backend = None
+
+setting_changed.connect(_reset_backend)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from search.index import get_backend, registered_models, rebuild
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index from the database'
+
+    def handle(self, *args, **options):
+        for model in registered_models():
+            get_backend().ensure(model._meta.label_lower)
+            with transaction.atomic():
+                count = rebuild(model)
+            self.stdout.write(f'Indexed {count} {model._meta.verbose_name_plural}')
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
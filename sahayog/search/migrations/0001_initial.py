@@ -0,0 +1,37 @@
+from django.db import migrations
+
+from search.backends import SQLiteFTSBackend
+
+# Document types indexed by the marketplace and cooperative apps
+DOC_TYPES = ['marketplace.product', 'cooperative.cooperativeproduct']
+
+
+def fts_available(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(option == 'ENABLE_FTS5' for option, in cursor.fetchall())
+
+
+def create_fts_tables(apps, schema_editor):
+    if fts_available(schema_editor):
+        for doc_type in DOC_TYPES:
+            schema_editor.execute(SQLiteFTSBackend.create_table_sql(doc_type))
+
+
+def drop_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for doc_type in DOC_TYPES:
+            schema_editor.execute(f'DROP TABLE IF EXISTS {SQLiteFTSBackend.table_name(doc_type)}')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.RunPython(create_fts_tables, drop_fts_tables),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+from search.backends import SQLiteFTSBackend, tokenize
+
+# The title and body fields each app registers with search.index
+DOCUMENTS = {
+    'marketplace.product': (['title'], ['description']),
+    'cooperative.cooperativeproduct': (['name', 'craft_tradition'], ['description', 'materials_used']),
+}
+
+
+def table_exists(schema_editor, table):
+    return table in schema_editor.connection.introspection.table_names()
+
+
+def populate_fts_tables(apps, schema_editor):
+    # Rows saved before the tables existed were never indexed
+    for doc_type, (title, body) in DOCUMENTS.items():
+        table = SQLiteFTSBackend.table_name(doc_type)
+        if not table_exists(schema_editor, table):
+            continue
+        model = apps.get_model(doc_type)
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table}')
+            for row in model.objects.values_list('pk', *title, *body).iterator(chunk_size=1000):
+                cursor.execute(f'INSERT INTO {table} (rowid, title, body) VALUES (%s, %s, %s)', [
+                    row[0],
+                    ' '.join(tokenize(' '.join(str(value or '') for value in row[1:1 + len(title)]))),
+                    ' '.join(tokenize(' '.join(str(value or '') for value in row[1 + len(title):]))),
+                ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('marketplace', '0003_primary_image'),
+        ('cooperative', '0004_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_fts_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,119 @@
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.models import User
+from cooperative.models import CooperativeProduct
+from marketplace.models import Category, Product
+from .backends import InMemoryBackend, SQLiteFTSBackend, tokenize
+from .index import get_backend, search
+
+class TokenizeTests(TestCase):
+    def test_folds_case_and_latin_diacritics_but_keeps_indic_words_whole(self):
+        self.assertEqual(tokenize('Café POTTERY-set हस्तशिल्प'), ['cafe', 'pottery', 'set', 'हस्तशिल्प'])
+
+class BackendTestsMixin:
+    def test_prefix_matching_and_title_ranking(self):
+        backend = self.backend
+        backend.index('marketplace.product', 1, 'Cotton kurta', 'Dyed with banarasi patterns')
+        backend.index('marketplace.product', 2, 'Banarasi silk saree', 'Pure silk')
+        backend.index('marketplace.product', 3, 'Clay pot', 'Khurja pottery')
+
+        self.assertEqual(backend.search('marketplace.product', 'bana', 10), [2, 1])
+        self.assertEqual(backend.search('marketplace.product', 'bana silk', 10), [2])
+        self.assertEqual(backend.search('marketplace.product', 'pot', 10), [3])
+        self.assertEqual(backend.search('marketplace.product', '"*) OR', 10), [])
+
+    def test_reindex_and_remove(self):
+        backend = self.backend
+        backend.index('marketplace.product', 1, 'Clay pot', '')
+        backend.index('marketplace.product', 1, 'Brass lamp', '')
+        self.assertEqual(backend.search('marketplace.product', 'clay', 10), [])
+        self.assertEqual(backend.search('marketplace.product', 'brass', 10), [1])
+
+        backend.remove('marketplace.product', 1)
+        self.assertEqual(backend.search('marketplace.product', 'brass', 10), [])
+
+class SQLiteFTSBackendTests(BackendTestsMixin, TestCase):
+    def setUp(self):
+        if not SQLiteFTSBackend.is_available():
+            self.skipTest('SQLite FTS5 is not available')
+        self.backend = SQLiteFTSBackend()
+        self.backend.clear('marketplace.product')
+
+class InMemoryBackendTests(BackendTestsMixin, TestCase):
+    def setUp(self):
+        self.backend = InMemoryBackend()
+
+class ProductSearchTestsMixin:
+    def setUp(self):
+        get_backend().clear('marketplace.product')
+        get_backend().clear('cooperative.cooperativeproduct')
+        seller = User.objects.create_user(username='seller', phone_number='9400000001', password='pass12345')
+        category = Category.objects.create(name='Clothing', slug='clothing')
+        self.saree = Product.objects.create(
+            seller=seller, category=category, title='Banarasi silk saree', description='Wedding wear',
+            price='5000.00', location='Varanasi')
+        self.kurta = Product.objects.create(
+            seller=seller, category=category, title='Cotton kurta', description='Banarasi border',
+            price='900.00', location='Varanasi')
+        CooperativeProduct.objects.create(
+            artisan=seller, name='Clay pot', description='Cooking pot', product_type='pottery', price='300.00',
+            craft_tradition='Khurja pottery', origin_village='Khurja', materials_used='Clay', time_to_make='2 days')
+        self.client = APIClient()
+
+    def test_product_search_is_ranked(self):
+        response = self.client.get('/api/marketplace/products/', {'search': 'banar'})
+        self.assertEqual([p['id'] for p in response.data['results']], [self.saree.id, self.kurta.id])
+
+    def test_search_combines_with_filters(self):
+        response = self.client.get('/api/marketplace/products/', {'search': 'banarasi', 'max_price': 1000})
+        self.assertEqual([p['id'] for p in response.data['results']], [self.kurta.id])
+
+    @override_settings(SEARCH_MAX_RESULTS=1)
+    def test_filters_apply_before_the_result_cap(self):
+        # The saree outranks the kurta, but the price filter rules it out first
+        response = self.client.get('/api/marketplace/products/', {'search': 'banarasi', 'max_price': 1000})
+        self.assertEqual([p['id'] for p in response.data['results']], [self.kurta.id])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.saree.title = 'Chanderi saree'
+        self.saree.save()
+        self.assertEqual(search(Product, 'chanderi'), [self.saree.id])
+        self.saree.delete()
+        self.assertEqual(search(Product, 'saree'), [])
+
+    def test_cooperative_search(self):
+        response = self.client.get('/api/cooperative/products/', {'search': 'khurja'})
+        self.assertEqual([p['name'] for p in response.data['results']], ['Clay pot'])
+
+    def test_rebuild_command(self):
+        get_backend().clear('marketplace.product')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search(Product, 'kurta'), [self.kurta.id])
+
+@override_settings(SEARCH_BACKEND='fts5')
+class FTSProductSearchTests(ProductSearchTestsMixin, TestCase):
+    def setUp(self):
+        if not SQLiteFTSBackend.is_available():
+            self.skipTest('SQLite FTS5 is not available')
+        super().setUp()
+
+    def test_migration_indexes_existing_rows(self):
+        get_backend().clear('marketplace.product')
+        populate = import_module('search.migrations.0002_populate_fts_tables').populate_fts_tables
+        # The migration only reaches the database through schema_editor.connection
+        populate(django_apps, SimpleNamespace(connection=connection))
+        self.assertEqual(search(Product, 'kurta'), [self.kurta.id])
+
+@override_settings(SEARCH_BACKEND='memory')
+class InMemoryProductSearchTests(ProductSearchTestsMixin, TestCase):
+    def test_first_search_loads_rows_saved_by_other_processes(self):
+        # A fresh worker whose only indexed row is the one it saved itself
+        get_backend().clear('marketplace.product')
+        self.kurta.save()
+        self.assertEqual(search(Product, 'banarasi'), [self.saree.id, self.kurta.id])
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.utils import timezone
 from .models import Vehicle, DriverProfile, Ride, RideRating
 
 @admin.register(Vehicle)
@@ -15,14 +16,14 @@ class VehicleAdmin(admin.ModelAdmin):
 
 @admin.register(DriverProfile)
 class DriverProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'license_number', 'average_rating', 'total_rides', 'is_online', 'is_verified')
+    list_display = ('user', 'license_number', 'average_rating', 'rating_count', 'total_rides', 'is_online', 'is_verified')
     list_filter = ('is_online', 'is_verified')
     search_fields = ('user__username', 'license_number')
     
     actions = ['verify_drivers']
     
     def verify_drivers(self, request, queryset):
-        queryset.update(is_verified=True)
+        queryset.update(is_verified=True, updated_at=timezone.now())
     verify_drivers.short_description = "Verify selected drivers"
 
 @admin.register(Ride)
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class TransportConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'transport'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from imaging.registry import register, DOCUMENT_SIZES
+        from sahayog import bootstrap
+        from .models import Vehicle, DriverProfile, Ride
+        register(Vehicle, ['registration_doc', 'insurance_doc', 'permit_doc'], sizes=DOCUMENT_SIZES)
+        register(DriverProfile, ['license_doc', 'photo'], sizes=DOCUMENT_SIZES)
+        bootstrap.track(DriverProfile, 'user_id')
+        bootstrap.track(Vehicle, 'driver_id')
+        bootstrap.track(Ride, 'customer_id', 'driver_id')
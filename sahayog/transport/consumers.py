@@ -0,0 +1,81 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.db.models import Q
+from .models import Ride
+from .realtime import ride_group, driver_group, record_driver_location
+from .serializers import DriverLocationSerializer
+
+class RideConsumer(AsyncJsonWebsocketConsumer):
+    """Streams status changes and driver positions for one ride to its customer and driver"""
+    
+    async def connect(self):
+        self.group_name = None
+        ride_id = self.scope['url_route']['kwargs']['ride_id']
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated or not await self.is_participant(user, ride_id):
+            await self.close(code=4403)
+            return
+        
+        self.group_name = ride_group(ride_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+    
+    async def disconnect(self, code):
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+    
+    @database_sync_to_async
+    def is_participant(self, user, ride_id):
+        return Ride.objects.filter(Q(customer=user) | Q(driver=user), id=ride_id).exists()
+    
+    async def ride_status(self, event):
+        await self.send_json({'type': 'ride.status', 'ride': event['ride']})
+    
+    async def driver_location(self, event):
+        await self.send_json(event)
+
+class DriverLocationConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Accepts {latitude, longitude} pings from a driver and relays them to their
+    active rides; dispatch offers for the driver are pushed down the same socket.
+    """
+    
+    async def connect(self):
+        self.group_name = None
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated or user.user_type != 'driver':
+            await self.close(code=4403)
+            return
+        
+        self.user_id = user.id
+        self.active_rides = await self.load_active_rides()
+        self.group_name = driver_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+    
+    async def disconnect(self, code):
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+    
+    @database_sync_to_async
+    def load_active_rides(self):
+        return set(Ride.objects.filter(driver_id=self.user_id, status__in=Ride.ACTIVE_STATUSES).values_list('id', flat=True))
+    
+    async def receive_json(self, content, **kwargs):
+        serializer = DriverLocationSerializer(data=content)
+        if not serializer.is_valid():
+            await self.send_json({'type': 'error', 'errors': serializer.errors})
+            return
+        
+        await database_sync_to_async(record_driver_location)(
+            self.user_id, **serializer.validated_data, ride_ids=set(self.active_rides),
+        )
+    
+    async def ride_offer(self, event):
+        await self.send_json(event)
+    
+    async def ride_assignment(self, event):
+        if event['status'] in Ride.ACTIVE_STATUSES:
+            self.active_rides.add(event['ride_id'])
+        else:
+            self.active_rides.discard(event['ride_id'])
@@ -0,0 +1,228 @@
+"""
+Push-based ride dispatch.
+
+A new ride is offered to the nearest eligible drivers in waves. A wave ends
+when its offers expire (DISPATCH_OFFER_TIMEOUT) or every driver in it has
+declined, and the next wave goes to the next-nearest drivers not yet asked.
+Drivers still take the ride through accept_ride, so the first to accept wins.
+
+Waves only advance when sweep() runs, so production needs the Celery beat
+entry (transport.tasks.sweep_dispatch) or `manage.py dispatch_rides --loop`.
+Without it a ride stops after its first wave; expiry itself is read from
+expires_at, so an overdue offer never blocks its driver or ride meanwhile.
+
+dispatch_batch() instead matches many waiting rides at once, choosing one
+driver per ride so that the total pickup distance is as small as possible.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from .location_store import get_location_store
+from .models import Vehicle, Ride, RideOffer
+from .realtime import publish_ride_offers
+
+DEFAULT_WAVE_SIZE = 3
+DEFAULT_OFFER_TIMEOUT = 20  # seconds
+DEFAULT_MAX_WAVES = 3
+DEFAULT_RADIUS_KM = 5
+DEFAULT_OPEN_RIDE_MAX_AGE = 15 * 60  # seconds
+CANDIDATE_CHUNK = 200
+
+# Cost of an impossible ride/driver pairing in the batch assignment
+UNREACHABLE = 1e9
+
+Candidate = namedtuple('Candidate', 'driver_id vehicle_id distance')
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+def vehicles_for(ride):
+    """Active, verified vehicles of the type ride asked for with a seat for every passenger"""
+    vehicles = Vehicle.objects.filter(is_active=True, is_verified=True, seating_capacity__gte=ride.passengers)
+    if ride.vehicle_type:
+        vehicles = vehicles.filter(vehicle_type=ride.vehicle_type)
+    return vehicles
+
+def live_offers():
+    """Pending offers that have not expired yet, whether or not a sweep has run"""
+    return RideOffer.objects.filter(status='pending', expires_at__gt=timezone.now())
+
+def find_candidates(ride, exclude=(), limit=None, store=None):
+    """Drivers able to take ride, nearest pickup first, as Candidates"""
+    store = store or get_location_store()
+    radius = _setting('DISPATCH_RADIUS_KM', DEFAULT_RADIUS_KM)
+    nearby = [
+        (user_id, distance)
+        for user_id, _, _, distance in store.nearby(ride.pickup_latitude, ride.pickup_longitude, radius)
+        if user_id not in exclude
+    ]
+    candidates = []
+    # Checked nearest-first in chunks so a dense area does not build one huge IN clause
+    for start in range(0, len(nearby), CANDIDATE_CHUNK):
+        chunk = nearby[start:start + CANDIDATE_CHUNK]
+        vehicles = vehicles_for(ride).filter(
+            driver_id__in=[user_id for user_id, _ in chunk],
+            driver__driver_profile__is_online=True, driver__driver_profile__is_verified=True,
+        ).exclude(
+            driver__driver_rides__status__in=Ride.ACTIVE_STATUSES,
+        ).exclude(
+            driver__in=live_offers().values('driver_id'),
+        )
+        eligible = {}
+        for driver_id, vehicle_id in vehicles.order_by('id').values_list('driver_id', 'id'):
+            eligible.setdefault(driver_id, vehicle_id)
+        candidates.extend(
+            Candidate(user_id, eligible[user_id], distance) for user_id, distance in chunk if user_id in eligible
+        )
+        if limit and len(candidates) >= limit:
+            return candidates[:limit]
+    return candidates
+
+def _make_offers(ride, candidates, wave):
+    expires_at = timezone.now() + timedelta(seconds=_setting('DISPATCH_OFFER_TIMEOUT', DEFAULT_OFFER_TIMEOUT))
+    offers = RideOffer.objects.bulk_create([
+        RideOffer(
+            ride=ride, driver_id=candidate.driver_id, vehicle_id=candidate.vehicle_id, wave=wave,
+            pickup_distance_km=candidate.distance, expires_at=expires_at,
+        )
+        for candidate in candidates
+    ])
+    publish_ride_offers(ride, offers)
+    return offers
+
+def _is_open(ride):
+    return ride.status == 'requested' and ride.driver_id is None
+
+def offer_next_wave(ride, store=None):
+    """Offer ride to the next-nearest drivers not yet asked; returns the new offers"""
+    with transaction.atomic():
+        ride = Ride.objects.select_for_update().get(pk=ride.pk)
+        if not _is_open(ride) or live_offers().filter(ride=ride).exists():
+            return []
+        wave = (ride.offers.aggregate(wave=Max('wave'))['wave'] or 0) + 1
+        if wave > _setting('DISPATCH_MAX_WAVES', DEFAULT_MAX_WAVES):
+            return []
+        asked = set(ride.offers.values_list('driver_id', flat=True))
+        candidates = find_candidates(
+            ride, exclude=asked, limit=_setting('DISPATCH_WAVE_SIZE', DEFAULT_WAVE_SIZE), store=store
+        )
+        return _make_offers(ride, candidates, wave) if candidates else []
+
+def close_offers(ride_id, accepted_by=None):
+    """Settle a ride's pending offers once it is taken or cancelled"""
+    now = timezone.now()
+    pending = RideOffer.objects.filter(ride_id=ride_id, status='pending')
+    if accepted_by is not None:
+        pending.filter(driver_id=accepted_by).update(status='accepted', responded_at=now)
+    pending.update(status='expired')
+
+def decline_offer(ride_id, driver_id):
+    """Record a decline and move on to the next wave if nobody in this one is left; False without an offer"""
+    declined = live_offers().filter(ride_id=ride_id, driver_id=driver_id).update(
+        status='declined', responded_at=timezone.now()
+    )
+    if not declined:
+        return False
+    ride = Ride.objects.get(pk=ride_id)
+    offer_next_wave(ride)
+    return True
+
+def open_rides_to_dispatch():
+    """Recent unassigned rides with no live offer"""
+    max_age = _setting('OPEN_RIDE_MAX_AGE', DEFAULT_OPEN_RIDE_MAX_AGE)
+    return Ride.objects.filter(
+        status='requested', driver__isnull=True,
+        requested_at__gte=timezone.now() - timedelta(seconds=max_age),
+    ).exclude(pk__in=live_offers().values('ride_id')).order_by('requested_at')
+
+def sweep(store=None):
+    """Expire overdue offers and send the next wave for every ride left without a live offer"""
+    expired = RideOffer.objects.filter(status='pending', expires_at__lte=timezone.now()).update(status='expired')
+    waves = 0
+    for ride in open_rides_to_dispatch():
+        waves += bool(offer_next_wave(ride, store=store))
+    return expired, waves
+
+def min_cost_assignment(cost):
+    """
+    Column for each row of a cost matrix such that no column is used twice and
+    the total cost is minimal (Hungarian algorithm, O(rows^2 * columns)).
+    Needs at least as many columns as rows.
+    """
+    rows, columns = len(cost), len(cost[0])
+    u, v = [0.0] * (rows + 1), [0.0] * (columns + 1)
+    match, way = [0] * (columns + 1), [0] * (columns + 1)
+    for row in range(1, rows + 1):
+        match[0], col = row, 0
+        min_slack = [float('inf')] * (columns + 1)
+        used = [False] * (columns + 1)
+        while match[col]:
+            used[col] = True
+            matched_row, delta, next_col = match[col], float('inf'), 0
+            for j in range(1, columns + 1):
+                if not used[j]:
+                    slack = cost[matched_row - 1][j - 1] - u[matched_row] - v[j]
+                    if slack < min_slack[j]:
+                        min_slack[j], way[j] = slack, col
+                    if min_slack[j] < delta:
+                        delta, next_col = min_slack[j], j
+            for j in range(columns + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_slack[j] -= delta
+            col = next_col
+        while col:
+            previous = way[col]
+            match[col] = match[previous]
+            col = previous
+    assignment = [None] * rows
+    for j in range(1, columns + 1):
+        if match[j]:
+            assignment[match[j] - 1] = j - 1
+    return assignment
+
+def plan_batch(rides, store=None):
+    """[(ride, Candidate)] pairing rides with distinct drivers for the least total pickup distance"""
+    asked = {}
+    for ride_id, driver_id in RideOffer.objects.filter(ride__in=rides).values_list('ride_id', 'driver_id'):
+        asked.setdefault(ride_id, set()).add(driver_id)
+    options = {
+        ride.id: {c.driver_id: c for c in find_candidates(ride, exclude=asked.get(ride.id, ()), store=store)}
+        for ride in rides
+    }
+    rides = [ride for ride in rides if options[ride.id]]
+    drivers = sorted({driver_id for candidates in options.values() for driver_id in candidates})
+    if not rides:
+        return []
+
+    cost = [
+        [options[ride.id][driver_id].distance if driver_id in options[ride.id] else UNREACHABLE
+         for driver_id in drivers]
+        for ride in rides
+    ]
+    if len(rides) <= len(drivers):
+        pairs = enumerate(min_cost_assignment(cost))
+    else:
+        # More rides than drivers: assign drivers to rides instead
+        transposed = [list(column) for column in zip(*cost)]
+        pairs = ((row, col) for col, row in enumerate(min_cost_assignment(transposed)))
+
+    return [
+        (rides[row], options[rides[row].id][drivers[col]])
+        for row, col in pairs if cost[row][col] < UNREACHABLE
+    ]
+
+def dispatch_batch(rides=None, store=None):
+    """Offer each waiting ride to the one driver the batch assignment picked for it"""
+    rides = list(open_rides_to_dispatch() if rides is None else rides)
+    offers = []
+    for ride, candidate in plan_batch(rides, store=store):
+        with transaction.atomic():
+            wave = (ride.offers.aggregate(wave=Max('wave'))['wave'] or 0) + 1
+            offers.extend(_make_offers(ride, [candidate], wave))
+    return offers
@@ -0,0 +1,80 @@
+"""
+Server-side fare and ETA estimates.
+
+Road distance is the haversine distance times ROAD_FACTOR. The duration
+comes from the vehicle type's average city speed. Fares follow the rate
+table below, scaled by the fuel type when the vehicle is known and by the
+pickup cell's surge multiplier (transport.surge).
+
+Quotes are computed for every vehicle type at once and cached (LRU) by fuel
+type and the pickup and dropoff coordinates rounded to QUOTE_PRECISION
+decimal places (about 110m), so repeated map pin drags are answered from
+memory in a few microseconds.
+"""
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from .geo import haversine
+
+# Straight-line to road distance
+ROAD_FACTOR = 1.3
+QUOTE_PRECISION = 3
+QUOTE_CACHE_SIZE = 8192
+
+Rate = namedtuple('Rate', 'base per_km per_minute minimum speed_kmh')
+
+# INR; speed is the average city speed used for the duration estimate
+RATES = {
+    'bike': Rate(base=20, per_km=7, per_minute=0.5, minimum=25, speed_kmh=25),
+    'auto': Rate(base=30, per_km=12, per_minute=1, minimum=30, speed_kmh=22),
+    'car': Rate(base=50, per_km=16, per_minute=1.5, minimum=80, speed_kmh=28),
+    'tempo': Rate(base=150, per_km=22, per_minute=2, minimum=200, speed_kmh=22),
+    'truck': Rate(base=300, per_km=35, per_minute=3, minimum=400, speed_kmh=20),
+}
+FUEL_MULTIPLIERS = {
+    'petrol': 1.0,
+    'diesel': 1.0,
+    'cng': 0.95,
+    'electric': 0.9,
+}
+DEFAULT_VEHICLE_TYPE = 'auto'
+
+Quote = namedtuple('Quote', 'vehicle_type distance_km estimated_duration estimated_fare surge_multiplier')
+
+def _rupees(amount):
+    return Decimal(amount).quantize(Decimal('1'), rounding=ROUND_HALF_UP).quantize(Decimal('0.01'))
+
+def _round(value):
+    return round(value, QUOTE_PRECISION)
+
+@lru_cache(maxsize=QUOTE_CACHE_SIZE)
+def _quote_cells(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng, fuel_type, surge):
+    distance = haversine(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng) * ROAD_FACTOR
+    multiplier = FUEL_MULTIPLIERS.get(fuel_type, 1.0) * surge
+    quotes = []
+    for vehicle_type, rate in RATES.items():
+        minutes = max(1, round(distance / rate.speed_kmh * 60))
+        fare = max(rate.minimum, rate.base + distance * rate.per_km + minutes * rate.per_minute)
+        quotes.append(Quote(vehicle_type, round(distance, 2), minutes, _rupees(fare * multiplier), surge))
+    return tuple(quotes)
+
+def quote_all(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng, fuel_type=None, surge=1.0):
+    """
+    Quotes for every vehicle type, in RATES order, from one distance computation.
+    surge is the pickup's multiplier; surge multipliers move in 0.1 steps, so they
+    barely dilute the cache.
+    """
+    return _quote_cells(
+        _round(pickup_lat), _round(pickup_lng), _round(dropoff_lat), _round(dropoff_lng), fuel_type, surge
+    )
+
+def quote(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng, vehicle_type=None, fuel_type=None, surge=1.0):
+    """The Quote for one vehicle type (DEFAULT_VEHICLE_TYPE when none is asked for)"""
+    vehicle_type = vehicle_type or DEFAULT_VEHICLE_TYPE
+    for result in quote_all(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng, fuel_type, surge):
+        if result.vehicle_type == vehicle_type:
+            return result
+    raise ValueError(f'No rates for vehicle type {vehicle_type}')
+
+cache_info = _quote_cells.cache_info
+cache_clear = _quote_cells.cache_clear
@@ -0,0 +1,54 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+# Grid cells are CELL_SIZE degrees on each side (~5.5km of latitude)
+CELL_SIZE = 0.05
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km between two points"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def parse_float(value, minimum, maximum):
+    """float(value), raising ValueError for nan, infinities and anything outside [minimum, maximum]"""
+    number = float(value)
+    if not math.isfinite(number) or not minimum <= number <= maximum:
+        raise ValueError(f'{value!r} is not between {minimum} and {maximum}')
+    return number
+
+def cell_index(lat, lng):
+    if not (math.isfinite(lat) and math.isfinite(lng)):
+        raise ValueError(f'({lat!r}, {lng!r}) is not a finite coordinate')
+    return math.floor(lat / CELL_SIZE), math.floor(lng / CELL_SIZE)
+
+def cell_key(lat, lng):
+    """Stored grid cell key for a coordinate, e.g. '383:1545'"""
+    if lat is None or lng is None:
+        return None
+    row, col = cell_index(lat, lng)
+    return f"{row}:{col}"
+
+def bounding_box(lat, lng, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) enclosing a circle of radius_km"""
+    lat_delta = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6:
+        lng_delta = 180.0
+    else:
+        lng_delta = min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+    return lat - lat_delta, lat + lat_delta, lng - lng_delta, lng + lng_delta
+
+def cells_in_radius(lat, lng, radius_km):
+    """Keys of every grid cell overlapping the bounding box of the search circle"""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    min_row, min_col = cell_index(min_lat, min_lng)
+    max_row, max_col = cell_index(max_lat, max_lng)
+    return [
+        f"{row}:{col}"
+        for row in range(min_row, max_row + 1)
+        for col in range(min_col, max_col + 1)
+    ]
@@ -0,0 +1,212 @@
+"""
+Live driver positions.
+
+Location pings land in a store instead of the DriverProfile table. Dirty
+positions are written back to the database in periodic bulk_update batches.
+The in-memory store is per process; use RedisLocationStore when running more
+than one worker.
+"""
+import threading
+import time
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.utils import timezone
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from .geo import cell_key, cells_in_radius, haversine
+
+DEFAULT_FLUSH_INTERVAL = 30  # seconds
+DEFAULT_FLUSH_BATCH_SIZE = 500
+
+class BaseLocationStore:
+    def update(self, user_id, latitude, longitude, dirty=True):
+        """Record a driver's position; dirty positions are persisted on the next flush"""
+        raise NotImplementedError
+
+    def discard(self, user_id):
+        raise NotImplementedError
+
+    def get(self, user_id):
+        """(latitude, longitude) or None"""
+        raise NotImplementedError
+
+    def nearby(self, latitude, longitude, radius_km):
+        """[(user_id, latitude, longitude, distance_km)] within radius_km, nearest first"""
+        raise NotImplementedError
+
+    def drain_dirty(self):
+        """Return and forget {user_id: (latitude, longitude)} changed since the last drain"""
+        raise NotImplementedError
+
+    def is_empty(self):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+class InMemoryLocationStore(BaseLocationStore):
+    def __init__(self, **options):
+        self._lock = threading.Lock()
+        self._positions = {}
+        self._cells = {}
+        self._dirty = set()
+
+    def update(self, user_id, latitude, longitude, dirty=True):
+        cell = cell_key(latitude, longitude)
+        with self._lock:
+            previous = self._positions.get(user_id)
+            if previous is not None and previous[2] != cell:
+                self._cells[previous[2]].discard(user_id)
+            self._positions[user_id] = (latitude, longitude, cell)
+            self._cells.setdefault(cell, set()).add(user_id)
+            if dirty:
+                self._dirty.add(user_id)
+
+    def discard(self, user_id):
+        with self._lock:
+            previous = self._positions.pop(user_id, None)
+            if previous is not None:
+                self._cells[previous[2]].discard(user_id)
+            self._dirty.discard(user_id)
+
+    def get(self, user_id):
+        position = self._positions.get(user_id)
+        return position[:2] if position else None
+
+    def nearby(self, latitude, longitude, radius_km):
+        results = []
+        with self._lock:
+            for cell in cells_in_radius(latitude, longitude, radius_km):
+                for user_id in self._cells.get(cell, ()):
+                    lat, lng, _ = self._positions[user_id]
+                    distance = haversine(latitude, longitude, lat, lng)
+                    if distance <= radius_km:
+                        results.append((user_id, lat, lng, distance))
+        results.sort(key=lambda result: result[3])
+        return results
+
+    def drain_dirty(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            return {user_id: self._positions[user_id][:2] for user_id in dirty if user_id in self._positions}
+
+    def is_empty(self):
+        return not self._positions
+
+    def clear(self):
+        with self._lock:
+            self._positions.clear()
+            self._cells.clear()
+            self._dirty.clear()
+
+class RedisLocationStore(BaseLocationStore):
+    """Shared store on a Redis-compatible server, using its GEO commands for radius search"""
+    DRAIN_CHUNK = 1000
+
+    def __init__(self, url='redis://127.0.0.1:6379/0', prefix='sahayog:driver_locations', **options):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._geo_key = f'{prefix}:geo'
+        self._dirty_key = f'{prefix}:dirty'
+
+    def update(self, user_id, latitude, longitude, dirty=True):
+        pipe = self._redis.pipeline()
+        pipe.geoadd(self._geo_key, (longitude, latitude, user_id))
+        if dirty:
+            pipe.sadd(self._dirty_key, user_id)
+        pipe.execute()
+
+    def discard(self, user_id):
+        pipe = self._redis.pipeline()
+        pipe.zrem(self._geo_key, user_id)
+        pipe.srem(self._dirty_key, user_id)
+        pipe.execute()
+
+    def get(self, user_id):
+        position = self._redis.geopos(self._geo_key, user_id)[0]
+        return (position[1], position[0]) if position else None
+
+    def nearby(self, latitude, longitude, radius_km):
+        matches = self._redis.geosearch(
+            self._geo_key, longitude=longitude, latitude=latitude, radius=radius_km,
+            unit='km', sort='ASC', withdist=True, withcoord=True,
+        )
+        return [(int(member), lat, lng, distance) for member, distance, (lng, lat) in matches]
+
+    def drain_dirty(self):
+        drained = {}
+        while True:
+            user_ids = self._redis.spop(self._dirty_key, self.DRAIN_CHUNK)
+            if not user_ids:
+                return drained
+            for user_id, position in zip(user_ids, self._redis.geopos(self._geo_key, *user_ids)):
+                if position:
+                    drained[int(user_id)] = (position[1], position[0])
+
+    def is_empty(self):
+        return not self._redis.exists(self._geo_key)
+
+    def clear(self):
+        self._redis.delete(self._geo_key, self._dirty_key)
+
+_store = None
+_store_lock = threading.Lock()
+_last_flush = time.monotonic()
+_flush_lock = threading.Lock()
+
+def get_location_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = getattr(settings, 'LOCATION_STORE', {})
+                backend = import_string(config.get('BACKEND', 'transport.location_store.InMemoryLocationStore'))
+                store = backend(**config.get('OPTIONS', {}))
+                if store.is_empty():
+                    _warm(store)
+                _store = store
+    return _store
+
+def _warm(store):
+    from .models import DriverProfile
+    positions = DriverProfile.objects.filter(
+        current_latitude__isnull=False, current_longitude__isnull=False
+    ).values_list('user_id', 'current_latitude', 'current_longitude')
+    for user_id, latitude, longitude in positions.iterator():
+        store.update(user_id, latitude, longitude, dirty=False)
+
+def flush_locations(store=None):
+    """Persist dirty positions with batched bulk_update; returns the number of rows written"""
+    from .models import DriverProfile
+    store = store or get_location_store()
+    positions = store.drain_dirty()
+    if not positions:
+        return 0
+    batch_size = getattr(settings, 'LOCATION_FLUSH_BATCH_SIZE', DEFAULT_FLUSH_BATCH_SIZE)
+    profiles = list(DriverProfile.objects.filter(user_id__in=positions).only('id', 'user_id'))
+    now = timezone.now()
+    for profile in profiles:
+        profile.current_latitude, profile.current_longitude = positions[profile.user_id]
+        profile.updated_at = now
+    DriverProfile.objects.bulk_update(
+        profiles, ['current_latitude', 'current_longitude', 'updated_at'], batch_size=batch_size
+    )
+    return len(profiles)
+
+def flush_locations_if_due():
+    """Flush when LOCATION_FLUSH_INTERVAL has elapsed; only one thread flushes at a time"""
+    global _last_flush
+    interval = getattr(settings, 'LOCATION_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+    if time.monotonic() - _last_flush < interval or not _flush_lock.acquire(blocking=False):
+        return 0
+    try:
+        _last_flush = time.monotonic()
+        return flush_locations()
+    finally:
+        _flush_lock.release()
+
+@receiver(setting_changed)
+def _reset_store(setting, **kwargs):
+    global _store
+    if setting == 'LOCATION_STORE':
+        _store = None
@@ -0,0 +1,81 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import User
+from transport.geo import haversine
+from transport.location_store import InMemoryLocationStore
+from transport.models import DriverProfile
+
+class Command(BaseCommand):
+    help = 'Benchmark the live-store nearby driver lookup against a full table scan (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drivers', type=int, default=50000)
+        parser.add_argument('--lookups', type=int, default=200)
+        parser.add_argument('--radius', type=float, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # Drivers spread over a region roughly the size of a large metro area
+        center_lat, center_lng, spread = 19.0760, 72.8777, 1.5
+        # A private store, so the benchmark leaves the process's live positions alone
+        store = InMemoryLocationStore()
+
+        with transaction.atomic():
+            self.stdout.write(f"Creating {options['drivers']} simulated drivers...")
+            users = User.objects.bulk_create([
+                User(username=f'bench_driver_{i}', phone_number=f'bench{i:010d}', user_type='driver')
+                for i in range(options['drivers'])
+            ], batch_size=2000)
+            profiles = []
+            for i, user in enumerate(users):
+                lat = center_lat + rng.uniform(-spread, spread)
+                lng = center_lng + rng.uniform(-spread, spread)
+                profiles.append(DriverProfile(
+                    user=user, license_number=f'BENCH{i:08d}', license_expiry='2030-01-01',
+                    experience_years=1, is_online=True, is_verified=True,
+                    current_latitude=lat, current_longitude=lng,
+                ))
+                store.update(user.pk, lat, lng, dirty=False)
+            DriverProfile.objects.bulk_create(profiles, batch_size=2000)
+
+            points = [
+                (center_lat + rng.uniform(-spread, spread), center_lng + rng.uniform(-spread, spread))
+                for _ in range(options['lookups'])
+            ]
+            radius = options['radius']
+
+            full_scan = self._time(points, lambda lat, lng: self._full_scan(lat, lng, radius))
+            live = self._time(points, lambda lat, lng: self._live_store(store, lat, lng, radius))
+
+            self.stdout.write(f"Full scan: {full_scan * 1000:.2f} ms/lookup")
+            self.stdout.write(f"Live store: {live * 1000:.2f} ms/lookup")
+            self.stdout.write(self.style.SUCCESS(f"Speedup: {full_scan / live:.1f}x"))
+
+            transaction.set_rollback(True)
+
+    def _time(self, points, lookup):
+        start = time.perf_counter()
+        for lat, lng in points:
+            lookup(lat, lng)
+        return (time.perf_counter() - start) / len(points)
+
+    def _full_scan(self, lat, lng, radius):
+        drivers = DriverProfile.objects.filter(
+            is_online=True, is_verified=True,
+            current_latitude__isnull=False, current_longitude__isnull=False
+        ).values_list('user_id', 'current_latitude', 'current_longitude')
+        return sorted(
+            (d, user_id) for user_id, d_lat, d_lng in drivers
+            if (d := haversine(lat, lng, d_lat, d_lng)) <= radius
+        )
+
+    def _live_store(self, store, lat, lng, radius):
+        # What nearby_drivers does: positions from the store, availability from the table
+        candidates = store.nearby(lat, lng, radius)
+        available = set(DriverProfile.objects.filter(
+            user_id__in=[user_id for user_id, _, _, _ in candidates], is_online=True, is_verified=True,
+        ).values_list('user_id', flat=True))
+        return [(distance, user_id) for user_id, _, _, distance in candidates if user_id in available]
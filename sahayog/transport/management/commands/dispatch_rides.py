@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from transport.dispatch import sweep, dispatch_batch
+
+class Command(BaseCommand):
+    help = 'Expire overdue ride offers and offer waiting rides to the next drivers (--batch to match them all at once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', action='store_true', help='Match waiting rides by least total pickup distance')
+        parser.add_argument('--loop', action='store_true', help='Keep running every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, **options):
+        while True:
+            if options['batch']:
+                offers = dispatch_batch()
+                self.stdout.write(f'Batch dispatch made {len(offers)} offers')
+            else:
+                expired, waves = sweep()
+                self.stdout.write(f'Expired {expired} offers, sent {waves} new waves')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
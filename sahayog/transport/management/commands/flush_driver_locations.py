@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from transport.location_store import flush_locations
+
+class Command(BaseCommand):
+    help = 'Write buffered live driver positions from a shared (e.g. Redis) location store to DriverProfile'
+
+    def handle(self, *args, **options):
+        count = flush_locations()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {count} driver locations'))
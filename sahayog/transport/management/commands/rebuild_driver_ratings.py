@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from transport.models import DriverProfile, Ride, RideRating
+
+class Command(BaseCommand):
+    help = 'Recompute driver rating aggregates and ride totals from rating and ride history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Report drifted profiles without fixing them')
+
+    def handle(self, *args, **options):
+        ratings = {
+            row['rated_to']: (row['total'], row['count'])
+            for row in RideRating.objects.values('rated_to').annotate(total=Sum('rating'), count=Count('id'))
+        }
+        rides = dict(
+            Ride.objects.filter(status='completed', driver__isnull=False)
+            .values('driver').annotate(count=Count('id')).values_list('driver', 'count')
+        )
+
+        drifted = []
+        for profile in DriverProfile.objects.only('id', 'user_id', 'rating_sum', 'rating_count', 'average_rating', 'total_rides').iterator():
+            rating_sum, rating_count = ratings.get(profile.user_id, (0, 0))
+            expected = (rating_sum, rating_count, rating_sum / rating_count if rating_count else 0.0, rides.get(profile.user_id, 0))
+            actual = (profile.rating_sum, profile.rating_count, profile.average_rating, profile.total_rides)
+            if expected[:2] != actual[:2] or expected[3] != actual[3] or abs(expected[2] - actual[2]) > 1e-9:
+                profile.rating_sum, profile.rating_count, profile.average_rating, profile.total_rides = expected
+                drifted.append(profile)
+
+        for profile in drifted:
+            self.stdout.write(
+                f'{profile.user_id}: sum={profile.rating_sum} count={profile.rating_count} '
+                f'average={profile.average_rating:.2f} rides={profile.total_rides}'
+            )
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f'{len(drifted)} driver profiles out of date')
+            self.stdout.write(self.style.SUCCESS('Driver aggregates match history'))
+            return
+
+        with transaction.atomic():
+            now = timezone.now()
+            for profile in drifted:
+                profile.updated_at = now
+            DriverProfile.objects.bulk_update(
+                drifted, ['rating_sum', 'rating_count', 'average_rating', 'total_rides', 'updated_at'], batch_size=500
+            )
+            # Every rating is now counted; stop queued apply_ride_rating tasks from adding them again
+            RideRating.objects.filter(aggregated=False).update(aggregated=True)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(drifted)} driver profiles'))
@@ -0,0 +1,84 @@
+import random
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import User
+from transport.dispatch import find_candidates, plan_batch
+from transport.geo import haversine
+from transport.location_store import InMemoryLocationStore
+from transport.models import DriverProfile, Vehicle, Ride
+
+class Command(BaseCommand):
+    help = 'Compare nearest-first and batch dispatch on a simulated driver fleet (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drivers', type=int, default=300)
+        parser.add_argument('--rides', type=int, default=100)
+        parser.add_argument('--spread', type=float, default=0.05, help='Half-width of the area in degrees')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        center_lat, center_lng, spread = 19.0760, 72.8777, options['spread']
+        point = lambda: (center_lat + rng.uniform(-spread, spread), center_lng + rng.uniform(-spread, spread))
+        # A private store keeps the simulated fleet out of the live one
+        store = InMemoryLocationStore()
+
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=f'sim_driver_{i}', phone_number=f'sim{i:010d}', user_type='driver')
+                for i in range(options['drivers'])
+            ])
+            DriverProfile.objects.bulk_create([
+                DriverProfile(
+                    user=user, license_number=f'SIM{i:08d}', license_expiry='2030-01-01',
+                    experience_years=1, is_online=True, is_verified=True,
+                )
+                for i, user in enumerate(users)
+            ])
+            Vehicle.objects.bulk_create([
+                Vehicle(
+                    driver=user, vehicle_type=rng.choice(['auto', 'car']), make='Sim', model='Sim', year=2022,
+                    license_plate=f'SIM{i:06d}', fuel_type='cng', seating_capacity=rng.choice([3, 4]),
+                    is_active=True, is_verified=True,
+                )
+                for i, user in enumerate(users)
+            ])
+            for user in users:
+                store.update(user.id, *point(), dirty=False)
+
+            customer = User.objects.create(username='sim_customer', phone_number='sim_customer')
+            rides = []
+            for _ in range(options['rides']):
+                (pickup_lat, pickup_lng), (dropoff_lat, dropoff_lng) = point(), point()
+                rides.append(Ride(
+                    customer=customer, pickup_latitude=pickup_lat, pickup_longitude=pickup_lng,
+                    pickup_address='Simulated', dropoff_latitude=dropoff_lat, dropoff_longitude=dropoff_lng,
+                    dropoff_address='Simulated', estimated_fare='100.00', estimated_duration=15,
+                    distance_km=haversine(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng),
+                    vehicle_type=rng.choice(['', '', 'car']), passengers=rng.choice([1, 1, 2, 4]),
+                ))
+            rides = Ride.objects.bulk_create(rides)
+
+            greedy = self._greedy(rides, store)
+            batch = [candidate.distance for _, candidate in plan_batch(rides, store=store)]
+            self._report('Nearest-first', greedy, len(rides))
+            self._report('Batch', batch, len(rides))
+
+            transaction.set_rollback(True)
+
+    def _greedy(self, rides, store):
+        """Each ride, in request order, takes the nearest driver not already taken"""
+        taken, distances = set(), []
+        for ride in rides:
+            candidate = next((c for c in find_candidates(ride, store=store) if c.driver_id not in taken), None)
+            if candidate:
+                taken.add(candidate.driver_id)
+                distances.append(candidate.distance)
+        return distances
+
+    def _report(self, label, distances, rides):
+        mean = sum(distances) / len(distances) if distances else 0
+        self.stdout.write(
+            f'{label}: {len(distances)}/{rides} rides matched, '
+            f'total pickup {sum(distances):.1f} km, mean {mean:.2f} km'
+        )
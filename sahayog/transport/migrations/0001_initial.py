@@ -0,0 +1,117 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:18
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pickup_latitude', models.FloatField()),
+                ('pickup_longitude', models.FloatField()),
+                ('pickup_address', models.TextField()),
+                ('dropoff_latitude', models.FloatField()),
+                ('dropoff_longitude', models.FloatField()),
+                ('dropoff_address', models.TextField()),
+                ('status', models.CharField(choices=[('requested', 'Requested'), ('accepted', 'Accepted'), ('picked_up', 'Picked Up'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='requested', max_length=20)),
+                ('estimated_fare', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('actual_fare', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('distance_km', models.FloatField()),
+                ('estimated_duration', models.PositiveIntegerField()),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('accepted_at', models.DateTimeField(blank=True, null=True)),
+                ('picked_up_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('cancelled_at', models.DateTimeField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='customer_rides', to=settings.AUTH_USER_MODEL)),
+                ('driver', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='driver_rides', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Vehicle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vehicle_type', models.CharField(choices=[('bike', 'Bike'), ('auto', 'Auto Rickshaw'), ('car', 'Car'), ('tempo', 'Tempo'), ('truck', 'Truck')], max_length=20)),
+                ('make', models.CharField(max_length=50)),
+                ('model', models.CharField(max_length=50)),
+                ('year', models.PositiveIntegerField()),
+                ('license_plate', models.CharField(max_length=20, unique=True)),
+                ('fuel_type', models.CharField(choices=[('petrol', 'Petrol'), ('diesel', 'Diesel'), ('cng', 'CNG'), ('electric', 'Electric')], max_length=20)),
+                ('seating_capacity', models.PositiveIntegerField()),
+                ('registration_doc', models.ImageField(upload_to='vehicle_docs/')),
+                ('insurance_doc', models.ImageField(upload_to='vehicle_docs/')),
+                ('permit_doc', models.ImageField(blank=True, null=True, upload_to='vehicle_docs/')),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_verified', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vehicles', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RideRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('comment', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('rated_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='given_ratings', to=settings.AUTH_USER_MODEL)),
+                ('rated_to', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='received_ratings', to=settings.AUTH_USER_MODEL)),
+                ('ride', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating', to='transport.ride')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ride',
+            name='vehicle',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='transport.vehicle'),
+        ),
+        migrations.CreateModel(
+            name='DriverProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('license_number', models.CharField(max_length=50, unique=True)),
+                ('license_expiry', models.DateField()),
+                ('experience_years', models.PositiveIntegerField()),
+                ('license_doc', models.ImageField(upload_to='driver_docs/')),
+                ('photo', models.ImageField(upload_to='driver_docs/')),
+                ('average_rating', models.FloatField(default=0.0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('total_rides', models.PositiveIntegerField(default=0)),
+                ('is_online', models.BooleanField(default=False)),
+                ('is_verified', models.BooleanField(default=False)),
+                ('current_latitude', models.FloatField(blank=True, null=True)),
+                ('current_longitude', models.FloatField(blank=True, null=True)),
+                ('location_cell', models.CharField(blank=True, db_index=True, editable=False, max_length=32, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='driver_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(fields=['customer', '-requested_at', '-id'], name='ride_customer_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(fields=['driver', '-requested_at', '-id'], name='ride_driver_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(fields=['driver', 'status'], name='ride_driver_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='driverprofile',
+            index=models.Index(condition=models.Q(('is_online', True), ('is_verified', True)), fields=['location_cell'], name='driver_available_cell_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:20
+
+from django.db import migrations, models
+from transport.geo import cell_key
+
+
+def fill_pickup_cells(apps, schema_editor):
+    # Only rides still waiting for a driver are ever looked up by pickup cell
+    Ride = apps.get_model('transport', 'Ride')
+    rides = list(Ride.objects.filter(status='requested', driver__isnull=True).only('pickup_latitude', 'pickup_longitude'))
+    for ride in rides:
+        ride.pickup_cell = cell_key(ride.pickup_latitude, ride.pickup_longitude)
+    Ride.objects.bulk_update(rides, ['pickup_cell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ride',
+            name='pickup_cell',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(condition=models.Q(('driver__isnull', True), ('status', 'requested')), fields=['pickup_cell', '-requested_at'], name='ride_open_pickup_idx'),
+        ),
+        migrations.RunPython(fill_pickup_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transport', '0002_ride_pickup_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RideOffer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wave', models.PositiveIntegerField()),
+                ('pickup_distance_km', models.FloatField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('declined', 'Declined'), ('expired', 'Expired')], default='pending', max_length=20)),
+                ('offered_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('responded_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ride',
+            name='passengers',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='ride',
+            name='vehicle_type',
+            field=models.CharField(blank=True, choices=[('bike', 'Bike'), ('auto', 'Auto Rickshaw'), ('car', 'Car'), ('tempo', 'Tempo'), ('truck', 'Truck')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(condition=models.Q(('driver__isnull', True), ('status', 'requested')), fields=['-requested_at'], name='ride_open_recent_idx'),
+        ),
+        migrations.AddField(
+            model_name='rideoffer',
+            name='driver',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ride_offers', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='rideoffer',
+            name='ride',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='offers', to='transport.ride'),
+        ),
+        migrations.AddField(
+            model_name='rideoffer',
+            name='vehicle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='transport.vehicle'),
+        ),
+        migrations.AddIndex(
+            model_name='rideoffer',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['expires_at'], name='ride_offer_pending_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='rideoffer',
+            constraint=models.UniqueConstraint(fields=('ride', 'driver'), name='ride_offer_once_per_driver'),
+        ),
+    ]
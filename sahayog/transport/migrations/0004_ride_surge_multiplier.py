@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0003_ride_dispatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ride',
+            name='surge_multiplier',
+            field=models.FloatField(default=1.0),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:36
+
+from django.db import migrations, models
+
+
+def mark_existing_aggregated(apps, schema_editor):
+    # Ratings saved before aggregation moved to a task were applied inline
+    RideRating = apps.get_model('transport', 'RideRating')
+    RideRating.objects.update(aggregated=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0004_ride_surge_multiplier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riderating',
+            name='aggregated',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_existing_aggregated, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='driverprofile',
+            name='location_cell',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:17
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0008_drop_location_cell_db_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='driverprofile',
+            name='driver_available_cell_idx',
+        ),
+        migrations.RemoveField(
+            model_name='driverprofile',
+            name='location_cell',
+        ),
+    ]
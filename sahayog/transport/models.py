@@ -1,6 +1,15 @@
-from django.db import models
+from functools import partial
+from django.db import models, transaction
+from django.db.models import F, Q, Case, When, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
 from accounts.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from sahayog.bootstrap import bump_users
+from .geo import cell_key
+
+class RideStatusConflict(ValueError):
+    """The ride's status changed after it was loaded"""
 
 class Vehicle(models.Model):
     VEHICLE_TYPES = (
@@ -31,6 +40,7 @@ class Vehicle(models.Model):
     registration_doc = models.ImageField(upload_to='vehicle_docs/')
     insurance_doc = models.ImageField(upload_to='vehicle_docs/')
     permit_doc = models.ImageField(upload_to='vehicle_docs/', null=True, blank=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)  # see imaging.registry
     
     # Status
     is_active = models.BooleanField(default=True)
@@ -49,9 +59,12 @@ class DriverProfile(models.Model):
     # Documents
     license_doc = models.ImageField(upload_to='driver_docs/')
     photo = models.ImageField(upload_to='driver_docs/')
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)  # see imaging.registry
     
-    # Ratings
+    # Ratings; average_rating is derived from the running sum and count
     average_rating = models.FloatField(default=0.0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
     total_rides = models.PositiveIntegerField(default=0)
     
     # Status
@@ -59,6 +72,32 @@ class DriverProfile(models.Model):
     is_verified = models.BooleanField(default=False)
     current_latitude = models.FloatField(null=True, blank=True)
     current_longitude = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # Partial saves still move updated_at, which conditional GETs rely on
+            kwargs['update_fields'] = set(update_fields) | {'updated_at'}
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def apply_rating(cls, user_id, rating, removed=False):
+        """Add (or remove) one rating from a driver's running aggregates in a single UPDATE"""
+        sign = -1 if removed else 1
+        new_sum = F('rating_sum') + sign * rating
+        new_count = F('rating_count') + sign
+        return cls.objects.filter(user_id=user_id).update(
+            updated_at=timezone.now(),
+            rating_sum=new_sum,
+            rating_count=new_count,
+            average_rating=Case(
+                # Removing the only rating leaves no average
+                When(rating_count__lte=-sign, then=Value(0.0)),
+                default=Cast(new_sum, models.FloatField()) / new_count,
+                output_field=models.FloatField(),
+            ),
+        )
     
     def __str__(self):
         return f"{self.user.username} - Driver"
@@ -72,6 +111,23 @@ class Ride(models.Model):
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
     )
+    ACTIVE_STATUSES = ('accepted', 'picked_up', 'in_progress')
+    
+    # Allowed status changes; 'accepted' is reached through accept_ride, which also assigns the driver
+    TRANSITIONS = {
+        'requested': ('accepted', 'cancelled'),
+        'accepted': ('picked_up', 'cancelled'),
+        'picked_up': ('in_progress', 'cancelled'),
+        'in_progress': ('completed', 'cancelled'),
+        'completed': (),
+        'cancelled': (),
+    }
+    STATUS_TIMESTAMPS = {
+        'accepted': 'accepted_at',
+        'picked_up': 'picked_up_at',
+        'completed': 'completed_at',
+        'cancelled': 'cancelled_at',
+    }
     
     customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='customer_rides')
     driver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='driver_rides', null=True, blank=True)
@@ -81,6 +137,7 @@ class Ride(models.Model):
     pickup_latitude = models.FloatField()
     pickup_longitude = models.FloatField()
     pickup_address = models.TextField()
+    pickup_cell = models.CharField(max_length=32, null=True, blank=True, editable=False)
     
     dropoff_latitude = models.FloatField()
     dropoff_longitude = models.FloatField()
@@ -92,6 +149,9 @@ class Ride(models.Model):
     actual_fare = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     distance_km = models.FloatField()
     estimated_duration = models.PositiveIntegerField()  # in minutes
+    surge_multiplier = models.FloatField(default=1.0)  # applied to estimated_fare when requested
+    vehicle_type = models.CharField(max_length=20, choices=Vehicle.VEHICLE_TYPES, blank=True)  # blank: any type
+    passengers = models.PositiveIntegerField(default=1)
     
     # Timestamps
     requested_at = models.DateTimeField(auto_now_add=True)
@@ -99,10 +159,69 @@ class Ride(models.Model):
     picked_up_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     cancelled_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     # Special requests
     notes = models.TextField(blank=True)
     
+    class Meta:
+        indexes = [
+            # Newest-first ride feeds, seekable by (requested_at, id)
+            models.Index(fields=['customer', '-requested_at', '-id'], name='ride_customer_feed_idx'),
+            models.Index(fields=['driver', '-requested_at', '-id'], name='ride_driver_feed_idx'),
+            # A driver's rides in a given state, e.g. the active rides a location socket relays to
+            models.Index(fields=['driver', 'status'], name='ride_driver_status_idx'),
+            # Open requests by pickup grid cell; the index only holds rides still waiting for a driver
+            models.Index(
+                fields=['pickup_cell', '-requested_at'], name='ride_open_pickup_idx',
+                condition=Q(status='requested', driver__isnull=True),
+            ),
+            # Recent open requests, swept by the dispatcher
+            models.Index(
+                fields=['-requested_at'], name='ride_open_recent_idx',
+                condition=Q(status='requested', driver__isnull=True),
+            ),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.pickup_cell = cell_key(self.pickup_latitude, self.pickup_longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields) | {'updated_at'}
+            if {'pickup_latitude', 'pickup_longitude'} & update_fields:
+                update_fields.add('pickup_cell')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+    
+    def can_transition_to(self, new_status):
+        return new_status in self.TRANSITIONS.get(self.status, ())
+    
+    def transition_to(self, new_status, **fields):
+        """
+        Move to new_status, writing only the status, its timestamp and any extra fields given.
+        The write only applies if the status is still the one this instance was loaded with, so
+        of two concurrent transitions one raises RideStatusConflict.
+        """
+        if not self.can_transition_to(new_status):
+            raise ValueError(f"Cannot change ride from {self.status} to {new_status}")
+        
+        now = timezone.now()
+        values = {'status': new_status}
+        timestamp_field = self.STATUS_TIMESTAMPS.get(new_status)
+        if timestamp_field:
+            values[timestamp_field] = now
+        values.update(fields)
+        
+        if not Ride.objects.filter(pk=self.pk, status=self.status).update(updated_at=now, **values):
+            raise RideStatusConflict(f"Ride is no longer {self.status}")
+        for name, value in values.items():
+            setattr(self, name, value)
+        self.updated_at = now
+        # A queryset update sends no post_save to the bootstrap cache
+        bump_users(self.customer_id, self.driver_id)
+        transaction.on_commit(partial(bump_users, self.customer_id, self.driver_id))
+        return list(values)
+    
     def __str__(self):
         return f"Ride #{self.id} - {self.customer.username}"
 
@@ -113,6 +232,55 @@ class RideRating(models.Model):
     rating = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set once transport.tasks.apply_ride_rating has added this rating to the driver's aggregates
+    aggregated = models.BooleanField(default=False, editable=False)
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        if kwargs.get('update_fields') is None:
+            # aggregated belongs to apply_ride_rating; a stale copy must not be written back
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name != 'aggregated'
+            ]
+        with transaction.atomic():
+            stored = RideRating.objects.select_for_update().values('rating', 'rated_to_id', 'aggregated').get(pk=self.pk)
+            super().save(*args, **kwargs)
+            if stored['aggregated'] and (stored['rating'], stored['rated_to_id']) != (self.rating, self.rated_to_id):
+                # Swap the rating as counted for the rating as saved; until then the task counts the new one
+                DriverProfile.apply_rating(stored['rated_to_id'], stored['rating'], removed=True)
+                DriverProfile.apply_rating(self.rated_to_id, self.rating)
+    
+    def __str__(self):
+        return f"Rating {self.rating}/5 for Ride #{self.ride.id}"
+
+class RideOffer(models.Model):
+    """A ride pushed to one driver by the dispatcher, open until it expires or is answered"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('accepted', 'Accepted'),
+        ('declined', 'Declined'),
+        ('expired', 'Expired'),
+    )
+    
+    ride = models.ForeignKey(Ride, on_delete=models.CASCADE, related_name='offers')
+    driver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ride_offers')
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE)
+    wave = models.PositiveIntegerField()
+    pickup_distance_km = models.FloatField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    offered_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    responded_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ride', 'driver'], name='ride_offer_once_per_driver'),
+        ]
+        indexes = [
+            # Live offers by expiry, for the dispatcher's sweep
+            models.Index(fields=['expires_at'], name='ride_offer_pending_idx', condition=Q(status='pending')),
+        ]
     
     def __str__(self):
-        return f"Rating {self.rating}/5 for Ride #{self.ride.id}"
\ No newline at end of file
+        return f"Offer of Ride #{self.ride_id} to {self.driver_id} ({self.status})"
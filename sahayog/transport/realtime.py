@@ -0,0 +1,91 @@
+import logging
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from .location_store import get_location_store, flush_locations_if_due
+from .models import Ride
+from .surge import get_surge_monitor
+
+logger = logging.getLogger(__name__)
+
+def ride_group(ride_id):
+    return f'ride_{ride_id}'
+
+def driver_group(user_id):
+    return f'driver_{user_id}'
+
+def _send(group, event):
+    # Fan-out happens in a Celery task, which retries while the channel layer is down
+    from .tasks import send_group_event
+    try:
+        send_group_event.delay(group, event)
+    except Exception:
+        # A broker outage must not fail the HTTP request that changed the ride
+        logger.exception('Failed to queue %s for %s', event['type'], group)
+
+def publish_ride_status(ride):
+    """Push the ride's new status to its subscribers once the transaction commits"""
+    from .serializers import RideStatusSerializer
+    payload = dict(RideStatusSerializer(ride).data)
+    ride_id, driver_id, ride_status = ride.id, ride.driver_id, ride.status
+
+    def send():
+        _send(ride_group(ride_id), {'type': 'ride.status', 'ride': payload})
+        if driver_id:
+            # Lets the driver's location socket know which rides to stream positions to
+            _send(driver_group(driver_id), {'type': 'ride.assignment', 'ride_id': ride_id, 'status': ride_status})
+
+    transaction.on_commit(send)
+
+def publish_ride_offers(ride, offers):
+    """Push new dispatch offers to each offered driver once the transaction commits"""
+    ride_payload = {
+        'id': ride.id,
+        'pickup_latitude': ride.pickup_latitude,
+        'pickup_longitude': ride.pickup_longitude,
+        'pickup_address': ride.pickup_address,
+        'dropoff_address': ride.dropoff_address,
+        'estimated_fare': str(ride.estimated_fare),
+    }
+    events = [
+        (offer.driver_id, {
+            'type': 'ride.offer',
+            'ride': ride_payload,
+            'pickup_distance_km': round(offer.pickup_distance_km, 2),
+            'expires_at': offer.expires_at.isoformat(),
+        })
+        for offer in offers
+    ]
+
+    def send():
+        for driver_id, event in events:
+            _send(driver_group(driver_id), event)
+
+    transaction.on_commit(send)
+
+def record_driver_location(user_id, latitude, longitude, ride_ids=None):
+    """
+    Store a driver's position from either the HTTP ping or the location socket,
+    count it as supply and relay it to the driver's active rides (looked up
+    unless the caller already tracks them)
+    """
+    get_location_store().update(user_id, latitude, longitude)
+    get_surge_monitor().record_driver(user_id, latitude, longitude)
+    flush_locations_if_due()
+    if ride_ids is None:
+        ride_ids = Ride.objects.filter(driver_id=user_id, status__in=Ride.ACTIVE_STATUSES).values_list('id', flat=True)
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for ride_id in ride_ids:
+        # Positions go out directly: the next ping supersedes one that is lost
+        try:
+            async_to_sync(channel_layer.group_send)(ride_group(ride_id), {
+                'type': 'driver.location',
+                'ride_id': ride_id,
+                'driver_id': user_id,
+                'latitude': latitude,
+                'longitude': longitude,
+            })
+        except Exception:
+            logger.exception('Failed to relay the location of driver %s to ride %s', user_id, ride_id)
@@ -0,0 +1,7 @@
+from django.urls import path
+from .consumers import RideConsumer, DriverLocationConsumer
+
+websocket_urlpatterns = [
+    path('ws/rides/<int:ride_id>/', RideConsumer.as_asgi()),
+    path('ws/driver/location/', DriverLocationConsumer.as_asgi()),
+]
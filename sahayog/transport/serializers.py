@@ -1,41 +1,133 @@
+import math
 from rest_framework import serializers
-from .models import Vehicle, DriverProfile, Ride, RideRating
-from accounts.serializers import UserSerializer
+from .models import Vehicle, DriverProfile, Ride, RideRating, RideOffer
+from accounts.serializers import UserSerializer, UserSummarySerializer
+from imaging.serializers import RenditionsField
+from sahayog.serializers import SparseFieldsetMixin
+from .fares import quote
+from .surge import surge_multiplier
 
-class VehicleSerializer(serializers.ModelSerializer):
-    driver = UserSerializer(read_only=True)
+class VehicleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    driver = UserSummarySerializer(read_only=True)
+    renditions = RenditionsField()
     
     class Meta:
         model = Vehicle
-        fields = '__all__'
+        exclude = ['image_renditions']
+        expandable_fields = {'driver': UserSerializer}
+        # Documents are only rendered for a single vehicle
+        list_fields = ['id', 'driver', 'vehicle_type', 'make', 'model', 'year', 'license_plate', 'fuel_type',
+                       'seating_capacity', 'is_active', 'is_verified']
 
-class DriverProfileSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
+class DriverProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    user = UserSummarySerializer(read_only=True)
+    renditions = RenditionsField()
     
     class Meta:
         model = DriverProfile
-        fields = '__all__'
+        exclude = ['image_renditions']
+        expandable_fields = {'user': UserSerializer}
+        # Nearby-driver lists go to customers: no licence details or documents
+        list_fields = ['id', 'user', 'experience_years', 'average_rating', 'total_rides', 'is_online',
+                       'current_latitude', 'current_longitude']
+
+class FiniteFloatField(serializers.FloatField):
+    """A FloatField that also rejects nan, which passes min_value and max_value"""
+    default_error_messages = {'non_finite': 'A finite number is required.'}
+    
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        if not math.isfinite(value):
+            self.fail('non_finite')
+        return value
+
+class DriverLocationSerializer(serializers.Serializer):
+    latitude = FiniteFloatField(min_value=-90, max_value=90)
+    longitude = FiniteFloatField(min_value=-180, max_value=180)
 
-class RideSerializer(serializers.ModelSerializer):
-    customer = UserSerializer(read_only=True)
-    driver = UserSerializer(read_only=True)
+class FareQuoteRequestSerializer(serializers.Serializer):
+    pickup_latitude = FiniteFloatField(min_value=-90, max_value=90)
+    pickup_longitude = FiniteFloatField(min_value=-180, max_value=180)
+    dropoff_latitude = FiniteFloatField(min_value=-90, max_value=90)
+    dropoff_longitude = FiniteFloatField(min_value=-180, max_value=180)
+    fuel_type = serializers.ChoiceField(choices=Vehicle.FUEL_TYPES, required=False)
+
+class FareQuoteSerializer(serializers.Serializer):
+    vehicle_type = serializers.CharField()
+    distance_km = serializers.FloatField()
+    estimated_duration = serializers.IntegerField()
+    estimated_fare = serializers.DecimalField(max_digits=10, decimal_places=2)
+    surge_multiplier = serializers.FloatField()
+
+class RideSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    customer = UserSummarySerializer(read_only=True)
+    driver = UserSummarySerializer(read_only=True)
     vehicle = VehicleSerializer(read_only=True)
     
     class Meta:
         model = Ride
         fields = '__all__'
+        expandable_fields = {'customer': UserSerializer, 'driver': UserSerializer}
+        # Status changes go through accept_ride/update_ride_status and Ride.TRANSITIONS; the
+        # route and its price are fixed when the ride is created (RideCreateSerializer)
+        read_only_fields = [
+            'status', 'accepted_at', 'picked_up_at', 'completed_at', 'cancelled_at',
+            'pickup_latitude', 'pickup_longitude', 'dropoff_latitude', 'dropoff_longitude',
+            'estimated_fare', 'distance_km', 'estimated_duration', 'surge_multiplier', 'actual_fare',
+        ]
+
+class RideStatusSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Ride
+        fields = ['id', 'status', 'driver', 'vehicle', 'accepted_at', 'picked_up_at',
+                 'completed_at', 'cancelled_at', 'actual_fare']
+
+class RideStatusUpdateSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Ride.STATUS_CHOICES)
+    actual_fare = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
 
 class RideCreateSerializer(serializers.ModelSerializer):
+    # The fare is computed from these, so they are held to the quote's bounds
+    pickup_latitude = FiniteFloatField(min_value=-90, max_value=90)
+    pickup_longitude = FiniteFloatField(min_value=-180, max_value=180)
+    dropoff_latitude = FiniteFloatField(min_value=-90, max_value=90)
+    dropoff_longitude = FiniteFloatField(min_value=-180, max_value=180)
+    
     class Meta:
         model = Ride
         fields = ['pickup_latitude', 'pickup_longitude', 'pickup_address', 
                  'dropoff_latitude', 'dropoff_longitude', 'dropoff_address', 
-                 'estimated_fare', 'distance_km', 'estimated_duration', 'notes']
+                 'estimated_fare', 'distance_km', 'estimated_duration', 'surge_multiplier',
+                 'vehicle_type', 'passengers', 'notes']
+        # Priced server-side from the coordinates; client values are ignored
+        read_only_fields = ['estimated_fare', 'distance_km', 'estimated_duration', 'surge_multiplier']
+    
+    def validate(self, attrs):
+        estimate = quote(
+            attrs['pickup_latitude'], attrs['pickup_longitude'],
+            attrs['dropoff_latitude'], attrs['dropoff_longitude'], attrs.get('vehicle_type'),
+            surge=surge_multiplier(attrs['pickup_latitude'], attrs['pickup_longitude']),
+        )
+        attrs.update(
+            estimated_fare=estimate.estimated_fare,
+            surge_multiplier=estimate.surge_multiplier,
+            distance_km=estimate.distance_km,
+            estimated_duration=estimate.estimated_duration,
+        )
+        return attrs
 
-class RideRatingSerializer(serializers.ModelSerializer):
-    rated_by = UserSerializer(read_only=True)
-    rated_to = UserSerializer(read_only=True)
+class RideRatingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    rated_by = UserSummarySerializer(read_only=True)
+    rated_to = UserSummarySerializer(read_only=True)
     
     class Meta:
         model = RideRating
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        expandable_fields = {'rated_by': UserSerializer, 'rated_to': UserSerializer}
+
+class RideOfferSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    ride = RideSerializer(read_only=True)
+    
+    class Meta:
+        model = RideOffer
+        fields = ['id', 'ride', 'wave', 'pickup_distance_km', 'status', 'offered_at', 'expires_at']
@@ -0,0 +1,51 @@
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from sahayog.celery import enqueue_on_commit
+from .location_store import get_location_store
+from .models import DriverProfile, Ride, RideRating
+from .surge import get_surge_monitor, record_request
+from .tasks import apply_ride_rating, dispatch_ride
+
+@receiver(post_save, sender=DriverProfile)
+def sync_driver_location(sender, instance, update_fields=None, **kwargs):
+    # Positions saved through the model (profile edits, admin) are already in the database
+    if update_fields is not None and not {'current_latitude', 'current_longitude'} & set(update_fields):
+        return
+    store = get_location_store()
+    if instance.current_latitude is None or instance.current_longitude is None:
+        store.discard(instance.user_id)
+    else:
+        store.update(instance.user_id, instance.current_latitude, instance.current_longitude, dirty=False)
+
+@receiver(post_save, sender=DriverProfile)
+def drop_offline_driver_supply(sender, instance, **kwargs):
+    if not instance.is_online:
+        get_surge_monitor().remove_driver(instance.user_id)
+
+@receiver(post_delete, sender=DriverProfile)
+def drop_driver_location(sender, instance, **kwargs):
+    get_location_store().discard(instance.user_id)
+    get_surge_monitor().remove_driver(instance.user_id)
+
+@receiver(post_save, sender=RideRating)
+def add_driver_rating(sender, instance, created, **kwargs):
+    if created:
+        enqueue_on_commit(apply_ride_rating, instance.id)
+
+@receiver(post_delete, sender=RideRating)
+def remove_driver_rating(sender, instance, **kwargs):
+    # Only take back what apply_ride_rating has already counted
+    if instance.aggregated:
+        DriverProfile.apply_rating(instance.rated_to_id, instance.rating, removed=True)
+
+@receiver(post_save, sender=Ride)
+def dispatch_new_ride(sender, instance, created, **kwargs):
+    if not created:
+        return
+    # A request rolled back with its transaction was never demand
+    transaction.on_commit(partial(record_request, instance.pickup_latitude, instance.pickup_longitude))
+    if getattr(settings, 'DISPATCH_ON_CREATE', True):
+        enqueue_on_commit(dispatch_ride, instance.id)
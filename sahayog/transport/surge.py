@@ -0,0 +1,153 @@
+"""
+Surge pricing from live demand and supply.
+
+Ride requests (demand) and driver location pings (supply) are counted per
+grid cell over a sliding window, in memory and incrementally: every event
+and every lookup does O(1) amortised work, since only expired buckets or
+drivers are ever revisited. Cells with nothing left in the window are
+dropped, so memory follows the active cells rather than every cell ever
+seen. Counts are per process, like the in-memory location store.
+
+A cell's multiplier grows with requests per available driver above
+SURGE_THRESHOLD, in steps of 0.1, capped at SURGE_MAX_MULTIPLIER.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .geo import cell_key
+
+DEFAULT_WINDOW = 10 * 60  # seconds
+DEFAULT_BUCKET = 60  # seconds
+DEFAULT_THRESHOLD = 1.0  # requests per driver in the window before surging
+DEFAULT_SENSITIVITY = 0.25
+DEFAULT_MAX_MULTIPLIER = 2.5
+
+class SurgeMonitor:
+    def __init__(self, window=DEFAULT_WINDOW, bucket=DEFAULT_BUCKET, threshold=DEFAULT_THRESHOLD,
+                 sensitivity=DEFAULT_SENSITIVITY, max_multiplier=DEFAULT_MAX_MULTIPLIER, clock=time.monotonic):
+        self.window = window
+        self.bucket = bucket
+        self.threshold = threshold
+        self.sensitivity = sensitivity
+        self.max_multiplier = max_multiplier
+        self._clock = clock
+        self._lock = threading.Lock()
+        # cell -> deque of [bucket, count], oldest first, and the running total over it;
+        # cells least recently requested first
+        self._demand = OrderedDict()
+        self._demand_total = {}
+        # user_id -> (cell, last seen), least recently seen first; and drivers per cell
+        self._drivers = OrderedDict()
+        self._supply = {}
+
+    def _now_bucket(self):
+        return int(self._clock() // self.bucket)
+
+    def _expire_demand(self, cell, current):
+        buckets = self._demand.get(cell)
+        oldest = current - self.window // self.bucket
+        while buckets and buckets[0][0] <= oldest:
+            self._demand_total[cell] -= buckets.popleft()[1]
+        # Cells whose latest bucket has expired are wholly outside the window
+        while self._demand:
+            stale, buckets = next(iter(self._demand.items()))
+            if buckets and buckets[-1][0] > oldest:
+                return
+            del self._demand[stale], self._demand_total[stale]
+
+    def _leave(self, cell):
+        self._supply[cell] -= 1
+        if not self._supply[cell]:
+            del self._supply[cell]
+
+    def _expire_drivers(self, now):
+        while self._drivers:
+            user_id, (cell, seen) = next(iter(self._drivers.items()))
+            if now - seen < self.window:
+                return
+            self._drivers.popitem(last=False)
+            self._leave(cell)
+
+    def record_request(self, latitude, longitude):
+        cell = cell_key(latitude, longitude)
+        current = self._now_bucket()
+        with self._lock:
+            self._expire_demand(cell, current)
+            buckets = self._demand.setdefault(cell, deque())
+            self._demand.move_to_end(cell)
+            if buckets and buckets[-1][0] == current:
+                buckets[-1][1] += 1
+            else:
+                buckets.append([current, 1])
+            self._demand_total[cell] = self._demand_total.get(cell, 0) + 1
+
+    def record_driver(self, user_id, latitude, longitude):
+        cell = cell_key(latitude, longitude)
+        now = self._clock()
+        with self._lock:
+            previous = self._drivers.pop(user_id, None)
+            if previous is not None:
+                self._leave(previous[0])
+            self._drivers[user_id] = (cell, now)
+            self._supply[cell] = self._supply.get(cell, 0) + 1
+            self._expire_drivers(now)
+
+    def remove_driver(self, user_id):
+        with self._lock:
+            previous = self._drivers.pop(user_id, None)
+            if previous is not None:
+                self._leave(previous[0])
+
+    def counts(self, latitude, longitude):
+        """(requests, available drivers) in the window for the cell containing the point"""
+        cell = cell_key(latitude, longitude)
+        with self._lock:
+            self._expire_demand(cell, self._now_bucket())
+            self._expire_drivers(self._clock())
+            return self._demand_total.get(cell, 0), self._supply.get(cell, 0)
+
+    def multiplier(self, latitude, longitude):
+        demand, supply = self.counts(latitude, longitude)
+        pressure = demand / max(supply, 1) - self.threshold
+        if pressure <= 0:
+            return 1.0
+        return round(min(1 + self.sensitivity * pressure, self.max_multiplier), 1)
+
+    def clear(self):
+        with self._lock:
+            self._demand.clear()
+            self._demand_total.clear()
+            self._drivers.clear()
+            self._supply.clear()
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+def get_surge_monitor():
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = SurgeMonitor(
+                    window=getattr(settings, 'SURGE_WINDOW', DEFAULT_WINDOW),
+                    bucket=getattr(settings, 'SURGE_BUCKET', DEFAULT_BUCKET),
+                    threshold=getattr(settings, 'SURGE_THRESHOLD', DEFAULT_THRESHOLD),
+                    sensitivity=getattr(settings, 'SURGE_SENSITIVITY', DEFAULT_SENSITIVITY),
+                    max_multiplier=getattr(settings, 'SURGE_MAX_MULTIPLIER', DEFAULT_MAX_MULTIPLIER),
+                )
+    return _monitor
+
+def surge_multiplier(latitude, longitude):
+    return get_surge_monitor().multiplier(latitude, longitude)
+
+def record_request(latitude, longitude):
+    get_surge_monitor().record_request(latitude, longitude)
+
+@receiver(setting_changed)
+def _reset_monitor(setting, **kwargs):
+    global _monitor
+    if setting.startswith('SURGE_'):
+        _monitor = None
@@ -0,0 +1,42 @@
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from channels.layers import get_channel_layer
+from django.db import transaction
+from sahayog.celery import RETRY_POLICY
+from .models import DriverProfile, RideRating
+
+@shared_task(**RETRY_POLICY)
+def apply_ride_rating(rating_id):
+    """Fold one rating into the driver's aggregates; the aggregated flag makes reruns no-ops"""
+    with transaction.atomic():
+        if not RideRating.objects.filter(pk=rating_id, aggregated=False).update(aggregated=True):
+            return
+        rating = RideRating.objects.values('rated_to_id', 'rating').get(pk=rating_id)
+        DriverProfile.apply_rating(rating['rated_to_id'], rating['rating'])
+
+@shared_task(**RETRY_POLICY)
+def dispatch_ride(ride_id):
+    """First dispatch wave for a new ride; a no-op once the ride has live offers or a driver"""
+    from .dispatch import offer_next_wave
+    from .models import Ride
+    ride = Ride.objects.filter(pk=ride_id).first()
+    if ride is not None:
+        offer_next_wave(ride)
+
+@shared_task(**RETRY_POLICY)
+def sweep_dispatch():
+    from .dispatch import sweep
+    return sweep()
+
+@shared_task(**RETRY_POLICY)
+def flush_driver_locations():
+    """Schedule this in CELERY_BEAT_SCHEDULE when positions live in a shared (Redis) store"""
+    from .location_store import flush_locations
+    return flush_locations()
+
+@shared_task(autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={'max_retries': 3})
+def send_group_event(group, event):
+    """Deliver one realtime event to a channel-layer group, retrying while the layer is unreachable"""
+    channel_layer = get_channel_layer()
+    if channel_layer is not None:
+        async_to_sync(channel_layer.group_send)(group, event)
@@ -1,3 +1,962 @@
-from django.test import TestCase
+import threading
+from unittest import mock
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from io import StringIO
+from django.core.management import call_command, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.models import User
+from sahayog import task_metrics
+from sahayog.testing import QueryCountAssertions, QueryPlanAssertions
+from sahayog.asgi import application
+from .geo import haversine, cell_key, cells_in_radius
+from .location_store import get_location_store, flush_locations
+from .fares import quote, quote_all, cache_info
+from .surge import SurgeMonitor, get_surge_monitor
+from .tasks import apply_ride_rating
+from .dispatch import sweep, dispatch_batch, min_cost_assignment
+from .models import Vehicle, DriverProfile, Ride, RideRating, RideOffer, RideStatusConflict
 
-# Create your tests here.
+def make_driver(username, phone, lat=None, lng=None, **kwargs):
+    user = User.objects.create_user(username=username, phone_number=phone, user_type='driver', password='pass12345')
+    profile = DriverProfile.objects.create(
+        user=user, license_number=f'DL-{username}', license_expiry='2030-01-01', experience_years=3,
+        is_online=True, is_verified=True, current_latitude=lat, current_longitude=lng, **kwargs
+    )
+    return user, profile
+
+def make_vehicle(driver, plate):
+    return Vehicle.objects.create(
+        driver=driver, vehicle_type='auto', make='Bajaj', model='RE', year=2020, license_plate=plate,
+        fuel_type='cng', seating_capacity=3, registration_doc='vehicle_docs/r.jpg',
+        insurance_doc='vehicle_docs/i.jpg', is_active=True, is_verified=True
+    )
+
+def make_ride(customer, **kwargs):
+    fields = dict(
+        pickup_latitude=19.0760, pickup_longitude=72.8777, pickup_address='Bandra',
+        dropoff_latitude=19.1136, dropoff_longitude=72.8697, dropoff_address='Andheri',
+        estimated_fare='150.00', distance_km=5.2, estimated_duration=20,
+    )
+    fields.update(kwargs)
+    return Ride.objects.create(customer=customer, **fields)
+
+class GeoTests(TestCase):
+    def test_haversine_known_distance(self):
+        # Mumbai CST to Pune station is ~120km as the crow flies
+        self.assertAlmostEqual(haversine(18.9398, 72.8355, 18.5286, 73.8743), 118.7, delta=1.5)
+
+    def test_search_cells_include_point_cell(self):
+        self.assertIn(cell_key(19.07, 72.87), cells_in_radius(19.07, 72.87, 1))
+
+    def test_cells_need_finite_coordinates(self):
+        for lat in (float('nan'), float('inf')):
+            with self.assertRaises(ValueError):
+                cell_key(lat, 72.87)
+
+class NearbyDriversTests(TestCase):
+    def setUp(self):
+        get_location_store().clear()
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_returns_nearest_first_with_haversine_distance(self):
+        make_driver('far', '9100000001', 19.1300, 72.8777)
+        make_driver('near', '9100000002', 19.0800, 72.8777)
+        make_driver('outside', '9100000003', 19.5000, 72.8777)
+        _, offline = make_driver('offline', '9100000004', 19.0765, 72.8777)
+        DriverProfile.objects.filter(pk=offline.pk).update(is_online=False)
+
+        response = self.client.get('/api/transport/nearby-drivers/', {'latitude': 19.0760, 'longitude': 72.8777})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([d['user']['username'] for d in response.data], ['near', 'far'])
+        self.assertAlmostEqual(response.data[0]['distance'], haversine(19.0760, 72.8777, 19.08, 72.8777), places=2)
+
+    def test_limit(self):
+        for i in range(5):
+            make_driver(f'driver{i}', f'91000001{i:02d}', 19.0760 + i * 0.001, 72.8777)
+
+        response = self.client.get('/api/transport/nearby-drivers/', {'latitude': 19.0760, 'longitude': 72.8777, 'limit': 2})
+
+        self.assertEqual([d['user']['username'] for d in response.data], ['driver0', 'driver1'])
+
+    def test_rejects_non_finite_and_out_of_range_values(self):
+        for params in ({'latitude': 'nan'}, {'latitude': '1e308'}, {'longitude': '-inf'}, {'radius': 'nan'},
+                       {'latitude': 91}, {'radius': -1}):
+            response = self.client.get('/api/transport/nearby-drivers/', {'latitude': 19.07, 'longitude': 72.87, **params})
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_saved_positions_reach_the_store(self):
+        user, profile = make_driver('mover', '9100000201', 19.0760, 72.8777)
+        profile.current_latitude = 28.6139
+        profile.current_longitude = 77.2090
+        profile.save(update_fields=['current_latitude', 'current_longitude'])
+
+        self.assertEqual(get_location_store().get(user.id), (28.6139, 77.2090))
+
+@override_settings(LOCATION_FLUSH_INTERVAL=3600)
+class LocationIngestTests(TestCase):
+    def setUp(self):
+        get_location_store().clear()
+        self.driver, self.profile = make_driver('pinger', '9100000301', 19.0760, 72.8777)
+        self.client = APIClient()
+        self.client.force_authenticate(self.driver)
+
+    def test_ping_updates_store_without_writing_profile(self):
+        response = self.client.post('/api/transport/location/', {'latitude': 19.1000, 'longitude': 72.9000})
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(get_location_store().get(self.driver.id), (19.1, 72.9))
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.current_latitude, 19.0760)
+
+    def test_flush_persists_latest_positions_in_bulk(self):
+        other, other_profile = make_driver('other', '9100000302', 19.0, 72.8)
+        store = get_location_store()
+        store.update(self.driver.id, 19.2, 72.95)
+        store.update(self.driver.id, 19.3, 72.96)
+        store.update(other.id, 18.9, 72.7)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(flush_locations(), 2)
+
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.current_latitude, self.profile.current_longitude), (19.3, 72.96))
+        self.assertEqual(flush_locations(), 0)
+
+    def test_nearby_drivers_reads_live_positions(self):
+        self.client.post('/api/transport/location/', {'latitude': 28.6139, 'longitude': 77.2090})
+
+        response = self.client.get('/api/transport/nearby-drivers/', {'latitude': 28.6140, 'longitude': 77.2090})
+
+        self.assertEqual([d['user']['username'] for d in response.data], ['pinger'])
+        self.assertEqual(response.data[0]['current_latitude'], 28.6139)
+
+    def test_rejects_non_drivers_and_bad_coordinates(self):
+        customer = User.objects.create_user(username='rider2', phone_number='9000000002', password='pass12345')
+        self.client.force_authenticate(customer)
+        self.assertEqual(self.client.post('/api/transport/location/', {'latitude': 1, 'longitude': 1}).status_code, 400)
+
+        self.client.force_authenticate(self.driver)
+        self.assertEqual(self.client.post('/api/transport/location/', {'latitude': 95, 'longitude': 1}).status_code, 400)
+        self.assertEqual(self.client.post('/api/transport/location/', {'latitude': 'nan', 'longitude': 1}).status_code, 400)
+        self.assertEqual(get_location_store().get(self.driver.id), (19.0760, 72.8777))
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class RideSocketTests(TransactionTestCase):
+    def setUp(self):
+        get_location_store().clear()
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.driver, _ = make_driver('driver', '9100000401', 19.0760, 72.8777)
+        make_vehicle(self.driver, 'MH01AB1234')
+        self.ride = make_ride(self.customer)
+
+    def connect(self, path, user):
+        return WebsocketCommunicator(application, f'{path}?token={RefreshToken.for_user(user).access_token}')
+
+    def accept(self):
+        client = APIClient()
+        client.force_authenticate(self.driver)
+        return client.post(f'/api/transport/rides/{self.ride.id}/accept/')
+
+    async def test_status_transitions_are_pushed_to_subscribers(self):
+        communicator = self.connect(f'/ws/rides/{self.ride.id}/', self.customer)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        await sync_to_async(self.accept)()
+
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['type'], 'ride.status')
+        self.assertEqual(message['ride']['status'], 'accepted')
+        self.assertEqual(message['ride']['driver'], self.driver.id)
+        await communicator.disconnect()
+
+    async def test_rejects_non_participants_and_anonymous(self):
+        stranger = await sync_to_async(User.objects.create_user)(
+            username='stranger', phone_number='9000000009', password='pass12345')
+
+        connected, _ = await self.connect(f'/ws/rides/{self.ride.id}/', stranger).connect()
+        self.assertFalse(connected)
+        connected, _ = await WebsocketCommunicator(application, f'/ws/rides/{self.ride.id}/').connect()
+        self.assertFalse(connected)
+
+    async def test_driver_positions_are_relayed_to_the_ride(self):
+        await sync_to_async(self.accept)()
+        rider = self.connect(f'/ws/rides/{self.ride.id}/', self.customer)
+        await rider.connect()
+        driver = self.connect('/ws/driver/location/', self.driver)
+        connected, _ = await driver.connect()
+        self.assertTrue(connected)
+
+        await driver.send_json_to({'latitude': 19.08, 'longitude': 72.88})
+
+        message = await rider.receive_json_from()
+        self.assertEqual(message, {
+            'type': 'driver.location', 'ride_id': self.ride.id, 'driver_id': self.driver.id,
+            'latitude': 19.08, 'longitude': 72.88,
+        })
+        self.assertEqual(get_location_store().get(self.driver.id), (19.08, 72.88))
+
+        await driver.send_json_to({'latitude': float('nan'), 'longitude': 72.88})
+        self.assertEqual((await driver.receive_json_from())['type'], 'error')
+        await driver.send_json_to({'latitude': 19.09, 'longitude': 72.88})
+        self.assertEqual((await rider.receive_json_from())['latitude'], 19.09)
+        await driver.disconnect()
+        await rider.disconnect()
+
+    async def test_http_pings_are_relayed_to_the_ride(self):
+        await sync_to_async(self.accept)()
+        rider = self.connect(f'/ws/rides/{self.ride.id}/', self.customer)
+        await rider.connect()
+
+        client = APIClient()
+        client.force_authenticate(self.driver)
+        response = await sync_to_async(client.post)('/api/transport/location/', {'latitude': 19.08, 'longitude': 72.88})
+        self.assertEqual(response.status_code, 204)
+
+        message = await rider.receive_json_from()
+        self.assertEqual((message['type'], message['ride_id'], message['latitude']), ('driver.location', self.ride.id, 19.08))
+        await rider.disconnect()
+
+class AcceptRideTests(TestCase):
+    def setUp(self):
+        get_location_store().clear()
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.ride = make_ride(self.customer, notes='Gate 2')
+        self.client = APIClient()
+
+    def accept_as(self, driver, ride_id=None):
+        self.client.force_authenticate(driver)
+        return self.client.post(f'/api/transport/rides/{ride_id or self.ride.id}/accept/')
+
+    def test_first_driver_wins_and_second_gets_conflict(self):
+        first, _ = make_driver('first', '9100000501')
+        second, _ = make_driver('second', '9100000502')
+        vehicle = make_vehicle(first, 'MH01AA0001')
+        make_vehicle(second, 'MH01AA0002')
+
+        response = self.accept_as(first)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['driver']['id'], first.id)
+        self.assertEqual(self.accept_as(second).status_code, 409)
+
+        self.ride.refresh_from_db()
+        self.assertEqual((self.ride.driver_id, self.ride.vehicle_id, self.ride.status), (first.id, vehicle.id, 'accepted'))
+        self.assertEqual(self.ride.notes, 'Gate 2')
+
+    def test_unknown_ride(self):
+        driver, _ = make_driver('first', '9100000501')
+        make_vehicle(driver, 'MH01AA0001')
+        self.assertEqual(self.accept_as(driver, ride_id=self.ride.id + 100).status_code, 404)
+
+    def test_claims_with_a_vehicle_that_suits_the_ride(self):
+        driver, _ = make_driver('first', '9100000501')
+        make_vehicle(driver, 'MH01AA0001')
+        Ride.objects.filter(pk=self.ride.pk).update(vehicle_type='car')
+        self.assertEqual(self.accept_as(driver).status_code, 400)
+
+        car = make_vehicle(driver, 'MH01AA0002')
+        Vehicle.objects.filter(pk=car.pk).update(vehicle_type='car')
+        self.assertEqual(self.accept_as(driver).status_code, 200)
+        self.ride.refresh_from_db()
+        self.assertEqual(self.ride.vehicle_id, car.id)
+
+    def test_prefers_the_offered_vehicle(self):
+        driver, _ = make_driver('first', '9100000501')
+        make_vehicle(driver, 'MH01AA0001')
+        offered = make_vehicle(driver, 'MH01AA0002')
+        RideOffer.objects.create(
+            ride=self.ride, driver=driver, vehicle=offered, wave=1, pickup_distance_km=1.0,
+            expires_at=timezone.now() + timedelta(seconds=20),
+        )
+        self.assertEqual(self.accept_as(driver).status_code, 200)
+        self.ride.refresh_from_db()
+        self.assertEqual(self.ride.vehicle_id, offered.id)
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class RideStatusTests(TestCase):
+    def setUp(self):
+        get_location_store().clear()
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.driver, _ = make_driver('driver', '9100000701')
+        self.ride = make_ride(self.customer, driver=self.driver, status='accepted', notes='Gate 2')
+        self.client = APIClient()
+        self.client.force_authenticate(self.driver)
+
+    def post_status(self, new_status, query='', **data):
+        return self.client.post(f'/api/transport/rides/{self.ride.id}/status/{query}', {'status': new_status, **data})
+
+    def test_driver_walks_ride_to_completion(self):
+        for new_status in ('picked_up', 'in_progress', 'completed'):
+            self.assertEqual(self.post_status(new_status, actual_fare='175.50').status_code, 200)
+
+        self.ride.refresh_from_db()
+        self.assertEqual(self.ride.status, 'completed')
+        self.assertIsNotNone(self.ride.picked_up_at)
+        self.assertIsNotNone(self.ride.completed_at)
+        self.assertEqual(str(self.ride.actual_fare), '175.50')
+
+    def test_transition_writes_only_status_and_timestamp(self):
+        Ride.objects.filter(pk=self.ride.pk).update(notes='Changed elsewhere')
+
+        response = self.post_status('picked_up', query='?compact=true')
+
+        self.assertEqual(set(response.data), {'id', 'status', 'picked_up_at'})
+        self.assertEqual(response.data['status'], 'picked_up')
+        self.ride.refresh_from_db()
+        self.assertEqual(self.ride.notes, 'Changed elsewhere')
+
+    def test_invalid_transitions_are_rejected(self):
+        self.assertEqual(self.post_status('completed').status_code, 409)
+        self.assertEqual(self.post_status('accepted').status_code, 400)
+        self.assertEqual(self.post_status('teleported').status_code, 400)
+        self.ride.refresh_from_db()
+        self.assertEqual(self.ride.status, 'accepted')
+
+    def test_customer_can_only_cancel(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.post_status('picked_up').status_code, 403)
+        self.assertEqual(self.post_status('cancelled').status_code, 200)
+        self.assertEqual(self.post_status('cancelled').status_code, 409)
+    
+    def test_concurrent_transitions_only_one_wins(self):
+        stale = Ride.objects.get(pk=self.ride.pk)
+        self.ride.transition_to('cancelled')
+        with self.assertRaises(RideStatusConflict):
+            stale.transition_to('picked_up')
+        self.ride.refresh_from_db()
+        self.assertEqual((self.ride.status, self.ride.picked_up_at), ('cancelled', None))
+    
+    def test_lost_race_is_a_conflict(self):
+        with mock.patch.object(Ride, 'transition_to', side_effect=RideStatusConflict):
+            self.assertEqual(self.post_status('picked_up').status_code, 409)
+
+class ListQueryCountTests(QueryCountAssertions, TestCase):
+    """List endpoints must issue the same number of queries whatever the page length"""
+
+    def setUp(self):
+        get_location_store().clear()
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.driver, _ = make_driver('driver', '9100000901')
+        self.client = APIClient()
+
+    def add_rows(self, count):
+        for i in range(count):
+            vehicle = make_vehicle(self.driver, f'MH03AA{Vehicle.objects.count():04d}')
+            make_ride(self.customer, driver=self.driver, vehicle=vehicle, status='completed')
+            make_ride(self.customer)
+
+    def test_customer_rides(self):
+        self.client.force_authenticate(self.customer)
+        self.assertConstantQueries('/api/transport/rides/', 2, self.add_rows)
+
+    def test_driver_rides(self):
+        self.client.force_authenticate(self.driver)
+        self.assertConstantQueries('/api/transport/rides/', 2, self.add_rows)
+
+    def test_vehicles(self):
+        self.client.force_authenticate(self.driver)
+        self.assertConstantQueries('/api/transport/vehicles/', 2, self.add_rows)
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.driver, _ = make_driver('driver', '9100000901')
+        vehicle = make_vehicle(self.driver, 'MH03AA0001')
+        self.ride = make_ride(self.customer, driver=self.driver, vehicle=vehicle, status='accepted')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def first_ride(self, params=None):
+        return self.client.get('/api/transport/rides/', params).data['results'][0]
+
+    def test_list_embeds_slim_users_and_vehicles(self):
+        ride = self.first_ride()
+        self.assertEqual(ride['driver']['username'], 'driver')
+        self.assertNotIn('phone_number', ride['driver'])
+        self.assertNotIn('registration_doc', ride['vehicle'])
+
+    def test_detail_embeds_full_users(self):
+        ride = self.client.get(f'/api/transport/rides/{self.ride.pk}/').data
+        self.assertEqual(ride['driver']['phone_number'], '9100000901')
+        self.assertIn('registration_doc', ride['vehicle'])
+
+    def test_expand_in_list(self):
+        ride = self.first_ride({'expand': 'driver,vehicle.driver'})
+        self.assertEqual(ride['driver']['phone_number'], '9100000901')
+        self.assertEqual(ride['vehicle']['driver']['phone_number'], '9100000901')
+        self.assertNotIn('phone_number', ride['customer'])
+
+    def test_fields_selects_top_level_and_nested(self):
+        ride = self.first_ride({'fields': 'id,status,driver.username,vehicle'})
+        self.assertEqual(set(ride), {'id', 'status', 'driver', 'vehicle'})
+        self.assertEqual(ride['driver'], {'username': 'driver'})
+        self.assertIn('license_plate', ride['vehicle'])
+
+    def test_fields_can_reach_expanded_relations(self):
+        ride = self.first_ride({'fields': 'id,driver.phone_number', 'expand': 'driver'})
+        self.assertEqual(ride, {'id': self.ride.pk, 'driver': {'phone_number': '9100000901'}})
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        get_location_store().clear()
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.driver, _ = make_driver('driver', '9100000901')
+        vehicle = make_vehicle(self.driver, 'MH03AA0001')
+        self.ride = make_ride(self.customer, driver=self.driver, vehicle=vehicle, status='accepted')
+        self.url = f'/api/transport/rides/{self.ride.pk}/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_unchanged_ride_is_304(self):
+        response = self.client.get(self.url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        since = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+    def test_status_change_and_fieldsets_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(self.url, {'fields': 'id'})['ETag'], etag)
+
+        self.client.force_authenticate(self.driver)
+        self.client.post(f'/api/transport/rides/{self.ride.pk}/status/', {'status': 'picked_up'})
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'picked_up')
+
+    def test_nested_user_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.driver.phone_number = '9100000999'
+        self.driver.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['driver']['phone_number'], '9100000999')
+
+    def test_driver_profile_etag_follows_the_live_position(self):
+        self.client.force_authenticate(self.driver)
+        etag = self.client.get('/api/transport/driver-profile/')['ETag']
+        self.assertEqual(self.client.get('/api/transport/driver-profile/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        get_location_store().update(self.driver.id, 19.07, 72.87)
+        self.assertEqual(self.client.get('/api/transport/driver-profile/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+class DriverRatingTests(TestCase):
+    def setUp(self):
+        get_location_store().clear()
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.driver, self.profile = make_driver('driver', '9100000801')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def rate(self, rating):
+        ride = make_ride(self.customer, driver=self.driver, status='completed')
+        # Aggregates are updated by a task queued on commit (run eagerly under test)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/transport/rides/{ride.id}/rate/', {'rating': rating})
+
+    def test_ratings_update_running_aggregates(self):
+        self.rate(5)
+        self.rate(4)
+        self.assertEqual(self.rate(3).status_code, 200)
+
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.rating_sum, self.profile.rating_count), (12, 3))
+        self.assertAlmostEqual(self.profile.average_rating, 4.0)
+
+    def test_deleting_last_rating_resets_average(self):
+        self.rate(4)
+        RideRating.objects.get().delete()
+
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.rating_sum, self.profile.rating_count, self.profile.average_rating), (0, 0, 0.0))
+
+    def test_edited_rating_moves_the_aggregates(self):
+        self.rate(5)
+        self.rate(3)
+        rating = RideRating.objects.get(rating=3)
+        rating.aggregated = False
+        rating.rating = 1
+        rating.save()
+
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.rating_sum, self.profile.rating_count, self.profile.average_rating), (6, 2, 3.0))
+        rating.refresh_from_db()
+        self.assertTrue(rating.aggregated)
+
+    def test_completion_increments_total_rides(self):
+        ride = make_ride(self.customer, driver=self.driver, status='in_progress')
+        self.client.force_authenticate(self.driver)
+        self.client.post(f'/api/transport/rides/{ride.id}/status/', {'status': 'completed'})
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.total_rides, 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        self.rate(5)
+        self.rate(2)
+        DriverProfile.objects.filter(pk=self.profile.pk).update(rating_sum=0, rating_count=0, average_rating=0.0)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_driver_ratings', '--check', stdout=StringIO())
+        call_command('rebuild_driver_ratings', stdout=StringIO())
+
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.rating_sum, self.profile.rating_count, self.profile.total_rides), (7, 2, 2))
+        self.assertAlmostEqual(self.profile.average_rating, 3.5)
+        call_command('rebuild_driver_ratings', '--check', stdout=StringIO())
+    
+    def test_rating_task_is_idempotent(self):
+        self.rate(4)
+        apply_ride_rating(RideRating.objects.get().id)
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.rating_sum, self.profile.rating_count), (4, 1))
+    
+    def test_rating_is_counted_after_the_response(self):
+        ride = make_ride(self.customer, driver=self.driver, status='completed')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(f'/api/transport/rides/{ride.id}/rate/', {'rating': 5})
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.rating_count, 0)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.rating_count, 1)
+        self.assertIn('transport.tasks.apply_ride_rating', task_metrics.snapshot())
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ConcurrentAcceptRideTests(TransactionTestCase):
+    DRIVERS = 12
+
+    def test_only_one_of_many_simultaneous_accepts_succeeds(self):
+        get_location_store().clear()
+        customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        ride = make_ride(customer)
+        drivers = []
+        for i in range(self.DRIVERS):
+            driver, _ = make_driver(f'driver{i}', f'91000006{i:02d}')
+            make_vehicle(driver, f'MH02AA{i:04d}')
+            drivers.append(driver)
+
+        barrier = threading.Barrier(self.DRIVERS)
+        statuses = []
+
+        def accept(driver):
+            client = APIClient()
+            client.force_authenticate(driver)
+            barrier.wait()
+            try:
+                statuses.append(client.post(f'/api/transport/rides/{ride.id}/accept/').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=accept, args=(driver,)) for driver in drivers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [200] + [409] * (self.DRIVERS - 1))
+        ride.refresh_from_db()
+        self.assertEqual(ride.status, 'accepted')
+        self.assertIn(ride.driver_id, {driver.id for driver in drivers})
+
+class QueryPlanTests(QueryPlanAssertions, TestCase):
+    """Every list view filter must be served by an index rather than a full table scan"""
+
+    def setUp(self):
+        get_location_store().clear()
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.driver, _ = make_driver('driver', '9100000901', lat=19.07, lng=72.87)
+        vehicle = make_vehicle(self.driver, 'MH03AA0001')
+        for i in range(5):
+            make_ride(self.customer, driver=self.driver, vehicle=vehicle, status='completed')
+            make_ride(self.customer)
+        self.client = APIClient()
+
+    def test_customer_rides(self):
+        self.client.force_authenticate(self.customer)
+        self.assertNoFullScans('/api/transport/rides/')
+        self.assertNoFullScans('/api/transport/rides/', {'cursor': ''})
+
+    def test_driver_rides(self):
+        self.client.force_authenticate(self.driver)
+        self.assertNoFullScans('/api/transport/rides/')
+        self.assertNoFullScans('/api/transport/rides/', {'cursor': ''})
+
+    def test_vehicles(self):
+        self.client.force_authenticate(self.driver)
+        self.assertNoFullScans('/api/transport/vehicles/')
+
+    def test_open_rides(self):
+        self.client.force_authenticate(self.driver)
+        self.assertNoFullScans('/api/transport/rides/open/', {'latitude': 19.07, 'longitude': 72.87})
+    
+    def test_nearby_drivers(self):
+        self.client.force_authenticate(self.customer)
+        self.assertNoFullScans('/api/transport/nearby-drivers/', {'latitude': 19.07, 'longitude': 72.87})
+
+class OpenRidesTests(TestCase):
+    def setUp(self):
+        get_location_store().clear()
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.driver, _ = make_driver('driver', '9100000901')
+        self.client = APIClient()
+        self.client.force_authenticate(self.driver)
+    
+    def ride_at(self, lat, lng, **kwargs):
+        return make_ride(self.customer, pickup_latitude=lat, pickup_longitude=lng, **kwargs)
+    
+    def test_nearby_recent_requests_nearest_first(self):
+        far = self.ride_at(19.10, 72.88)  # ~3km
+        near = self.ride_at(19.077, 72.878)
+        self.ride_at(19.50, 72.88)  # outside the radius
+        stale = self.ride_at(19.077, 72.878)
+        Ride.objects.filter(pk=stale.pk).update(requested_at=timezone.now() - timedelta(hours=1))
+        other_driver, _ = make_driver('other', '9100000902')
+        self.ride_at(19.077, 72.878, driver=other_driver, status='accepted')
+        
+        response = self.client.get('/api/transport/rides/open/', {'latitude': 19.0760, 'longitude': 72.8777})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([ride['id'] for ride in response.data], [near.id, far.id])
+        self.assertLess(response.data[0]['pickup_distance'], response.data[1]['pickup_distance'])
+    
+    def test_rejects_non_finite_and_out_of_range_values(self):
+        for params in ({'latitude': 'nan'}, {'latitude': '1e308'}, {'longitude': 'inf'}, {'radius': 'nan'}):
+            response = self.client.get('/api/transport/rides/open/', {'latitude': 19.07, 'longitude': 72.87, **params})
+            self.assertEqual(response.status_code, 400, params)
+    
+    def test_defaults_to_the_live_position(self):
+        ride = self.ride_at(19.077, 72.878)
+        get_location_store().update(self.driver.id, 19.0760, 72.8777)
+        response = self.client.get('/api/transport/rides/open/')
+        self.assertEqual([r['id'] for r in response.data], [ride.id])
+    
+    def test_requires_a_position(self):
+        self.assertEqual(self.client.get('/api/transport/rides/open/').status_code, 400)
+    
+    def test_customers_cannot_browse_open_rides(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get('/api/transport/rides/open/', {'latitude': 19.07, 'longitude': 72.87})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_driver_ride_list_is_own_history_only(self):
+        self.ride_at(19.077, 72.878)
+        own = self.ride_at(19.077, 72.878, driver=self.driver, status='completed')
+        response = self.client.get('/api/transport/rides/')
+        self.assertEqual([ride['id'] for ride in response.data['results']], [own.id])
+    
+    def test_pickup_cell_follows_pickup_coordinates(self):
+        ride = self.ride_at(19.077, 72.878)
+        self.assertEqual(ride.pickup_cell, cell_key(19.077, 72.878))
+        ride.pickup_latitude = 18.52
+        ride.save(update_fields=['pickup_latitude'])
+        ride.refresh_from_db()
+        self.assertEqual(ride.pickup_cell, cell_key(18.52, 72.878))
+
+KM = 1 / 111.195  # degrees of latitude per km
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class DispatchTests(TestCase):
+    """Offers go out in waves to a simulated fleet strung out north of the pickup point"""
+    
+    def setUp(self):
+        get_location_store().clear()
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.drivers = []
+        for i in range(7):
+            driver, _ = make_driver(f'fleet{i}', f'91000010{i:02d}', lat=19.0 + (i + 1) * 0.5 * KM, lng=72.8)
+            make_vehicle(driver, f'MH03FL{i:04d}')
+            self.drivers.append(driver)
+        self.client = APIClient()
+    
+    def request_ride(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_ride(self.customer, pickup_latitude=19.0, pickup_longitude=72.8, **kwargs)
+    
+    def offered(self, ride, **filters):
+        return list(ride.offers.filter(**filters).order_by('pickup_distance_km').values_list('driver_id', flat=True))
+    
+    def test_new_ride_is_offered_to_the_nearest_wave(self):
+        ride = self.request_ride()
+        self.assertEqual(self.offered(ride, wave=1, status='pending'), [d.id for d in self.drivers[:3]])
+    
+    def test_ineligible_drivers_are_skipped(self):
+        Vehicle.objects.filter(driver=self.drivers[0]).update(vehicle_type='car')
+        Vehicle.objects.filter(driver=self.drivers[1]).update(seating_capacity=1)
+        DriverProfile.objects.filter(user=self.drivers[2]).update(is_online=False)
+        make_ride(self.customer, driver=self.drivers[3], status='in_progress')
+        ride = self.request_ride(vehicle_type='auto', passengers=2)
+        self.assertEqual(self.offered(ride), [d.id for d in self.drivers[4:7]])
+    
+    def test_drivers_with_a_live_offer_are_not_offered_another(self):
+        first = self.request_ride()
+        second = self.request_ride()
+        self.assertEqual(self.offered(second), [d.id for d in self.drivers[3:6]])
+        self.assertEqual(len(self.offered(first)), 3)
+    
+    def test_declines_move_on_to_the_next_wave(self):
+        ride = self.request_ride()
+        for driver in self.drivers[:3]:
+            self.client.force_authenticate(driver)
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(f'/api/transport/rides/{ride.id}/decline/')
+            self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.offered(ride, wave=2), [d.id for d in self.drivers[3:6]])
+        self.assertEqual(self.client.post(f'/api/transport/rides/{ride.id}/decline/').status_code, 404)
+    
+    def test_expired_wave_moves_on_at_the_next_sweep(self):
+        ride = self.request_ride()
+        ride.offers.update(expires_at=timezone.now() - timedelta(seconds=1))
+        expired, waves = sweep()
+        self.assertEqual((expired, waves), (3, 1))
+        self.assertEqual(self.offered(ride, status='pending'), [d.id for d in self.drivers[3:6]])
+    
+    def test_overdue_offers_lapse_without_a_sweep(self):
+        first = self.request_ride()
+        RideOffer.objects.filter(ride=first).update(expires_at=timezone.now())
+        # The first wave's drivers are free again even though no sweep has marked their offers expired
+        second = self.request_ride()
+        self.assertEqual(self.offered(second), [d.id for d in self.drivers[:3]])
+    
+    @override_settings(DISPATCH_MAX_WAVES=2)
+    def test_dispatch_stops_after_the_last_wave(self):
+        ride = self.request_ride()
+        for _ in range(3):
+            ride.offers.update(expires_at=timezone.now() - timedelta(seconds=1))
+            sweep()
+        self.assertEqual(ride.offers.count(), 6)
+    
+    def test_accepting_settles_the_other_offers(self):
+        ride = self.request_ride()
+        self.client.force_authenticate(self.drivers[1])
+        self.assertEqual(self.client.post(f'/api/transport/rides/{ride.id}/accept/').status_code, 200)
+        statuses = dict(ride.offers.values_list('driver_id', 'status'))
+        self.assertEqual(statuses, {
+            self.drivers[0].id: 'expired', self.drivers[1].id: 'accepted', self.drivers[2].id: 'expired',
+        })
+    
+    def test_cancelling_withdraws_offers(self):
+        ride = self.request_ride()
+        self.client.force_authenticate(self.customer)
+        self.client.post(f'/api/transport/rides/{ride.id}/status/', {'status': 'cancelled'})
+        self.assertFalse(ride.offers.filter(status='pending').exists())
+    
+    def test_driver_offer_list(self):
+        ride = self.request_ride()
+        self.client.force_authenticate(self.drivers[0])
+        response = self.client.get('/api/transport/rides/offers/')
+        self.assertEqual([offer['ride']['id'] for offer in response.data], [ride.id])
+    
+    @override_settings(DISPATCH_ON_CREATE=False)
+    def test_batch_minimises_total_pickup_distance(self):
+        # Drivers 0 and 1 sit at 0.5km and 1km. Nearest-first hands the first ride driver 0 (0.2km)
+        # and leaves the second 0.6km from driver 1; swapping them costs 0.3km + 0.1km in total.
+        DriverProfile.objects.exclude(user__in=self.drivers[:2]).update(is_online=False)
+        first = make_ride(self.customer, pickup_latitude=19.0 + 0.7 * KM, pickup_longitude=72.8)
+        second = make_ride(self.customer, pickup_latitude=19.0 + 0.4 * KM, pickup_longitude=72.8)
+        offers = dispatch_batch([first, second])
+        self.assertEqual({(o.ride_id, o.driver_id) for o in offers}, {
+            (first.id, self.drivers[1].id), (second.id, self.drivers[0].id),
+        })
+    
+    def test_min_cost_assignment(self):
+        self.assertEqual(min_cost_assignment([[4, 1, 3], [2, 0, 5], [3, 2, 2]]), [1, 0, 2])
+        self.assertEqual(min_cost_assignment([[1, 9]]), [0])
+
+class FareQuoteTests(TestCase):
+    def setUp(self):
+        get_surge_monitor().clear()
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        self.trip = {
+            'pickup_latitude': 19.0760, 'pickup_longitude': 72.8777,
+            'dropoff_latitude': 19.1136, 'dropoff_longitude': 72.8697,
+        }
+    
+    def test_quotes_every_vehicle_type(self):
+        response = self.client.get('/api/transport/quote/', self.trip)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([q['vehicle_type'] for q in response.data], [t for t, _ in Vehicle.VEHICLE_TYPES])
+        fares = [float(q['estimated_fare']) for q in response.data]
+        self.assertEqual(fares, sorted(fares))
+        road = haversine(19.0760, 72.8777, 19.1136, 72.8697) * 1.3
+        self.assertAlmostEqual(response.data[0]['distance_km'], road, delta=0.2)  # pins are rounded to ~110m
+    
+    def test_rejects_non_finite_coordinates(self):
+        for value in ('nan', 'inf', '-inf'):
+            response = self.client.get('/api/transport/quote/', dict(self.trip, pickup_latitude=value))
+            self.assertEqual(response.status_code, 400, value)
+            self.assertIn('pickup_latitude', response.data)
+    
+    def test_fuel_type_discount(self):
+        petrol = quote(*self.trip.values(), vehicle_type='car', fuel_type='petrol')
+        electric = quote(*self.trip.values(), vehicle_type='car', fuel_type='electric')
+        self.assertLess(electric.estimated_fare, petrol.estimated_fare)
+    
+    def test_nearby_pins_share_a_cached_quote(self):
+        quote_all(*self.trip.values())
+        hits = cache_info().hits
+        nudged = dict(self.trip, pickup_latitude=19.07602)
+        self.assertEqual(quote_all(*nudged.values()), quote_all(*self.trip.values()))
+        self.assertEqual(cache_info().hits, hits + 2)
+    
+    def test_invalid_coordinates(self):
+        response = self.client.get('/api/transport/quote/', dict(self.trip, pickup_latitude=120))
+        self.assertEqual(response.status_code, 400)
+    
+    @override_settings(DISPATCH_ON_CREATE=False)
+    def test_ride_fare_is_priced_server_side(self):
+        response = self.client.post('/api/transport/rides/', dict(
+            self.trip, pickup_address='Bandra', dropoff_address='Andheri', vehicle_type='car',
+            estimated_fare='1.00', distance_km=0.1, estimated_duration=1,
+        ))
+        self.assertEqual(response.status_code, 201)
+        expected = quote(*self.trip.values(), vehicle_type='car')
+        ride = Ride.objects.get()
+        self.assertEqual(ride.estimated_fare, expected.estimated_fare)
+        self.assertEqual(ride.estimated_duration, expected.estimated_duration)
+    
+    @override_settings(DISPATCH_ON_CREATE=False)
+    def test_ride_needs_valid_coordinates(self):
+        for field, value in (('pickup_latitude', 1000), ('dropoff_longitude', 181), ('pickup_longitude', 'nan')):
+            response = self.client.post('/api/transport/rides/', dict(
+                self.trip, pickup_address='Bandra', dropoff_address='Andheri', **{field: value},
+            ))
+            self.assertEqual(response.status_code, 400, field)
+            self.assertIn(field, response.data)
+        self.assertFalse(Ride.objects.exists())
+    
+    def test_ride_price_cannot_be_patched(self):
+        ride = make_ride(self.customer, estimated_fare='323.00', surge_multiplier=1.5)
+        response = self.client.patch(f'/api/transport/rides/{ride.id}/', {
+            'estimated_fare': '1.00', 'surge_multiplier': 0.1, 'actual_fare': '1.00',
+            'pickup_latitude': 0, 'notes': 'Gate 2',
+        })
+        self.assertEqual(response.status_code, 200)
+        ride.refresh_from_db()
+        self.assertEqual(str(ride.estimated_fare), '323.00')
+        self.assertEqual((ride.surge_multiplier, ride.actual_fare, ride.pickup_latitude), (1.5, None, 19.0760))
+        self.assertEqual(ride.notes, 'Gate 2')
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+class SurgeMonitorTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.monitor = SurgeMonitor(window=600, bucket=60, threshold=1.0, sensitivity=0.25,
+                                    max_multiplier=2.5, clock=self.clock)
+    
+    def test_no_surge_while_drivers_keep_up(self):
+        self.monitor.record_driver(1, 19.076, 72.877)
+        self.monitor.record_request(19.076, 72.877)
+        self.assertEqual(self.monitor.multiplier(19.076, 72.877), 1.0)
+    
+    def test_surge_grows_with_demand_per_driver_and_is_capped(self):
+        self.monitor.record_driver(1, 19.076, 72.877)
+        for _ in range(5):
+            self.monitor.record_request(19.076, 72.877)
+        self.assertEqual(self.monitor.counts(19.076, 72.877), (5, 1))
+        self.assertEqual(self.monitor.multiplier(19.076, 72.877), 2.0)
+        for _ in range(20):
+            self.monitor.record_request(19.076, 72.877)
+        self.assertEqual(self.monitor.multiplier(19.076, 72.877), 2.5)
+        # Another cell is unaffected
+        self.assertEqual(self.monitor.multiplier(18.52, 73.85), 1.0)
+    
+    def test_requests_slide_out_of_the_window(self):
+        for minute in range(4):
+            self.monitor.record_request(19.076, 72.877)
+            self.clock.now += 60
+        self.clock.now += 6 * 60
+        self.assertEqual(self.monitor.counts(19.076, 72.877)[0], 3)
+        self.clock.now += 3 * 60
+        self.assertEqual(self.monitor.counts(19.076, 72.877)[0], 0)
+    
+    def test_drivers_count_once_in_their_latest_cell_until_stale(self):
+        self.monitor.record_driver(1, 19.076, 72.877)
+        self.monitor.record_driver(1, 19.076, 72.877)
+        self.monitor.record_driver(2, 19.076, 72.877)
+        self.assertEqual(self.monitor.counts(19.076, 72.877)[1], 2)
+        self.monitor.record_driver(1, 18.52, 73.85)
+        self.assertEqual(self.monitor.counts(19.076, 72.877)[1], 1)
+        self.clock.now += 601
+        self.assertEqual(self.monitor.counts(18.52, 73.85)[1], 0)
+        self.monitor.remove_driver(2)
+        self.assertEqual(self.monitor.counts(19.076, 72.877)[1], 0)
+
+    def test_idle_cells_are_dropped(self):
+        self.monitor.record_request(19.076, 72.877)
+        self.monitor.record_driver(1, 19.076, 72.877)
+        self.clock.now += 601
+        self.monitor.record_request(18.52, 73.85)
+        self.monitor.remove_driver(1)
+        self.assertEqual((list(self.monitor._demand), self.monitor._supply), ([cell_key(18.52, 73.85)], {}))
+
+@override_settings(DISPATCH_ON_CREATE=False)
+class SurgePricingTests(TestCase):
+    def setUp(self):
+        get_location_store().clear()
+        get_surge_monitor().clear()
+        self.customer = User.objects.create_user(username='rider', phone_number='9000000001', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        self.trip = {
+            'pickup_latitude': 19.0760, 'pickup_longitude': 72.8777,
+            'dropoff_latitude': 19.1136, 'dropoff_longitude': 72.8697,
+        }
+    
+    def test_demand_without_supply_raises_quotes_and_new_ride_fares(self):
+        base = quote(*self.trip.values(), vehicle_type='auto')
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(4):
+                make_ride(self.customer)
+        response = self.client.get('/api/transport/quote/', self.trip)
+        auto = next(q for q in response.data if q['vehicle_type'] == 'auto')
+        self.assertEqual(auto['surge_multiplier'], 1.8)
+        self.assertGreater(float(auto['estimated_fare']), float(base.estimated_fare))
+        
+        response = self.client.post('/api/transport/rides/', dict(
+            self.trip, pickup_address='Bandra', dropoff_address='Andheri', vehicle_type='auto',
+        ))
+        self.assertEqual(response.data['surge_multiplier'], 1.8)
+        self.assertEqual(response.data['estimated_fare'], auto['estimated_fare'])
+    
+    def test_driver_pings_add_supply(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(4):
+                make_ride(self.customer)
+        for i in range(4):
+            driver, _ = make_driver(f'd{i}', f'910000200{i}')
+            self.client.force_authenticate(driver)
+            self.client.post('/api/transport/location/', {'latitude': 19.0765, 'longitude': 72.8780})
+        self.assertEqual(get_surge_monitor().multiplier(19.0760, 72.8777), 1.0)
+
+    def test_rolled_back_requests_are_not_demand(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_ride(self.customer)
+            try:
+                with transaction.atomic():
+                    make_ride(self.customer)
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+        self.assertEqual(get_surge_monitor().counts(19.0760, 72.8777), (1, 0))
@@ -2,8 +2,8 @@
 from django.urls import path
 from .views import (
     VehicleListCreateView, VehicleDetailView, DriverProfileView,
-    RideListCreateView, RideDetailView, accept_ride, update_ride_status,
-    rate_ride, nearby_drivers
+    RideListCreateView, RideDetailView, open_rides, ride_offers, accept_ride,
+    decline_ride, update_ride_status, rate_ride, nearby_drivers, update_location, fare_quote
 )
 
 urlpatterns = [
@@ -11,9 +11,14 @@ urlpatterns = [
     path('vehicles/<int:pk>/', VehicleDetailView.as_view(), name='vehicle-detail'),
     path('driver-profile/', DriverProfileView.as_view(), name='driver-profile'),
     path('rides/', RideListCreateView.as_view(), name='ride-list-create'),
+    path('rides/open/', open_rides, name='open-rides'),
+    path('rides/offers/', ride_offers, name='ride-offers'),
     path('rides/<int:pk>/', RideDetailView.as_view(), name='ride-detail'),
     path('rides/<int:ride_id>/accept/', accept_ride, name='accept-ride'),
+    path('rides/<int:ride_id>/decline/', decline_ride, name='decline-ride'),
     path('rides/<int:ride_id>/status/', update_ride_status, name='update-ride-status'),
     path('rides/<int:ride_id>/rate/', rate_ride, name='rate-ride'),
     path('nearby-drivers/', nearby_drivers, name='nearby-drivers'),
+    path('location/', update_location, name='update-location'),
+    path('quote/', fare_quote, name='fare-quote'),
 ]
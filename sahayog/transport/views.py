@@ -1,21 +1,43 @@
+import math
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Avg
+from django.db import transaction
+from django.conf import settings
+from django.db.models import Q, F, Case, When
 from django.utils import timezone
-from .models import Vehicle, DriverProfile, Ride, RideRating
+from datetime import timedelta
+from sahayog.bootstrap import bump_users
+from sahayog.conditional import ConditionalGetMixin
+from sahayog.pagination import KeysetPagination
+from .dispatch import close_offers, decline_offer, live_offers, vehicles_for
+from .fares import quote_all
+from .geo import bounding_box, cells_in_radius, haversine, parse_float
+from .location_store import get_location_store
+from .models import Vehicle, DriverProfile, Ride, RideRating, RideStatusConflict
+from .realtime import publish_ride_status, record_driver_location
+from .surge import surge_multiplier
 from .serializers import (
     VehicleSerializer, DriverProfileSerializer, RideSerializer, 
-    RideCreateSerializer, RideRatingSerializer
+    RideCreateSerializer, RideRatingSerializer, DriverLocationSerializer,
+    RideStatusSerializer, RideStatusUpdateSerializer, RideOfferSerializer,
+    FareQuoteRequestSerializer, FareQuoteSerializer
 )
 
+DEFAULT_SEARCH_RADIUS_KM = 10
+MAX_SEARCH_RADIUS_KM = 25
+DEFAULT_NEARBY_LIMIT = 20
+MAX_NEARBY_LIMIT = 100
+DEFAULT_OPEN_RIDE_RADIUS_KM = 5
+DEFAULT_OPEN_RIDE_MAX_AGE = 15 * 60  # seconds
+
 class VehicleListCreateView(generics.ListCreateAPIView):
     serializer_class = VehicleSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Vehicle.objects.filter(driver=self.request.user)
+        return Vehicle.objects.filter(driver=self.request.user).select_related('driver').order_by('-created_at')
     
     def perform_create(self, serializer):
         serializer.save(driver=self.request.user)
@@ -25,18 +47,32 @@ class VehicleDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Vehicle.objects.filter(driver=self.request.user)
+        return Vehicle.objects.filter(driver=self.request.user).select_related('driver')
 
-class DriverProfileView(generics.RetrieveUpdateAPIView):
+class DriverProfileView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     serializer_class = DriverProfileSerializer
     permission_classes = [IsAuthenticated]
     
+    def get_last_modified(self, obj):
+        # The live position moves without touching updated_at, so only the ETag can validate
+        return None
+    
+    def get_etag_parts(self, obj):
+        return (obj.pk, obj.updated_at, obj.user.updated_at, obj.current_latitude, obj.current_longitude)
+    
     def get_object(self):
         profile, created = DriverProfile.objects.get_or_create(user=self.request.user)
+        profile.user = self.request.user
+        # The store may hold a newer position than the last flush
+        live = get_location_store().get(profile.user_id)
+        if live:
+            profile.current_latitude, profile.current_longitude = live
         return profile
 
 class RideListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_fields = ('requested_at', 'id')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -45,72 +81,190 @@ class RideListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         user = self.request.user
+        queryset = Ride.objects.select_related('customer', 'driver', 'vehicle__driver')
         if user.user_type == 'driver':
-            return Ride.objects.filter(Q(driver=user) | Q(driver__isnull=True)).order_by('-requested_at')
-        return Ride.objects.filter(customer=user).order_by('-requested_at')
+            # The driver's own rides; unassigned requests are served by open_rides
+            return queryset.filter(driver=user).order_by('-requested_at', '-id')
+        return queryset.filter(customer=user).order_by('-requested_at', '-id')
     
     def perform_create(self, serializer):
         serializer.save(customer=self.request.user)
 
-class RideDetailView(generics.RetrieveUpdateAPIView):
+class RideDetailView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     serializer_class = RideSerializer
     permission_classes = [IsAuthenticated]
+    last_modified_related = ('customer', 'driver', 'vehicle.driver')
     
     def get_queryset(self):
-        return Ride.objects.filter(Q(customer=self.request.user) | Q(driver=self.request.user))
+        return Ride.objects.filter(
+            Q(customer=self.request.user) | Q(driver=self.request.user)
+        ).select_related('customer', 'driver', 'vehicle__driver')
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def fare_quote(request):
+    """Estimated fare, distance and duration for every vehicle type between two points"""
+    serializer = FareQuoteRequestSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    estimates = quote_all(
+        data['pickup_latitude'], data['pickup_longitude'],
+        data['dropoff_latitude'], data['dropoff_longitude'], data.get('fuel_type'),
+        surge=surge_multiplier(data['pickup_latitude'], data['pickup_longitude']),
+    )
+    return Response(FareQuoteSerializer(estimates, many=True).data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def open_rides(request):
+    """Recent unassigned ride requests near the driver, nearest pickup first"""
+    if request.user.user_type != 'driver':
+        return Response({'error': 'Only drivers can view open rides'}, status=400)
+    
+    position = get_location_store().get(request.user.id)
+    try:
+        if 'latitude' in request.GET or position is None:
+            position = parse_float(request.GET['latitude'], -90, 90), parse_float(request.GET['longitude'], -180, 180)
+        radius = min(parse_float(request.GET.get('radius', DEFAULT_OPEN_RIDE_RADIUS_KM), 0, math.inf), MAX_SEARCH_RADIUS_KM)
+        limit = max(1, min(int(request.GET.get('limit', DEFAULT_NEARBY_LIMIT)), MAX_NEARBY_LIMIT))
+    except (KeyError, ValueError):
+        return Response({'error': 'Invalid latitude, longitude, radius or limit'}, status=400)
+    
+    latitude, longitude = position
+    max_age = getattr(settings, 'OPEN_RIDE_MAX_AGE', DEFAULT_OPEN_RIDE_MAX_AGE)
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius)
+    # Every term but the box matches ride_open_pickup_idx, so only open rides in nearby cells are read
+    rides = Ride.objects.filter(
+        status='requested', driver__isnull=True,
+        pickup_cell__in=cells_in_radius(latitude, longitude, radius),
+        requested_at__gte=timezone.now() - timedelta(seconds=max_age),
+        pickup_latitude__range=(min_lat, max_lat),
+        pickup_longitude__range=(min_lng, max_lng),
+    ).select_related('customer')
+    
+    nearest = sorted((
+        (distance, ride) for ride in rides
+        if (distance := haversine(latitude, longitude, ride.pickup_latitude, ride.pickup_longitude)) <= radius
+    ), key=lambda match: match[0])[:limit]
+    
+    open_rides = RideSerializer([ride for _, ride in nearest], many=True).data
+    for ride_data, (distance, _) in zip(open_rides, nearest):
+        ride_data['pickup_distance'] = round(distance, 2)
+    
+    return Response(open_rides)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def accept_ride(request, ride_id):
-    try:
-        ride = Ride.objects.get(id=ride_id, status='requested')
-        driver = request.user
-        
-        if driver.user_type != 'driver':
-            return Response({'error': 'Only drivers can accept rides'}, status=400)
-        
-        # Check if driver has active vehicle
-        vehicle = Vehicle.objects.filter(driver=driver, is_active=True, is_verified=True).first()
-        if not vehicle:
-            return Response({'error': 'No verified active vehicle found'}, status=400)
-        
-        ride.driver = driver
-        ride.vehicle = vehicle
-        ride.status = 'accepted'
-        ride.accepted_at = timezone.now()
-        ride.save()
-        
-        return Response(RideSerializer(ride).data)
+    driver = request.user
     
-    except Ride.DoesNotExist:
+    if driver.user_type != 'driver':
+        return Response({'error': 'Only drivers can accept rides'}, status=400)
+    
+    ride = Ride.objects.filter(id=ride_id).only('id', 'vehicle_type', 'passengers').first()
+    if ride is None:
         return Response({'error': 'Ride not found'}, status=404)
+    
+    # The vehicle the dispatcher offered the ride for, else any of the driver's that suits it
+    offered = live_offers().filter(ride_id=ride_id, driver=driver).values('vehicle_id')[:1]
+    vehicle = vehicles_for(ride).filter(driver=driver).order_by(
+        Case(When(id__in=offered, then=0), default=1), 'id'
+    ).first()
+    if not vehicle:
+        return Response({'error': 'No verified active vehicle suits this ride'}, status=400)
+    
+    # Claim the ride with a single conditional UPDATE so concurrent accepts cannot both win
+    now = timezone.now()
+    claimed = Ride.objects.filter(id=ride_id, status='requested', driver__isnull=True).update(
+        driver=driver,
+        vehicle=vehicle,
+        status='accepted',
+        accepted_at=now,
+        updated_at=now,
+    )
+    if not claimed:
+        return Response({'error': 'Ride is no longer available'}, status=status.HTTP_409_CONFLICT)
+    
+    close_offers(ride_id, accepted_by=driver.id)
+    ride = Ride.objects.select_related('customer', 'driver', 'vehicle__driver').get(id=ride_id)
+    # The claim was a queryset update, so no save signal told the bootstrap cache
+    bump_users(ride.customer_id, driver.id)
+    publish_ride_status(ride)
+    
+    return Response(RideSerializer(ride).data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def ride_offers(request):
+    """The driver's live dispatch offers, e.g. to catch up after reconnecting the socket"""
+    offers = live_offers().filter(driver=request.user).select_related('ride__customer').order_by('expires_at')
+    return Response(RideOfferSerializer(offers, many=True).data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def decline_ride(request, ride_id):
+    """Turn down a dispatch offer so the ride moves on to the next drivers straight away"""
+    if not decline_offer(ride_id, request.user.id):
+        return Response({'error': 'No pending offer for this ride'}, status=404)
+    return Response(status=status.HTTP_204_NO_CONTENT)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def update_ride_status(request, ride_id):
+    """
+    Advance a ride through Ride.TRANSITIONS. Pass ?compact=true to get back only the
+    id and the fields that changed instead of the full nested ride.
+    """
     try:
         ride = Ride.objects.get(id=ride_id)
-        new_status = request.data.get('status')
-        
-        # Verify user permission
-        if ride.driver != request.user and ride.customer != request.user:
-            return Response({'error': 'Permission denied'}, status=403)
-        
-        # Update status with timestamp
-        ride.status = new_status
-        if new_status == 'picked_up':
-            ride.picked_up_at = timezone.now()
-        elif new_status == 'completed':
-            ride.completed_at = timezone.now()
-            ride.actual_fare = request.data.get('actual_fare', ride.estimated_fare)
-        elif new_status == 'cancelled':
-            ride.cancelled_at = timezone.now()
-        
-        ride.save()
-        return Response(RideSerializer(ride).data)
-    
     except Ride.DoesNotExist:
         return Response({'error': 'Ride not found'}, status=404)
+    
+    # Verify user permission
+    user = request.user
+    if user.id not in (ride.driver_id, ride.customer_id):
+        return Response({'error': 'Permission denied'}, status=403)
+    
+    serializer = RideStatusUpdateSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    new_status = serializer.validated_data['status']
+    
+    if new_status == 'accepted':
+        return Response({'error': 'Use the accept endpoint to accept rides'}, status=400)
+    if user.id != ride.driver_id and new_status != 'cancelled':
+        return Response({'error': 'Only the driver can update ride progress'}, status=403)
+    if not ride.can_transition_to(new_status):
+        return Response(
+            {'error': f"Cannot change ride from {ride.status} to {new_status}"},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    extra_fields = {}
+    if new_status == 'completed':
+        extra_fields['actual_fare'] = serializer.validated_data.get('actual_fare', ride.estimated_fare)
+    with transaction.atomic():
+        try:
+            changed = ride.transition_to(new_status, **extra_fields)
+        except RideStatusConflict:
+            # Another request moved the ride on since it was read above
+            return Response(
+                {'error': f"Cannot change ride from {ride.status} to {new_status}"},
+                status=status.HTTP_409_CONFLICT
+            )
+        if new_status == 'completed':
+            DriverProfile.objects.filter(user_id=ride.driver_id).update(
+                total_rides=F('total_rides') + 1, updated_at=timezone.now()
+            )
+        elif new_status == 'cancelled':
+            close_offers(ride.id)
+    publish_ride_status(ride)
+    
+    if request.query_params.get('compact') in ('1', 'true'):
+        data = RideStatusSerializer(ride).data
+        return Response({field: data[field] for field in ['id', *changed]})
+    
+    ride = Ride.objects.select_related('customer', 'driver', 'vehicle__driver').get(id=ride.id)
+    return Response(RideSerializer(ride).data)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -138,43 +292,57 @@ def rate_ride(request, ride_id):
         if not created:
             return Response({'error': 'Ride already rated'}, status=400)
         
-        # Update driver's average rating if driver was rated
-        if rated_to.user_type == 'driver':
-            driver_profile = rated_to.driver_profile
-            avg_rating = RideRating.objects.filter(rated_to=rated_to).aggregate(Avg('rating'))['rating__avg']
-            driver_profile.average_rating = avg_rating or 0.0
-            driver_profile.save()
-        
+        # The driver's rating aggregates are updated by the RideRating post_save signal
         return Response(RideRatingSerializer(rating).data)
     
     except Ride.DoesNotExist:
         return Response({'error': 'Ride not found'}, status=404)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def update_location(request):
+    """Record a driver's live position; persisted to DriverProfile in periodic batches"""
+    if request.user.user_type != 'driver':
+        return Response({'error': 'Only drivers can report locations'}, status=400)
+    
+    serializer = DriverLocationSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    # Relayed to the driver's active rides, as pings over the location socket are
+    record_driver_location(request.user.id, **serializer.validated_data)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def nearby_drivers(request):
-    """Get nearby available drivers"""
-    user_lat = float(request.GET.get('latitude', 0))
-    user_lng = float(request.GET.get('longitude', 0))
-    
-    # Simple distance calculation (in real app, use PostGIS)
-    drivers = DriverProfile.objects.filter(
-        is_online=True,
-        is_verified=True,
-        current_latitude__isnull=False,
-        current_longitude__isnull=False
-    )
+    """Get nearby available drivers, nearest first"""
+    try:
+        user_lat = parse_float(request.GET.get('latitude', 0), -90, 90)
+        user_lng = parse_float(request.GET.get('longitude', 0), -180, 180)
+        radius = min(parse_float(request.GET.get('radius', DEFAULT_SEARCH_RADIUS_KM), 0, math.inf), MAX_SEARCH_RADIUS_KM)
+        limit = max(1, min(int(request.GET.get('limit', DEFAULT_NEARBY_LIMIT)), MAX_NEARBY_LIMIT))
+    except ValueError:
+        return Response({'error': 'Invalid latitude, longitude, radius or limit'}, status=400)
     
-    nearby_drivers = []
-    for driver in drivers:
-        # Calculate rough distance (for demo purposes)
-        lat_diff = abs(driver.current_latitude - user_lat)
-        lng_diff = abs(driver.current_longitude - user_lng)
-        distance = (lat_diff + lng_diff) * 111  # Rough km conversion
-        
-        if distance <= 10:  # Within 10km
-            driver_data = DriverProfileSerializer(driver).data
-            driver_data['distance'] = round(distance, 2)
-            nearby_drivers.append(driver_data)
+    # Positions come from the live store; the table only decides who is online and verified.
+    # Candidates are checked nearest-first in chunks so the IN clause stays small.
+    candidates = get_location_store().nearby(user_lat, user_lng, radius)
+    nearest = []
+    for start in range(0, len(candidates), limit * 4):
+        chunk = candidates[start:start + limit * 4]
+        available = DriverProfile.objects.filter(
+            user_id__in=[user_id for user_id, _, _, _ in chunk], is_online=True, is_verified=True
+        ).select_related('user').in_bulk(field_name='user_id')
+        for user_id, lat, lng, distance in chunk:
+            driver = available.get(user_id)
+            if driver is not None:
+                driver.current_latitude, driver.current_longitude = lat, lng
+                nearest.append((distance, driver))
+        if len(nearest) >= limit:
+            break
+    nearest = nearest[:limit]
+    
+    nearby_drivers = DriverProfileSerializer([driver for _, driver in nearest], many=True).data
+    for driver_data, (distance, _) in zip(nearby_drivers, nearest):
+        driver_data['distance'] = round(distance, 2)
     
     return Response(nearby_drivers)